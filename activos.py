@@ -0,0 +1,107 @@
+"""
+Imágenes de la interfaz ya reducidas al tamaño en que se muestran.
+
+La primera vez que se pide una imagen a un tamaño se decodifica la original,
+se reduce y se guarda una miniatura en `cache/imagenes` cuyo nombre lleva la
+huella del archivo original y el tamaño. Las siguientes veces solo se lee la
+miniatura, que pesa una fracción de la original. Las funciones de este módulo
+no tocan Tk, así pueden correr en un hilo de trabajo; la interfaz solo crea el
+`PhotoImage` con la imagen ya decodificada.
+
+Uso:
+    python activos.py          # genera las miniaturas de la interfaz y mide
+"""
+
+import hashlib
+import os
+import time
+
+from PIL import Image
+
+RUTA_MINIATURAS = os.path.join("cache", "imagenes")
+
+# Imágenes de main.py y el tamaño con que se muestran
+IMAGENES_INTERFAZ = {
+    "fondo": ("paisaje_cafetero.jpg", (1050, 660)),
+    "recolectora": ("recolectora_sonriendo.png", (150, 200)),
+}
+
+
+def _huella_archivo(ruta: str) -> str:
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def ruta_miniatura(ruta: str, tamaño: tuple, ruta_cache: str = RUTA_MINIATURAS) -> str:
+    """
+    Ruta de la miniatura de `ruta` a `tamaño`. Cambia si cambia el contenido
+    del archivo original.
+    """
+    nombre, extension = os.path.splitext(os.path.basename(ruta))
+    ancho, alto = tamaño
+    return os.path.join(ruta_cache, f"{nombre}-{_huella_archivo(ruta)[:16]}-{ancho}x{alto}{extension.lower()}")
+
+
+def generar_miniatura(ruta: str, tamaño: tuple, destino: str) -> Image.Image:
+    """
+    Reduce la imagen original a `tamaño` y la guarda en `destino` con el
+    mismo formato. Si no se puede escribir la caché, igual retorna la imagen.
+    """
+    with Image.open(ruta) as original:
+        formato = "JPEG" if original.format == "JPEG" else "PNG"
+        imagen = original.resize(tamaño)
+    try:
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        temporal = f"{destino}.{os.getpid()}.tmp"
+        opciones = {"quality": 90} if formato == "JPEG" else {}
+        imagen.save(temporal, format=formato, **opciones)
+        os.replace(temporal, destino)
+    except OSError as e:
+        print(f"No se pudo guardar la miniatura '{destino}': {e}")
+    return imagen
+
+
+def cargar_imagen(ruta: str, tamaño: tuple, ruta_cache: str = RUTA_MINIATURAS) -> Image.Image:
+    """
+    Retorna la imagen de `ruta` a `tamaño`, ya decodificada. Usa la
+    miniatura guardada si existe; si no, la genera. Con `ruta_cache=None`
+    siempre reduce la original.
+    """
+    if not ruta_cache:
+        with Image.open(ruta) as original:
+            return original.resize(tamaño)
+    destino = ruta_miniatura(ruta, tamaño, ruta_cache)
+    try:
+        with Image.open(destino) as miniatura:
+            if miniatura.size == tuple(tamaño):
+                miniatura.load()
+                return miniatura.copy()
+    except (FileNotFoundError, OSError):
+        pass
+    return generar_miniatura(ruta, tamaño, destino)
+
+
+def _medir(ruta_cache):
+    tiempos = {}
+    for nombre, (ruta, tamaño) in IMAGENES_INTERFAZ.items():
+        inicio = time.perf_counter()
+        cargar_imagen(ruta, tamaño, ruta_cache)
+        tiempos[nombre] = round((time.perf_counter() - inicio) * 1000, 1)
+    return tiempos
+
+
+def main():
+    print(f"Original reducida en cada arranque (ms): {_medir(None)}")
+    for nombre, (ruta, tamaño) in IMAGENES_INTERFAZ.items():
+        destino = ruta_miniatura(ruta, tamaño)
+        if os.path.exists(destino):
+            os.remove(destino)
+    print(f"Generando miniaturas (ms): {_medir(RUTA_MINIATURAS)}")
+    print(f"Desde la caché (ms): {_medir(RUTA_MINIATURAS)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+Banco de pruebas de rendimiento del motor, sin interfaz gráfica.
+
+Genera catálogos sintéticos con la forma de colombian_coffee_dataset.csv
+(remuestreando sus filas con algo de ruido y con más productores a mayor
+tamaño) y mide para cada tamaño:
+
+- la carga leyendo el CSV y desde la caché columnar, con su memoria máxima;
+- la clasificación de intenciones una por una, en lote y con la caché;
+- cada respuesta `obtener_info_*`, algunas preguntas con filtros y `realizar_compra`.
+
+Cada carga corre en su propio proceso para que la memoria máxima sea la de
+ese tamaño. Los catálogos generados se guardan en `cache/benchmark` y se
+reutilizan; con la misma semilla son idénticos. Los resultados se escriben en
+JSON y `--comparar` marca los tiempos que empeoraron respecto a otra corrida
+(termina con código 1 si hay alguno).
+
+Uso:
+    python benchmark.py                                   # 10k, 1M y 10M filas
+    python benchmark.py --filas 10000 --salida base.json
+    python benchmark.py --filas 10000 --comparar base.json
+"""
+
+import argparse
+import inspect
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from carga import percentil
+from catalogo import RUTA_DATASET, TAMAÑO_BLOQUE
+from intencion import ClasificadorIntencion, train_phrases
+from motor import MotorChat
+
+RUTA_BENCHMARK = os.path.join("cache", "benchmark")
+TAMAÑOS = (10_000, 1_000_000, 10_000_000)
+SEMILLA = 2025
+REPETICIONES = 50
+PRESUPUESTO_S = 2.0
+UMBRAL_REGRESION = 1.25
+
+PREGUNTAS = [texto for texto, _ in train_phrases]
+
+
+# --- Catálogos sintéticos ---
+
+def _productores(nombres, cantidad: int) -> list:
+    """
+    `cantidad` nombres de productor combinando nombres y apellidos reales.
+    """
+    nombres = sorted(set(nombres))
+    primeros = sorted({n.split()[0] for n in nombres})
+    apellidos = sorted({n.split()[-1] for n in nombres})
+    pool = list(nombres)
+    for primero in primeros:
+        for apellido in apellidos:
+            combinado = f"{primero} {apellido}"
+            if combinado not in nombres:
+                pool.append(combinado)
+    base, i = list(pool), 2
+    while len(pool) < cantidad:
+        pool.extend(f"{nombre} {i}" for nombre in base)
+        i += 1
+    return pool[:max(cantidad, len(nombres))]
+
+
+def generar_catalogo(filas: int, ruta: str, semilla: int = SEMILLA, base_csv: str = RUTA_DATASET,
+                     tamaño_bloque: int = TAMAÑO_BLOQUE):
+    """
+    Escribe en `ruta` un catálogo de `filas` filas con las columnas del
+    dataset original. Se escribe por bloques, así no necesita tener todo
+    el catálogo en memoria.
+    """
+    base = pd.read_csv(base_csv).dropna(subset=["coffee_variety"]).reset_index(drop=True)
+    rng = np.random.default_rng(semilla)
+    productores = np.array(_productores(base["name"].dropna(), max(len(base), filas // 1000)))
+    creditos_por_kg = (base["carbon_credits"] / base["kg"]).to_numpy()
+    kg_min, kg_max = base["kg"].min(), base["kg"].max()
+
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    for inicio in range(0, filas, tamaño_bloque):
+        n = min(tamaño_bloque, filas - inicio)
+        muestra = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+        kg = rng.uniform(kg_min, kg_max, n).round(2)
+        bloque = pd.DataFrame({
+            "id": np.arange(inicio + 1, inicio + n + 1),
+            "name": productores[rng.integers(0, len(productores), n)],
+            "year": muestra["year"],
+            "coffee_variety": muestra["coffee_variety"],
+            "ranking": (muestra["ranking"] + rng.normal(0, 0.5, n)).clip(0, 100).round(2),
+            "price": (muestra["price"] * rng.normal(1, 0.05, n)).clip(lower=0.01).round(2),
+            "kg": kg,
+            "carbon_credits": (kg * creditos_por_kg[rng.integers(0, len(creditos_por_kg), n)]).round(2),
+            "properties": muestra["properties"],
+            "location": muestra["location"],
+        })
+        bloque.to_csv(temporal, mode="w" if inicio == 0 else "a", header=inicio == 0, index=False)
+    os.replace(temporal, ruta)
+
+
+def catalogo_sintetico(filas: int, semilla: int = SEMILLA, regenerar: bool = False) -> str:
+    ruta = os.path.join(RUTA_BENCHMARK, f"catalogo_{filas}_{semilla}.csv")
+    if regenerar or not os.path.exists(ruta):
+        inicio = time.perf_counter()
+        generar_catalogo(filas, ruta, semilla)
+        print(f"Catálogo de {filas} filas generado en {time.perf_counter() - inicio:.1f} s: {ruta}")
+    return ruta
+
+
+# --- Mediciones (cada fase corre en su propio proceso) ---
+
+def _memoria_maxima_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    maxima = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB y macOS bytes
+    return round(maxima / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def cronometrar(funcion, repeticiones: int = REPETICIONES, presupuesto_s: float = PRESUPUESTO_S) -> dict:
+    """
+    Llama a `funcion` hasta `repeticiones` veces o hasta agotar el presupuesto
+    de tiempo (al menos una vez) y resume la latencia en milisegundos.
+    """
+    tiempos = []
+    limite = time.perf_counter() + presupuesto_s
+    while len(tiempos) < repeticiones and (not tiempos or time.perf_counter() < limite):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return {
+        "repeticiones": len(tiempos),
+        "media_ms": round(sum(tiempos) / len(tiempos) * 1000, 4),
+        "p50_ms": round(percentil(tiempos, 50) * 1000, 4),
+        "p99_ms": round(percentil(tiempos, 99) * 1000, 4),
+    }
+
+
+def _por_segundo(funcion, cantidad: int) -> float:
+    inicio = time.perf_counter()
+    funcion()
+    return round(cantidad / (time.perf_counter() - inicio), 1)
+
+
+def medir_carga_fria(csv_file: str, ruta_cache: str) -> dict:
+    """
+    Carga leyendo el CSV y escribiendo la caché columnar desde cero.
+    """
+    shutil.rmtree(ruta_cache, ignore_errors=True)
+    inicio = time.perf_counter()
+    MotorChat(csv_file, ruta_cache=ruta_cache)
+    return {"carga_csv_s": round(time.perf_counter() - inicio, 3), "memoria_max_csv_mb": _memoria_maxima_mb()}
+
+
+def medir_consultas(csv_file: str, ruta_cache: str, repeticiones: int = REPETICIONES) -> dict:
+    """
+    Carga desde la caché columnar y mide clasificación, respuestas y compras.
+    """
+    inicio = time.perf_counter()
+    motor = MotorChat(csv_file, ruta_cache=ruta_cache)
+    resultados = {"carga_cache_s": round(time.perf_counter() - inicio, 3),
+                  "memoria_max_cache_mb": _memoria_maxima_mb()}
+
+    sin_cache = ClasificadorIntencion(tamaño_cache=0)
+    sin_cache.precargar()
+    motor.clasificador.precargar()
+    motor.predecir_intenciones(PREGUNTAS)
+    resultados["intencion"] = {
+        "una_por_una_por_segundo": _por_segundo(lambda: [sin_cache.predecir_intencion(p) for p in PREGUNTAS],
+                                                len(PREGUNTAS)),
+        "lote_por_segundo": _por_segundo(lambda: sin_cache.predecir_intenciones(PREGUNTAS), len(PREGUNTAS)),
+        "con_cache_por_segundo": _por_segundo(lambda: [motor.predecir_intencion(p) for p in PREGUNTAS],
+                                              len(PREGUNTAS)),
+    }
+
+    variedades = motor.variedades_unicas
+    pregunta_precio = f"¿Cuánto cuesta el café {variedades[0]}?" if variedades else "precio"
+    respuestas = {}
+    for nombre, metodo in inspect.getmembers(motor, inspect.ismethod):
+        if nombre.startswith("obtener_info_"):
+            requeridos = [p for p in inspect.signature(metodo).parameters.values() if p.default is p.empty]
+            argumentos = (pregunta_precio,) if requeridos else ()
+            respuestas[nombre] = cronometrar(lambda: metodo(*argumentos), repeticiones)
+    resultados["respuestas"] = respuestas
+
+    # Preguntas con filtros: se responden sobre las filas que los cumplen
+    lugar = motor.indice.lugares[0] if motor.indice.lugares else ""
+    año = int(motor.años_unicos[-1]) if motor.años_unicos else 2024
+    filtradas = {
+        "calidad_max": f"¿Cuál es el café mejor calificado de {lugar} en {año}?",
+        "precio_min": f"¿Qué café es más barato en {lugar} por menos de $50?",
+        "calidad": f"¿Cuál es la calidad promedio del café de {lugar} desde {año - 1}?",
+    }
+    resultados["respuestas_filtradas"] = {
+        nombre: cronometrar(lambda: getattr(motor, f"obtener_info_{nombre}")(pregunta), repeticiones)
+        for nombre, pregunta in filtradas.items()
+    }
+
+    compras = []
+    for variedad in variedades:
+        productores, propiedades = motor.productores_y_propiedades(variedad)
+        if productores and propiedades:
+            compras.append((variedad, productores[0], propiedades[0]))
+    siguiente = iter(range(sys.maxsize))
+
+    def comprar():
+        i = next(siguiente)
+        variedad, productor, propiedad = compras[i % len(compras)]
+        motor.realizar_compra(variedad, productor, propiedad, 1 + i % 10,
+                              ("Libras", "Kilos")[i % 2], ("USD", "COP")[i % 2])
+
+    if compras:
+        resultados["realizar_compra"] = cronometrar(comprar, repeticiones * 10)
+    return resultados
+
+
+def _medir_en_proceso(fase: str, csv_file: str, ruta_cache: str, repeticiones: int) -> dict:
+    salida = subprocess.run([sys.executable, os.path.abspath(__file__), "--fase", fase, "--csv", csv_file,
+                             "--ruta-cache", ruta_cache, "--repeticiones", str(repeticiones)],
+                            capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def ejecutar(tamaños=TAMAÑOS, semilla: int = SEMILLA, repeticiones: int = REPETICIONES,
+             regenerar: bool = False) -> dict:
+    resultados = {}
+    for filas in tamaños:
+        csv_file = os.path.abspath(catalogo_sintetico(filas, semilla, regenerar))
+        ruta_cache = os.path.abspath(os.path.join(RUTA_BENCHMARK, f"cache_{filas}_{semilla}"))
+        medicion = {"filas": filas, "csv_mb": round(os.path.getsize(csv_file) / (1 << 20), 1)}
+        medicion.update(_medir_en_proceso("fria", csv_file, ruta_cache, repeticiones))
+        medicion.update(_medir_en_proceso("consultas", csv_file, ruta_cache, repeticiones))
+        resultados[str(filas)] = medicion
+        print(f"{filas} filas: carga CSV {medicion['carga_csv_s']} s, "
+              f"caché {medicion['carga_cache_s']} s, memoria máx. {medicion['memoria_max_csv_mb']} MB")
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "version": _version(),
+        "python": sys.version.split()[0],
+        "plataforma": platform.platform(),
+        "procesador": platform.processor() or platform.machine(),
+        "semilla": semilla,
+        "resultados": resultados,
+    }
+
+
+def _version() -> str:
+    try:
+        salida = subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return "desconocida"
+    return salida.stdout.strip() or "desconocida"
+
+
+# --- Comparación entre corridas ---
+
+def _valores(datos, prefijo: str = ""):
+    for clave, valor in datos.items():
+        nombre = f"{prefijo}{clave}"
+        if isinstance(valor, dict):
+            yield from _valores(valor, nombre + ".")
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            yield nombre, valor
+
+
+def comparar(actual: dict, anterior: dict, umbral: float = UMBRAL_REGRESION) -> list:
+    """
+    Retorna (métrica, anterior, actual, razón) de cada tiempo o memoria que
+    creció más de `umbral` veces y de cada rendimiento que bajó en esa razón.
+    """
+    previos = dict(_valores(anterior["resultados"]))
+    regresiones = []
+    for nombre, valor in _valores(actual["resultados"]):
+        previo = previos.get(nombre)
+        if not previo or not valor:
+            continue
+        if nombre.endswith(("_s", "_ms", "_mb")):
+            razon = valor / previo
+        elif nombre.endswith("_por_segundo"):
+            razon = previo / valor
+        else:
+            continue
+        if razon > umbral:
+            regresiones.append((nombre, previo, valor, round(razon, 2)))
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banco de pruebas del motor del chatbot.")
+    parser.add_argument("--filas", type=int, nargs="+", default=list(TAMAÑOS))
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    parser.add_argument("--repeticiones", type=int, default=REPETICIONES,
+                        help="Máximo de llamadas por respuesta medida.")
+    parser.add_argument("--salida", default="benchmark.json")
+    parser.add_argument("--comparar", help="Resultados anteriores para detectar regresiones.")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_REGRESION)
+    parser.add_argument("--regenerar", action="store_true", help="Volver a generar los catálogos.")
+    # Uso interno: una fase de medición en un proceso aparte
+    parser.add_argument("--fase", choices=["fria", "consultas"], help=argparse.SUPPRESS)
+    parser.add_argument("--csv", help=argparse.SUPPRESS)
+    parser.add_argument("--ruta-cache", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.fase == "fria":
+        print(json.dumps(medir_carga_fria(args.csv, args.ruta_cache)))
+        return
+    if args.fase == "consultas":
+        print(json.dumps(medir_consultas(args.csv, args.ruta_cache, args.repeticiones)))
+        return
+
+    resultados = ejecutar(args.filas, args.semilla, args.repeticiones, args.regenerar)
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+    print(f"Resultados guardados en '{args.salida}'.")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+        regresiones = comparar(resultados, anterior, args.umbral)
+        for nombre, previo, valor, razon in regresiones:
+            print(f"Regresión en {nombre}: {previo} -> {valor} ({razon}x)")
+        if regresiones:
+            sys.exit(1)
+        print(f"Sin regresiones respecto a '{args.comparar}' (umbral {args.umbral}x).")
+
+
+if __name__ == "__main__":
+    main()
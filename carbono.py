@@ -0,0 +1,106 @@
+"""
+Bonos de carbono de las compras, calculados a partir del catálogo.
+
+Cada fila del dataset dice cuántos bonos (`carbon_credits`) generó una
+cosecha de `kg` kilos. Con esas sumas se arma, una sola vez por versión del
+índice, una tabla de bonos por libra para cada variedad y productor, para
+cada variedad y para todo el catálogo. Una compra usa el factor más
+específico que exista. Junto a cada factor se guarda la desviación estándar
+de los factores fila a fila, que usa el modo aleatorio con semilla para
+simulaciones: en cada una se sortea un factor por productor y variedad.
+"""
+
+import numpy as np
+import pandas as pd
+
+from pedidos import LIBRAS_POR_KILO
+
+COLUMNAS_SUMAS = ['creditos', 'kg', 'filas', 'por_kg', 'por_kg2']
+SIMULACIONES = 100
+
+
+def _factores(sumas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Bonos por libra (ponderados por kilos) y desviación de los factores por
+    fila; la desviación es NaN con menos de dos filas.
+    """
+    filas = sumas['filas']
+    media = sumas['por_kg'] / filas
+    varianza = (sumas['por_kg2'] / filas - media ** 2).clip(lower=0) * filas / (filas - 1)
+    return pd.DataFrame({
+        'factor': sumas['creditos'] / (sumas['kg'] * LIBRAS_POR_KILO),
+        'desviacion': np.sqrt(varianza.where(filas > 1)) / LIBRAS_POR_KILO,
+    })
+
+
+def tabla_factores(sumas: pd.DataFrame):
+    """
+    A partir de las sumas por (variedad, productor) de
+    `IndiceCatalogo.sumas_carbono` retorna (por_productor, por_variedad,
+    general): factor y desviación por libra en cada nivel.
+    """
+    por_variedad = sumas.groupby(level=0).sum()
+    general = _factores(sumas.sum().to_frame().T).iloc[0] if len(sumas) else \
+        pd.Series({'factor': np.nan, 'desviacion': np.nan})
+    return _factores(sumas), _factores(por_variedad), general
+
+
+def factores_lineas(variedades, productores, tabla):
+    """
+    Retorna (codigos, distintos): `distintos` tiene una fila [factor,
+    desviacion] por cada par (variedad, productor) distinto de las líneas y
+    `codigos` dice qué fila usa cada línea. Se usa el factor del productor
+    para esa variedad, si no el de la variedad y si no el del catálogo.
+    """
+    por_productor, por_variedad, general = tabla
+    codigos_v, valores_v = pd.factorize(pd.Series(variedades, dtype=object))
+    codigos_p, valores_p = pd.factorize(pd.Series(productores, dtype=object))
+    ancho = len(valores_p) + 1
+    codigos, pares = pd.factorize((codigos_v + 1) * ancho + codigos_p + 1)
+    variedad_par = np.append(valores_v, None)[pares // ancho - 1]
+    productor_par = np.append(valores_p, None)[pares % ancho - 1]
+    claves = pd.MultiIndex.from_arrays([variedad_par, productor_par])
+    distintos = por_productor.reindex(claves).to_numpy(dtype=float, copy=True)
+    de_variedad = por_variedad.reindex(variedad_par).to_numpy(dtype=float)
+    distintos = np.where(np.isnan(distintos), de_variedad, distintos)
+    distintos = np.where(np.isnan(distintos), general.to_numpy(dtype=float), distintos)
+    return codigos, np.nan_to_num(distintos)
+
+
+def calcular_bonos(codigos, distintos, cantidad_lb, semilla: int = None) -> np.ndarray:
+    """
+    Bonos de cada línea con los factores de `factores_lineas`. Sin semilla
+    es factor × libras; con semilla el factor de cada par se sortea de una
+    normal con su desviación (sin bajar de cero), de forma reproducible, y
+    vale para todas sus líneas.
+    """
+    factores = distintos[:, 0] if semilla is None else _sortear(np.random.default_rng(semilla), distintos)
+    return factores[codigos] * np.asarray(cantidad_lb, dtype=float)
+
+
+def _sortear(rng, distintos, veces: int = None) -> np.ndarray:
+    tamaño = len(distintos) if veces is None else (veces, len(distintos))
+    return np.clip(rng.normal(distintos[:, 0], distintos[:, 1], tamaño), 0, None)
+
+
+def simular_bonos(codigos, distintos, cantidad_lb, simulaciones: int = SIMULACIONES,
+                  semilla: int = 0) -> dict:
+    """
+    Proyecta el total de bonos de un conjunto de líneas `simulaciones`
+    veces con factores sorteados y resume la distribución del total. Las
+    libras se suman por par antes de sortear, así cada simulación cuesta
+    lo mismo para mil líneas que para un millón.
+    """
+    cantidad_lb = np.nan_to_num(np.asarray(cantidad_lb, dtype=float))
+    libras = np.bincount(codigos, weights=cantidad_lb, minlength=len(distintos))
+    totales = _sortear(np.random.default_rng(semilla), distintos, simulaciones) @ libras
+    vacio = not simulaciones
+    return {
+        "simulaciones": simulaciones,
+        "semilla": semilla,
+        "esperado": float(distintos[:, 0] @ libras),
+        "media": float("nan") if vacio else float(totales.mean()),
+        "p5": float("nan") if vacio else float(np.percentile(totales, 5)),
+        "p50": float("nan") if vacio else float(np.percentile(totales, 50)),
+        "p95": float("nan") if vacio else float(np.percentile(totales, 95)),
+    }
@@ -0,0 +1,181 @@
+"""
+Generador de carga para el servidor del chatbot.
+
+Abre varias conexiones HTTP persistentes, envía preguntas de las frases de
+entrenamiento y reporta latencia p50/p99 y peticiones por segundo. La
+latencia y el rendimiento solo cuentan las respuestas 2xx:
+
+- "rechazadas": respuestas 503 (servidor ocupado). El cliente espera lo
+  que indica Retry-After y vuelve a encolar la pregunta, hasta
+  `--reintentos` veces; las que se agotan quedan en "sin_atender".
+- "fallidas": peticiones sin respuesta (el servidor cerró la conexión);
+  el cliente vuelve a conectarse.
+- Los demás códigos se cuentan en "estados" y en "errores".
+
+Uso:
+    python carga.py --port 8080 --conexiones 50 --peticiones 5000
+    python carga.py --local            # levanta un servidor en este proceso
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from intencion import train_phrases
+from servidor import ServidorChat
+
+PREGUNTAS = [texto for texto, _ in train_phrases]
+REINTENTOS = 5
+# Espera ante un 503 sin cabecera Retry-After
+ESPERA_REINTENTO = 1.0
+
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicion = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[posicion]
+
+
+async def _cliente(host: str, port: int, cola: asyncio.Queue, resultados: dict, reintentos: int):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            try:
+                i, intento = cola.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            cuerpo = json.dumps({"question": PREGUNTAS[i % len(PREGUNTAS)], "user_name": "carga"}).encode()
+            peticion = (
+                f"POST /preguntar HTTP/1.1\r\nHost: {host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(cuerpo)}\r\n\r\n"
+            ).encode() + cuerpo
+            inicio = time.perf_counter()
+            try:
+                writer.write(peticion)
+                await writer.drain()
+                estado, cerrar, reintentar_en = await _leer_respuesta(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                resultados["fallidas"] += 1
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            duracion = time.perf_counter() - inicio
+            resultados["estados"][estado] = resultados["estados"].get(estado, 0) + 1
+            if 200 <= estado < 300:
+                resultados["latencias"].append(duracion)
+            elif estado == 503:
+                resultados["rechazadas"] += 1
+            else:
+                resultados["errores"] += 1
+            if cerrar:
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+            if estado == 503:
+                if intento >= reintentos:
+                    resultados["sin_atender"] += 1
+                    continue
+                await asyncio.sleep(ESPERA_REINTENTO if reintentar_en is None else reintentar_en)
+                cola.put_nowait((i, intento + 1))
+    finally:
+        writer.close()
+
+
+async def _leer_respuesta(reader: asyncio.StreamReader):
+    """
+    (código HTTP, si el servidor cerrará la conexión, segundos de
+    Retry-After o None). Lanza ConnectionError si la conexión se cerró
+    antes de la respuesta.
+    """
+    linea = await reader.readline()
+    partes = linea.split()
+    if len(partes) < 2 or not partes[1].isdigit():
+        raise ConnectionError("El servidor cerró la conexión sin responder.")
+    estado = int(partes[1])
+    longitud = 0
+    cerrar = False
+    reintentar_en = None
+    while True:
+        linea = await reader.readline()
+        if linea in (b"\r\n", b""):
+            break
+        nombre, _, valor = linea.decode("latin-1").partition(":")
+        nombre = nombre.strip().lower()
+        if nombre == "content-length":
+            longitud = int(valor)
+        elif nombre == "connection" and valor.strip().lower() == "close":
+            cerrar = True
+        elif nombre == "retry-after" and valor.strip().isdigit():
+            reintentar_en = float(valor)
+    await reader.readexactly(longitud)
+    return estado, cerrar, reintentar_en
+
+
+async def generar_carga(host: str, port: int, conexiones: int, peticiones: int,
+                        reintentos: int = REINTENTOS) -> dict:
+    """
+    Envía `peticiones` preguntas repartidas entre `conexiones` clientes y
+    retorna un resumen con latencias en milisegundos. La latencia y las
+    peticiones por segundo son solo de las respuestas 2xx; los rechazos
+    (503) y las fallas se reportan aparte.
+    """
+    cola = asyncio.Queue()
+    for i in range(peticiones):
+        cola.put_nowait((i, 0))
+    resultados = {"latencias": [], "estados": {}, "rechazadas": 0, "fallidas": 0, "errores": 0, "sin_atender": 0}
+    inicio = time.perf_counter()
+    await asyncio.gather(*(_cliente(host, port, cola, resultados, reintentos) for _ in range(conexiones)))
+    duracion = time.perf_counter() - inicio
+    latencias = resultados["latencias"]
+
+    def por_segundo(cantidad: int) -> float:
+        return round(cantidad / duracion, 1) if duracion else 0.0
+
+    return {
+        "peticiones": peticiones,
+        "exitosas": len(latencias),
+        "conexiones": conexiones,
+        "segundos": round(duracion, 3),
+        "peticiones_por_segundo": por_segundo(len(latencias)),
+        "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+        "rechazadas": resultados["rechazadas"],
+        "rechazadas_por_segundo": por_segundo(resultados["rechazadas"]),
+        "sin_atender": resultados["sin_atender"],
+        "fallidas": resultados["fallidas"],
+        "errores": resultados["errores"],
+        "estados": resultados["estados"],
+    }
+
+
+async def _ejecutar(args) -> dict:
+    if not args.local:
+        return await generar_carga(args.host, args.port, args.conexiones, args.peticiones, args.reintentos)
+    servidor = ServidorChat(workers=args.workers, max_pendientes=args.max_pendientes)
+    host, port = await servidor.iniciar(args.host, 0)
+    try:
+        return await generar_carga(host, port, args.conexiones, args.peticiones, args.reintentos)
+    finally:
+        await servidor.detener()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador de carga para servidor.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--conexiones", type=int, default=20)
+    parser.add_argument("--peticiones", type=int, default=2000)
+    parser.add_argument("--reintentos", type=int, default=REINTENTOS,
+                        help="Veces que se reencola una pregunta rechazada con 503.")
+    parser.add_argument("--local", action="store_true", help="Levantar el servidor en este proceso.")
+    parser.add_argument("--workers", type=int, default=4, help="Solo con --local.")
+    parser.add_argument("--max-pendientes", type=int, default=64, help="Solo con --local.")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(_ejecutar(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Carga y preparación del dataset de café colombiano.
+
+La primera carga valida el CSV y guarda una caché columnar en disco: un
+archivo .npy por columna con tipos compactos (categorías para los textos,
+float32 donde no se pierde precisión) que las cargas siguientes abren con
+memoria mapeada. El CSV solo se vuelve a leer cuando cambia su contenido.
+
+Para catálogos que no caben en memoria, `leer_por_bloques` recorre el CSV
+en bloques de filas ya validados y preparados.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from perfil import perfil
+
+RUTA_DATASET = "Dataset/colombian_coffee_dataset.csv"
+RUTA_CACHE = os.path.join("cache", "catalogo")
+VERSION_CACHE = 1
+TAMAÑO_BLOQUE = 100_000
+
+# Una columna se guarda en float32 solo si redondear a estos decimales
+# recupera exactamente los valores originales (ver `a_float64`).
+DECIMALES_FLOAT32 = 4
+
+# Columnas críticas para las consultas del chatbot y la sección de compra
+columnas_necesarias = [
+    'coffee_variety', 'price', 'ranking', 'year',
+    'name', 'location', 'properties', 'carbon_credits'
+]
+
+columnas_numericas = ['price', 'ranking', 'year', 'carbon_credits']
+# Opcionales: si vienen en el CSV también se convierten a número
+columnas_numericas_opcionales = ['kg']
+columnas_categoricas = ['coffee_variety', 'name', 'location', 'properties']
+
+
+def validar_columnas(columnas):
+    """
+    Lanza ValueError si falta alguna de las columnas críticas.
+    """
+    for col in columnas_necesarias:
+        if col not in columnas:
+            raise ValueError(f"Falta la columna '{col}' en el CSV.")
+
+
+def preparar_dataset(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Elimina filas sin variedad y asegura tipos numéricos.
+    """
+    # Eliminar filas donde 'coffee_variety' sea NaN (clave para muchas consultas)
+    df = df.dropna(subset=['coffee_variety'])
+
+    # Asegurar tipos numéricos
+    df = df.copy()
+    for col in columnas_numericas + [c for c in columnas_numericas_opcionales if c in df.columns]:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def compactar_tipos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convierte los textos en categorías y reduce los números al tipo más
+    pequeño que conserva sus valores.
+    """
+    df = df.copy()
+    for col in df.columns:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            continue
+        if col in columnas_categoricas or not pd.api.types.is_numeric_dtype(serie):
+            df[col] = serie.astype('category')
+            continue
+        valores = serie.to_numpy(dtype=np.float64, na_value=np.nan)
+        finitos = valores[np.isfinite(valores)]
+        if len(finitos) == len(valores) and np.array_equal(finitos, np.round(finitos)):
+            for tipo in (np.int16, np.int32, np.int64):
+                info = np.iinfo(tipo)
+                if not len(finitos) or (finitos.min() >= info.min and finitos.max() <= info.max):
+                    df[col] = valores.astype(tipo)
+                    break
+        elif np.array_equal(_desde_float32(valores.astype(np.float32)), valores, equal_nan=True):
+            df[col] = valores.astype(np.float32)
+        else:
+            df[col] = valores
+    return df
+
+
+def _desde_float32(valores: np.ndarray) -> np.ndarray:
+    return np.round(valores.astype(np.float64), DECIMALES_FLOAT32)
+
+
+def a_float64(serie: pd.Series) -> pd.Series:
+    """
+    Retorna la columna en float64 para sumar sin perder precisión. Las
+    columnas compactadas a float32 recuperan sus valores originales.
+    """
+    if serie.dtype == np.float32:
+        return pd.Series(_desde_float32(serie.to_numpy()), index=serie.index, name=serie.name)
+    return serie.astype(np.float64)
+
+
+def huellas_filas(df: pd.DataFrame) -> np.ndarray:
+    """
+    Huella de 64 bits del contenido de cada fila, igual para la misma fila
+    leída del CSV o de la caché: los números se comparan en float64 y las
+    columnas en orden alfabético.
+    """
+    normalizado = pd.DataFrame({
+        col: df[col] if not pd.api.types.is_numeric_dtype(df[col]) else a_float64(df[col])
+        for col in sorted(df.columns)
+    })
+    return pd.util.hash_pandas_object(normalizado, index=False).to_numpy()
+
+
+def diferencias(anterior: pd.DataFrame, nuevo: pd.DataFrame):
+    """
+    Retorna (eliminadas, agregadas): las filas de `anterior` que ya no están
+    en `nuevo` y las de `nuevo` que no estaban. Una fila modificada aparece
+    en las dos. Las filas repetidas se cuentan una por una.
+    """
+    def claves(df):
+        huellas = pd.Series(huellas_filas(df))
+        if not huellas.duplicated().any():
+            return huellas
+        # Cada repetición de una misma fila recibe una clave distinta
+        repeticion = huellas.groupby(huellas).cumcount().to_numpy(dtype=np.uint64)
+        return pd.Series(huellas.to_numpy() ^ (repeticion * np.uint64(0x9E3779B97F4A7C15)))
+
+    claves_anterior, claves_nuevo = claves(anterior), claves(nuevo)
+    return (anterior[~claves_anterior.isin(claves_nuevo).to_numpy()],
+            nuevo[~claves_nuevo.isin(claves_anterior).to_numpy()])
+
+
+def leer_por_bloques(csv_file: str = RUTA_DATASET, tamaño_bloque: int = TAMAÑO_BLOQUE):
+    """
+    Generador de DataFrames de hasta `tamaño_bloque` filas, preparados como
+    en `cargar_dataset`. Las columnas críticas se verifican en el primer bloque.
+    """
+    if not os.path.exists(csv_file):
+        raise FileNotFoundError(f"No se encuentra el archivo '{csv_file}'.")
+    with pd.read_csv(csv_file, chunksize=tamaño_bloque) as lector:
+        for i, bloque in enumerate(lector):
+            if i == 0:
+                validar_columnas(bloque.columns)
+            yield preparar_dataset(bloque)
+
+
+# --- Caché columnar ---
+
+def _huella_archivo(ruta: str) -> str:
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def _leer_meta(ruta_cache: str):
+    try:
+        with open(os.path.join(ruta_cache, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("version") == VERSION_CACHE else None
+
+
+def _escribir_meta(ruta_cache: str, meta: dict):
+    temporal = os.path.join(ruta_cache, f"meta.json.{os.getpid()}.tmp")
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(temporal, os.path.join(ruta_cache, "meta.json"))
+
+
+def _origen(csv_file: str) -> dict:
+    estado = os.stat(csv_file)
+    return {"ruta": os.path.abspath(csv_file), "mtime_ns": estado.st_mtime_ns, "tamaño": estado.st_size}
+
+
+def _cache_vigente(csv_file: str, ruta_cache: str):
+    """
+    Retorna los metadatos de la caché si corresponde al CSV actual. Si solo
+    cambió la fecha del archivo pero no su contenido, se actualiza la fecha.
+    """
+    meta = _leer_meta(ruta_cache)
+    if meta is None:
+        return None
+    origen = _origen(csv_file)
+    guardado = meta["origen"]
+    if guardado["ruta"] != origen["ruta"] or guardado["tamaño"] != origen["tamaño"]:
+        return None
+    if guardado["mtime_ns"] == origen["mtime_ns"]:
+        return meta
+    if _huella_archivo(csv_file) != guardado["sha256"]:
+        return None
+    meta["origen"].update(origen)
+    try:
+        _escribir_meta(ruta_cache, meta)
+    except OSError:
+        pass
+    return meta
+
+
+def guardar_cache(df: pd.DataFrame, csv_file: str, ruta_cache: str = RUTA_CACHE):
+    """
+    Escribe el DataFrame compacto como un .npy por columna. Cada versión va
+    en su propia carpeta y meta.json se reemplaza al final, así un lector
+    concurrente siempre ve una versión completa.
+    """
+    origen = _origen(csv_file)
+    origen["sha256"] = _huella_archivo(csv_file)
+    carpeta = f"{origen['sha256'][:16]}-{os.getpid()}"
+    destino = os.path.join(ruta_cache, carpeta)
+    os.makedirs(destino, exist_ok=True)
+
+    columnas = []
+    for i, col in enumerate(df.columns):
+        serie = df[col]
+        archivo = f"{i}.npy"
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            codigos = serie.cat.codes.to_numpy()
+            np.save(os.path.join(destino, archivo), codigos)
+            columnas.append({"nombre": col, "archivo": archivo, "tipo": "categoria",
+                             "categorias": [str(c) for c in serie.cat.categories]})
+        else:
+            np.save(os.path.join(destino, archivo), serie.to_numpy())
+            columnas.append({"nombre": col, "archivo": archivo, "tipo": "numero"})
+    np.save(os.path.join(destino, "indice.npy"), df.index.to_numpy(dtype=np.int64))
+
+    anterior = _leer_meta(ruta_cache)
+    _escribir_meta(ruta_cache, {
+        "version": VERSION_CACHE,
+        "origen": origen,
+        "carpeta": carpeta,
+        "filas": len(df),
+        "columnas": columnas,
+    })
+    if anterior and anterior.get("carpeta") not in (None, carpeta):
+        shutil.rmtree(os.path.join(ruta_cache, anterior["carpeta"]), ignore_errors=True)
+
+
+def cargar_cache(ruta_cache: str, meta: dict) -> pd.DataFrame:
+    """
+    Abre las columnas guardadas con memoria mapeada.
+    """
+    carpeta = os.path.join(ruta_cache, meta["carpeta"])
+    datos = {}
+    for col in meta["columnas"]:
+        valores = np.load(os.path.join(carpeta, col["archivo"]), mmap_mode="r")
+        if col["tipo"] == "categoria":
+            datos[col["nombre"]] = pd.Categorical.from_codes(valores, categories=col["categorias"])
+        else:
+            datos[col["nombre"]] = valores
+    indice = np.load(os.path.join(carpeta, "indice.npy"), mmap_mode="r")
+    return pd.DataFrame(datos, index=pd.Index(indice), copy=False)
+
+
+def cargar_dataset(csv_file: str = RUTA_DATASET, ruta_cache: str = RUTA_CACHE) -> pd.DataFrame:
+    """
+    Retorna el DataFrame listo para construir el índice del catálogo. Usa la
+    caché columnar si sigue vigente; si no, lee el CSV, verifica las columnas
+    críticas y regenera la caché. Con `ruta_cache=None` siempre lee el CSV.
+    """
+    if not os.path.exists(csv_file):
+        raise FileNotFoundError(f"No se encuentra el archivo '{csv_file}'.")
+
+    if ruta_cache:
+        meta = _cache_vigente(csv_file, ruta_cache)
+        if meta is not None:
+            try:
+                with perfil.tramo("catalogo.cargar_cache"):
+                    return cargar_cache(ruta_cache, meta)
+            except (OSError, ValueError):
+                pass
+
+    with perfil.tramo("catalogo.leer_csv"):
+        df = pd.read_csv(csv_file)
+        validar_columnas(df.columns)
+        df = compactar_tipos(preparar_dataset(df))
+
+    if ruta_cache:
+        try:
+            with perfil.tramo("catalogo.guardar_cache"):
+                guardar_cache(df, csv_file, ruta_cache)
+        except OSError as e:
+            print(f"No se pudo guardar la caché del catálogo en '{ruta_cache}': {e}")
+    return df
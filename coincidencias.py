@@ -0,0 +1,199 @@
+"""
+Búsqueda de entidades del catálogo (variedades, productores, lugares)
+mencionadas en las preguntas de los usuarios.
+"""
+
+import re
+import unicodedata
+from collections import Counter, deque
+
+
+def normalizar(texto: str) -> str:
+    """
+    Pasa a minúsculas y elimina tildes para comparar nombres sin importar
+    cómo los escriba el usuario.
+    """
+    descompuesto = unicodedata.normalize("NFKD", str(texto).lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+class BuscadorPatrones:
+    """
+    Autómata de Aho-Corasick: encuentra en una sola pasada todas las
+    entidades cuyo nombre normalizado aparece dentro de un texto.
+    """
+
+    def __init__(self, nombres):
+        self._transiciones = [{}]
+        self._fallo = [0]
+        self._salidas = [[]]
+        for nombre in nombres:
+            self._insertar(nombre)
+        self._enlazar()
+
+    def _insertar(self, nombre: str):
+        nodo = 0
+        for caracter in normalizar(nombre):
+            siguiente = self._transiciones[nodo].get(caracter)
+            if siguiente is None:
+                siguiente = len(self._transiciones)
+                self._transiciones.append({})
+                self._fallo.append(0)
+                self._salidas.append([])
+                self._transiciones[nodo][caracter] = siguiente
+            nodo = siguiente
+        if nodo:
+            self._salidas[nodo].append(nombre)
+
+    def _enlazar(self):
+        pendientes = deque(self._transiciones[0].values())
+        while pendientes:
+            nodo = pendientes.popleft()
+            for caracter, hijo in self._transiciones[nodo].items():
+                pendientes.append(hijo)
+                fallo = self._fallo[nodo]
+                while fallo and caracter not in self._transiciones[fallo]:
+                    fallo = self._fallo[fallo]
+                destino = self._transiciones[fallo].get(caracter, 0)
+                self._fallo[hijo] = destino if destino != hijo else 0
+                self._salidas[hijo] = self._salidas[hijo] + self._salidas[self._fallo[hijo]]
+
+    def buscar(self, texto: str) -> list:
+        """
+        Retorna los nombres encontrados en el texto, sin repetir y en el
+        orden en que terminan de aparecer.
+        """
+        encontrados = {}
+        nodo = 0
+        for caracter in normalizar(texto):
+            while nodo and caracter not in self._transiciones[nodo]:
+                nodo = self._fallo[nodo]
+            nodo = self._transiciones[nodo].get(caracter, 0)
+            for nombre in self._salidas[nodo]:
+                encontrados.setdefault(nombre, None)
+        return list(encontrados)
+
+
+# --- Búsqueda aproximada ---
+
+def palabras(texto: str) -> list:
+    return re.findall(r"\w+", normalizar(texto))
+
+
+def tolerancia(palabra: str) -> int:
+    """
+    Errores admitidos al escribir una palabra: ninguno hasta 3 letras, uno
+    hasta 7 y dos en palabras más largas.
+    """
+    return 0 if len(palabra) <= 3 else 1 if len(palabra) <= 7 else 2
+
+
+def _trigramas(palabra: str) -> set:
+    rellena = f" {palabra} "
+    return {rellena[i:i + 3] for i in range(len(rellena) - 2)}
+
+
+def distancia(a: str, b: str, maximo: int) -> int:
+    """
+    Distancia de edición entre `a` y `b` contando como un error cambiar,
+    agregar o quitar una letra o intercambiar dos vecinas. Si pasa de
+    `maximo` retorna `maximo + 1` sin terminar de calcularla.
+    """
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    anterior2 = None
+    anterior = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        actual = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            costo = a[i - 1] != b[j - 1]
+            actual[j] = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + costo)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                actual[j] = min(actual[j], anterior2[j - 2] + 1)
+        if min(actual) > maximo:
+            return maximo + 1
+        anterior2, anterior = anterior, actual
+    return anterior[-1]
+
+
+class BuscadorAproximado:
+    """
+    Encuentra en un texto los nombres mencionados aunque tengan errores de
+    escritura ("geysha" → Geisha, "ana benites" → Ana Benítez).
+
+    Las palabras del texto se comparan con el vocabulario de los nombres
+    usando un índice de trigramas: solo se mide la distancia de edición con
+    las palabras que comparten suficientes trigramas. Un nombre cuenta como
+    mencionado si todas sus palabras aparecen en el texto, salvo los números
+    ("Cenicafe 1"), que solo suben la similitud; cada nombre se indexa por
+    su palabra menos frecuente, así se revisan pocos candidatos aunque haya
+    decenas de miles de nombres.
+    """
+
+    def __init__(self, nombres):
+        self._nombres = []
+        self._palabras_nombre = []
+        self._vocabulario = {}
+        frecuencia = Counter()
+        for nombre in dict.fromkeys(nombres):
+            ids = tuple(dict.fromkeys(self._vocabulario.setdefault(p, len(self._vocabulario))
+                                      for p in palabras(nombre)))
+            if ids:
+                self._nombres.append(nombre)
+                self._palabras_nombre.append(ids)
+                frecuencia.update(ids)
+        self._palabras = list(self._vocabulario)
+        self._por_trigrama = {}
+        for id_palabra, palabra in enumerate(self._palabras):
+            for trigrama in _trigramas(palabra):
+                self._por_trigrama.setdefault(trigrama, []).append(id_palabra)
+        self._requeridas = [tuple(i for i in ids if not self._palabras[i].isdigit()) or ids
+                            for ids in self._palabras_nombre]
+        self._por_palabra_rara = {}
+        for id_nombre, ids in enumerate(self._requeridas):
+            rara = min(ids, key=frecuencia.__getitem__)
+            self._por_palabra_rara.setdefault(rara, []).append(id_nombre)
+
+    def _parecidas(self, palabra: str):
+        """
+        Retorna {id de palabra del vocabulario: similitud} para las palabras
+        a distancia admitida de `palabra`.
+        """
+        maximo = tolerancia(palabra)
+        exacta = self._vocabulario.get(palabra)
+        if maximo == 0:
+            return {} if exacta is None else {exacta: 1.0}
+        # Un error cambia a lo sumo cuatro trigramas (tres, o cuatro si intercambia dos letras)
+        comunes = Counter()
+        for trigrama in _trigramas(palabra):
+            comunes.update(self._por_trigrama.get(trigrama, ()))
+        parecidas = {} if exacta is None else {exacta: 1.0}
+        for id_palabra, veces in comunes.items():
+            candidata = self._palabras[id_palabra]
+            if id_palabra == exacta or veces < max(len(palabra), len(candidata)) - 4 * maximo:
+                continue
+            errores = distancia(palabra, candidata, maximo)
+            if errores <= maximo:
+                parecidas[id_palabra] = 1 - errores / max(len(palabra), len(candidata))
+        return parecidas
+
+    def buscar(self, texto: str, limite: int = 5) -> list:
+        """
+        Retorna hasta `limite` pares (nombre, similitud entre 0 y 1), del más
+        parecido al menos; a igual similitud, primero los nombres más largos
+        y luego en orden alfabético.
+        """
+        similitud = {}
+        for palabra in set(palabras(texto)):
+            for id_palabra, valor in self._parecidas(palabra).items():
+                if valor > similitud.get(id_palabra, 0):
+                    similitud[id_palabra] = valor
+        encontrados = []
+        for id_palabra in similitud:
+            for id_nombre in self._por_palabra_rara.get(id_palabra, ()):
+                if all(i in similitud for i in self._requeridas[id_nombre]):
+                    ids = self._palabras_nombre[id_nombre]
+                    puntaje = sum(similitud.get(i, 0) for i in ids) / len(ids)
+                    encontrados.append((-puntaje, -len(ids), self._nombres[id_nombre]))
+        encontrados.sort()
+        return [(nombre, -puntaje) for puntaje, _, nombre in encontrados[:limite]]
@@ -0,0 +1,357 @@
+"""
+Consultas con filtros sobre las filas del catálogo.
+
+De una pregunta se extraen filtros (variedad, productor, lugar, años de
+cosecha y rango de precio) como un diccionario {columna: valor}; los años y
+el precio son rangos [desde, hasta] con None en el extremo abierto:
+
+    {"location": "Huila", "year": [2024, 2024], "price": [None, 20.0]}
+
+`IndiceFacetas` responde esos filtros sin recorrer el DataFrame: guarda las
+posiciones de las filas de cada valor de las columnas de texto y el orden
+de las columnas numéricas. Se parte del filtro con menos filas y los demás
+solo se comprueban sobre esas, y los agregados (mínimo, máximo, promedio y
+las k mejores filas) se calculan únicamente sobre las filas elegidas.
+"""
+
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+from catalogo import a_float64
+from coincidencias import normalizar
+
+TOP = 3
+
+# Columnas que se filtran por igualdad, según el tipo de entidad mencionada
+COLUMNAS_FILTRO = {'coffee_variety': "variedad", 'name': "productor", 'location': "lugar"}
+# Columnas que se filtran por rango [desde, hasta]
+COLUMNAS_RANGO = ['year', 'price']
+# Columnas de cada fila que se entregan en los resúmenes
+COLUMNAS_RESUMEN = ['coffee_variety', 'name', 'location', 'year', 'price', 'ranking']
+
+
+# --- Filtros mencionados en la pregunta ---
+
+_NUMERO = r"(\d+(?:[.,]\d+)?)"
+_MONEDA = r"(?:usd|dolares?|us\$)"
+_MONTO = rf"(?:\$\s*{_NUMERO}|{_NUMERO}\s*{_MONEDA})"
+_PRECIO_ENTRE = re.compile(rf"entre\s+\$?\s*{_NUMERO}\s*{_MONEDA}?\s+y\s+{_MONTO}")
+_PRECIO_HASTA = re.compile(rf"(?:menos de|menor a|menor de|por debajo de|hasta|maximo|no mas de)\s+{_MONTO}")
+_PRECIO_DESDE = re.compile(rf"(?:(?<!no )mas de|mayor a|mayor de|por encima de|desde|minimo)\s+{_MONTO}")
+# Unidades de cantidad: "2000 libras" no es un año
+_UNIDAD = r"(?:libras?|lbs?|kilos?|kilogramos?|kgs?|gramos?|gr|sacos?|bultos?|arrobas?|unidades?)"
+_AÑO = rf"(?<![\d.,])((?:19|20)\d{{2}})(?!\d|[.,]\d)(?!\s*{_UNIDAD}\b)"
+_AÑOS_ENTRE = re.compile(rf"entre\s+(?:el\s+)?{_AÑO}\s+y\s+(?:el\s+)?{_AÑO}")
+_AÑOS_DESDE = re.compile(rf"(desde|a partir de|despues de|posterior(?:es)? a)\s+(?:el\s+)?{_AÑO}")
+_AÑOS_HASTA = re.compile(rf"(hasta|antes de|anterior(?:es)? a)\s+(?:el\s+)?{_AÑO}")
+_AÑO_CON_PISTA = re.compile(rf"\b(?:de|del|en|cosechas?|anos?)\s+(?:el\s+|la\s+)?{_AÑO}")
+
+
+def _numero(grupos) -> float:
+    return float(next(g for g in grupos if g).replace(",", "."))
+
+
+def _quitar(texto: str, encontrado) -> str:
+    return texto[:encontrado.start()] + " " + texto[encontrado.end():]
+
+
+def _precios(texto: str):
+    """
+    ([desde, hasta] o None, texto sin los montos encontrados).
+    """
+    entre = _PRECIO_ENTRE.search(texto)
+    if entre:
+        return sorted([_numero(entre.groups()[:1]), _numero(entre.groups()[1:])]), _quitar(texto, entre)
+    rango = [None, None]
+    for extremo, patron in ((1, _PRECIO_HASTA), (0, _PRECIO_DESDE)):
+        encontrado = patron.search(texto)
+        if encontrado:
+            rango[extremo] = _numero(encontrado.groups())
+            texto = _quitar(texto, encontrado)
+    return (rango if rango != [None, None] else None), texto
+
+
+def _años(texto: str, años_catalogo=()):
+    entre = _AÑOS_ENTRE.search(texto)
+    if entre:
+        return sorted(int(a) for a in entre.groups())
+    rango = [None, None]
+    desde = _AÑOS_DESDE.search(texto)
+    if desde:
+        # "después de 2022" no incluye 2022; "desde 2022" sí
+        rango[0] = int(desde.group(2)) + (desde.group(1) not in ("desde", "a partir de"))
+    hasta = _AÑOS_HASTA.search(texto)
+    if hasta:
+        rango[1] = int(hasta.group(2)) - (hasta.group(1) != "hasta")
+    if rango != [None, None]:
+        return rango
+    # Un número suelto solo es un año si lo precede "de", "en", "cosecha"...
+    # o si es un año de cosecha del catálogo
+    años = {int(a) for a in _AÑO_CON_PISTA.findall(texto)}
+    años.update(a for a in map(int, re.findall(_AÑO, texto)) if a in años_catalogo)
+    return [min(años), max(años)] if años else None
+
+
+def rangos_mencionados(texto: str, años_catalogo=()) -> dict:
+    """
+    Filtros de rango que pide el texto: años de cosecha ("de 2024", "entre
+    2022 y 2023", "después de 2022") y precio en USD ("menos de $20",
+    "entre 10 y 15 dólares"). Los montos no se confunden con años, y un
+    número sin esas pistas solo se toma como año si está en `años_catalogo`
+    y no lo sigue una unidad ("2000 libras").
+    """
+    filtros = {}
+    precio, resto = _precios(normalizar(texto))
+    años = _años(resto, set(años_catalogo))
+    if años is not None:
+        filtros['year'] = años
+    if precio is not None:
+        filtros['price'] = precio
+    return filtros
+
+
+def validar_filtros(filtros) -> dict:
+    """
+    Retorna los filtros si tienen la forma esperada (por ejemplo, los que
+    vienen en un cursor); si no, lanza ValueError.
+    """
+    if not isinstance(filtros, dict):
+        raise ValueError("Los filtros deben ser un objeto.")
+    for columna, valor in filtros.items():
+        if columna in COLUMNAS_FILTRO:
+            valido = isinstance(valor, str)
+        elif columna in COLUMNAS_RANGO:
+            valido = isinstance(valor, list) and len(valor) == 2 and all(
+                v is None or (isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v))
+                for v in valor)
+        else:
+            valido = False
+        if not valido:
+            raise ValueError(f"Filtro inválido para '{columna}'.")
+    return filtros
+
+
+def describir_filtros(filtros: dict) -> str:
+    """
+    Texto corto con los filtros, por ejemplo "Geisha, Huila, 2024, hasta $20 USD".
+    """
+    partes = [filtros[col] for col in COLUMNAS_FILTRO if col in filtros]
+    desde, hasta = filtros.get('year') or (None, None)
+    if desde is not None and desde == hasta:
+        partes.append(str(desde))
+    elif desde is not None and hasta is not None:
+        partes.append(f"{desde} a {hasta}")
+    elif desde is not None or hasta is not None:
+        partes.append(f"desde {desde}" if desde is not None else f"hasta {hasta}")
+    desde, hasta = filtros.get('price') or (None, None)
+    if desde is not None and hasta is not None:
+        partes.append(f"${desde:g} a ${hasta:g} USD")
+    elif desde is not None or hasta is not None:
+        partes.append(f"desde ${desde:g} USD" if desde is not None else f"hasta ${hasta:g} USD")
+    return ", ".join(partes)
+
+
+def mascara(filas: pd.DataFrame, filtros: dict) -> np.ndarray:
+    """
+    Máscara booleana de las filas que cumplen los filtros; se usa con los
+    bloques del CSV, donde no hay índice.
+    """
+    seleccion = np.ones(len(filas), dtype=bool)
+    for columna, valor in filtros.items():
+        if columna in COLUMNAS_RANGO:
+            numeros = a_float64(filas[columna]).to_numpy()
+            desde, hasta = valor
+            with np.errstate(invalid='ignore'):
+                seleccion &= ~np.isnan(numeros)
+                if desde is not None:
+                    seleccion &= numeros >= desde
+                if hasta is not None:
+                    seleccion &= numeros <= hasta
+        else:
+            seleccion &= (filas[columna] == valor).to_numpy(dtype=bool, na_value=False)
+    return seleccion
+
+
+# --- Agregados sobre las filas elegidas ---
+
+def _resumir(valores: np.ndarray, k: int, mayor: bool, desempate: np.ndarray = None):
+    """
+    Retorna (resumen, posiciones de las k mejores filas en orden) para
+    valores sin NaN; a igual valor va primero el menor `desempate` (por
+    defecto, la posición).
+    """
+    resumen = {"filas": len(valores), "suma": float(valores.sum()) if len(valores) else 0.0,
+               "minimo": float(valores.min()) if len(valores) else None,
+               "maximo": float(valores.max()) if len(valores) else None}
+    k = min(k, len(valores))
+    if not k:
+        return resumen, np.empty(0, dtype=np.intp)
+    claves = -valores if mayor else valores
+    mejores = np.argpartition(claves, k - 1)[:k] if k < len(valores) else np.arange(len(valores))
+    desempate = mejores if desempate is None else desempate[mejores]
+    return resumen, mejores[np.lexsort((desempate, claves[mejores]))]
+
+
+def _con_promedio(resumen: dict, top: pd.DataFrame) -> dict:
+    resumen["promedio"] = resumen["suma"] / resumen["filas"] if resumen["filas"] else None
+    resumen["top"] = top.reset_index(drop=True)
+    return resumen
+
+
+def resumir_filas(filas: pd.DataFrame, columna: str, k: int = TOP, mayor: bool = True) -> dict:
+    """
+    Resumen de `columna` en las filas dadas: {"filas", "suma", "minimo",
+    "maximo", "promedio", "top"}, con las `k` filas de mayor valor (o menor,
+    con `mayor=False`) en "top".
+    """
+    valores = a_float64(filas[columna]).to_numpy()
+    validas = np.flatnonzero(~np.isnan(valores))
+    resumen, mejores = _resumir(valores[validas], k, mayor)
+    return _con_promedio(resumen, filas.iloc[validas[mejores]][COLUMNAS_RESUMEN])
+
+
+def combinar_resumenes(resumenes, columna: str, k: int = TOP, mayor: bool = True) -> dict:
+    """
+    Junta los resúmenes de varios bloques de filas en uno solo.
+    """
+    resumenes = list(resumenes)
+    extremos = [r for r in resumenes if r["filas"]]
+    combinado = {
+        "filas": sum(r["filas"] for r in resumenes),
+        "suma": sum(r["suma"] for r in resumenes),
+        "minimo": min((r["minimo"] for r in extremos), default=None),
+        "maximo": max((r["maximo"] for r in extremos), default=None),
+    }
+    tops = [r["top"] for r in resumenes if len(r["top"])]
+    top = pd.concat(tops) if tops else pd.DataFrame(columns=COLUMNAS_RESUMEN)
+    top = top.sort_values(columna, ascending=not mayor, kind='stable').head(k)
+    return _con_promedio(combinado, top)
+
+
+def _buscar(ordenados: np.ndarray, valor: float, lado: str) -> int:
+    """
+    np.searchsorted con el valor convertido al tipo de la columna: comparar
+    una columna entera con un float la copiaría completa.
+    """
+    if ordenados.dtype.kind in 'iu':
+        info = np.iinfo(ordenados.dtype)
+        if math.isinf(valor):
+            return len(ordenados) if valor > 0 else 0
+        valor = math.ceil(valor) if lado == 'left' else math.floor(valor)
+        if valor > info.max or valor < info.min:
+            return len(ordenados) if valor > info.max else 0
+        valor = ordenados.dtype.type(valor)
+    return int(np.searchsorted(ordenados, valor, lado))
+
+
+class IndiceFacetas:
+    """
+    Índices para filtrar las filas de un DataFrame que no cambia: la lista
+    ordenada de posiciones de cada valor de las columnas de texto y el
+    orden de las columnas numéricas para los rangos. Cada índice se arma la
+    primera vez que se usa; cuando el catálogo cambia se crea uno nuevo.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._listas = {}
+        self._numeros = {}
+        self._ordenados = {}
+
+    def _lista(self, columna: str):
+        """
+        (códigos de cada fila, {valor: código}, posiciones agrupadas por
+        código, inicio de cada código en las posiciones).
+        """
+        if columna not in self._listas:
+            serie = self.df[columna]
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                codigos, valores = serie.cat.codes.to_numpy(), serie.cat.categories
+            else:
+                codigos, valores = pd.factorize(serie)
+            orden = np.argsort(codigos, kind='stable')
+            inicios = np.searchsorted(codigos[orden], np.arange(len(valores) + 1))
+            self._listas[columna] = (codigos, {v: i for i, v in enumerate(valores)}, orden, inicios)
+        return self._listas[columna]
+
+    def numeros(self, columna: str) -> np.ndarray:
+        """
+        Valores de una columna numérica; las enteras conservan su tipo, que
+        es más rápido de recorrer que float64.
+        """
+        if columna not in self._numeros:
+            serie = self.df[columna]
+            enteros = pd.api.types.is_integer_dtype(serie.dtype)
+            self._numeros[columna] = np.asarray(serie.to_numpy() if enteros else a_float64(serie).to_numpy())
+        return self._numeros[columna]
+
+    def _ordenado(self, columna: str):
+        if columna not in self._ordenados:
+            orden = np.argsort(self.numeros(columna), kind='stable')
+            self._ordenados[columna] = (orden, self.numeros(columna)[orden])
+        return self._ordenados[columna]
+
+    def _condicion(self, columna: str, valor):
+        """
+        (cuántas filas cumplen, función que retorna sus posiciones, función
+        que dice cuáles de unas posiciones cumplen).
+        """
+        if columna in COLUMNAS_RANGO:
+            orden, ordenados = self._ordenado(columna)
+            desde, hasta = valor
+            inicio = 0 if desde is None else _buscar(ordenados, desde, 'left')
+            fin = _buscar(ordenados, np.inf if hasta is None else hasta, 'right')
+            numeros = self.numeros(columna)
+
+            def cumplen(posiciones):
+                valores = numeros[posiciones]
+                seleccion = ~np.isnan(valores) if valores.dtype.kind == 'f' else np.ones(len(valores), dtype=bool)
+                if desde is not None:
+                    seleccion &= valores >= desde
+                if hasta is not None:
+                    seleccion &= valores <= hasta
+                return seleccion
+            return max(fin - inicio, 0), lambda: orden[inicio:fin], cumplen
+
+        codigos, por_valor, orden, inicios = self._lista(columna)
+        codigo = por_valor.get(valor)
+        if codigo is None:
+            return 0, lambda: np.empty(0, dtype=np.intp), lambda p: np.zeros(len(p), dtype=bool)
+        return (inicios[codigo + 1] - inicios[codigo], lambda: orden[inicios[codigo]:inicios[codigo + 1]],
+                lambda posiciones: codigos[posiciones] == codigo)
+
+    def filas(self, filtros: dict, en_orden: bool = True) -> np.ndarray:
+        """
+        Posiciones de las filas que cumplen todos los filtros; con
+        `en_orden=False` pueden venir desordenadas, lo que evita ordenarlas
+        cuando solo se van a agregar.
+        """
+        if not filtros:
+            return np.arange(len(self.df))
+        condiciones = sorted(((*self._condicion(col, valor), col) for col, valor in filtros.items()),
+                             key=lambda condicion: condicion[0])
+        _, obtener, _, columna = condiciones[0]
+        posiciones = obtener()
+        for _, _, cumplen, _ in condiciones[1:]:
+            if not len(posiciones):
+                break
+            posiciones = posiciones[cumplen(posiciones)]
+        # Las filas de un rango salen ordenadas por valor y no por posición
+        if en_orden and columna in COLUMNAS_RANGO:
+            posiciones = np.sort(posiciones)
+        return posiciones
+
+    def resumen(self, filtros: dict, columna: str, k: int = TOP, mayor: bool = True) -> dict:
+        """
+        Como `resumir_filas`, sobre las filas que cumplen los filtros.
+        """
+        posiciones = self.filas(filtros, en_orden=False)
+        valores = self.numeros(columna)[posiciones]
+        if valores.dtype.kind == 'f':
+            validas = ~np.isnan(valores)
+            posiciones, valores = posiciones[validas], valores[validas]
+        resumen, mejores = _resumir(valores, k, mayor, desempate=posiciones)
+        return _con_promedio(resumen, self.df.iloc[posiciones[mejores]][COLUMNAS_RESUMEN])
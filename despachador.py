@@ -0,0 +1,121 @@
+"""
+Ejecución en segundo plano para la interfaz gráfica.
+
+Las consultas al motor corren en un grupo de hilos y sus resultados vuelven
+por una cola que el hilo de Tk revisa periódicamente con `root.after`, así
+la ventana nunca se congela esperando una respuesta.
+"""
+
+import itertools
+import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+INTERVALO_MS = 30
+
+
+class Despachador:
+    """
+    Envía tareas a hilos de trabajo y entrega sus resultados en el hilo de la
+    interfaz.
+
+    `programar(ms, funcion)` agenda una llamada en el hilo de la interfaz
+    (normalmente `root.after`). Las tareas sin `canal` se entregan en el
+    mismo orden en que se enviaron. Las tareas con el mismo `canal` se
+    reemplazan: al enviar una nueva, la anterior se cancela y su resultado
+    se descarta; la vigente se entrega apenas termina.
+    `al_cambiar_estado(ocupado)` avisa cuando hay o deja de haber tareas pendientes.
+    """
+
+    def __init__(self, programar, workers: int = 2, al_cambiar_estado=None,
+                 intervalo_ms: int = INTERVALO_MS):
+        self._programar = programar
+        self._ejecutor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="despachador")
+        self._resultados = queue.Queue()
+        self._secuencia = itertools.count()
+        self._orden = deque()
+        self._tareas = {}
+        self._listos = {}
+        self._al_cambiar_estado = al_cambiar_estado
+        self._intervalo_ms = intervalo_ms
+        self._ocupado = False
+        self._cerrado = False
+
+    @property
+    def ocupado(self) -> bool:
+        return bool(self._tareas)
+
+    def iniciar(self):
+        self._programar(self._intervalo_ms, self._revisar)
+
+    def enviar(self, funcion, *args, al_terminar=None, al_fallar=None, canal: str = None) -> int:
+        """
+        Ejecuta `funcion(*args)` en segundo plano. Al terminar, se llama
+        `al_terminar(resultado)` o `al_fallar(excepcion)` en el hilo de la interfaz.
+        Retorna el número de la tarea.
+        """
+        if canal is not None:
+            self.cancelar(canal)
+        numero = next(self._secuencia)
+        futuro = self._ejecutor.submit(funcion, *args)
+        self._tareas[numero] = (futuro, canal, al_terminar, al_fallar)
+        if canal is None:
+            self._orden.append(numero)
+        futuro.add_done_callback(lambda f, n=numero: self._resultados.put((n, f)))
+        self._avisar_estado()
+        return numero
+
+    def cancelar(self, canal: str):
+        """
+        Cancela las tareas pendientes del canal; si alguna ya está corriendo,
+        su resultado se descartará.
+        """
+        for numero, (futuro, canal_tarea, _, _) in list(self._tareas.items()):
+            if canal_tarea == canal:
+                futuro.cancel()
+                del self._tareas[numero]
+                self._listos.pop(numero, None)
+        self._avisar_estado()
+
+    def cerrar(self):
+        self._cerrado = True
+        self._ejecutor.shutdown(wait=False, cancel_futures=True)
+
+    def _revisar(self):
+        if self._cerrado:
+            return
+        while True:
+            try:
+                numero, futuro = self._resultados.get_nowait()
+            except queue.Empty:
+                break
+            if numero in self._tareas:
+                self._listos[numero] = futuro
+        self._entregar()
+        self._programar(self._intervalo_ms, self._revisar)
+
+    def _entregar(self):
+        for numero in [n for n in self._listos if self._tareas[n][1] is not None]:
+            self._completar(numero)
+        # Una tarea sin canal solo se entrega cuando todas las anteriores ya se entregaron.
+        while self._orden and self._orden[0] in self._listos:
+            self._completar(self._orden.popleft())
+        self._avisar_estado()
+
+    def _completar(self, numero: int):
+        _, _, al_terminar, al_fallar = self._tareas.pop(numero)
+        futuro = self._listos.pop(numero)
+        error = futuro.exception()
+        if error is None:
+            if al_terminar is not None:
+                al_terminar(futuro.result())
+        elif al_fallar is not None:
+            al_fallar(error)
+        else:
+            print(f"Error en tarea en segundo plano: {error!r}")
+
+    def _avisar_estado(self):
+        if self.ocupado != self._ocupado:
+            self._ocupado = self.ocupado
+            if self._al_cambiar_estado is not None:
+                self._al_cambiar_estado(self._ocupado)
@@ -0,0 +1,257 @@
+"""
+Evaluación y reentrenamiento del clasificador de intención, fuera de línea.
+
+Compara varias configuraciones de vectorizador y modelo (`CONFIGURACIONES`)
+con validación cruzada estratificada de k pliegues sobre un corpus de frases
+etiquetadas; los pliegues de todas las configuraciones se reparten entre
+`--n-jobs` procesos. Para cada configuración reporta la exactitud y, con el
+modelo entrenado sobre todo el corpus, la latencia de predecir una frase y
+el tamaño del modelo serializado; además, cuántas preguntas de los botones
+de sugerencia (`PREGUNTAS_SUGERENCIAS`) acierta un modelo que no las vio
+al entrenar.
+
+Con --exportar la mejor se entrena con todo el corpus y se guarda como el
+artefacto que carga el clasificador (modelos/intencion.pkl). Solo se eligen
+configuraciones que aciertan todas las preguntas de los botones; de ellas,
+la más exacta o, entre las que quedan a menos de --tolerancia, la más
+pequeña y luego la primera por nombre; la latencia no decide porque varía
+entre corridas. El artefacto guarda el corpus y la configuración: el
+servidor lo usa aunque el corpus no sea el del repositorio (y avisa de la
+diferencia) y no lo reemplaza; para volver al modelo del repositorio basta
+con borrarlo.
+
+Uso:
+    python evaluacion.py                                   # corpus del repositorio, 5 pliegues
+    python evaluacion.py --pliegues 10 --n-jobs 4 --salida evaluacion.json
+    python evaluacion.py --corpus frases.csv --exportar
+"""
+
+import argparse
+import json
+import os
+import pickle
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from intencion import (CONFIGURACION, PREGUNTAS_SUGERENCIAS, RUTA_MODELO, cargar_corpus, entrenar_modelo,
+                       frases_por_defecto, guardar_modelo, huella_modelo)
+
+PLIEGUES = 5
+SEMILLA = 0
+TOLERANCIA = 0.01
+REPETICIONES_LATENCIA = 300
+
+# Configuraciones candidatas (ver `intencion.entrenar_modelo`); "caracteres_logistica" es la que usa el clasificador
+CONFIGURACIONES = {
+    "palabras_logistica": {"ngram_range": [1, 2], "max_iter": 500},
+    "unigramas_logistica": {"ngram_range": [1, 1], "max_iter": 500},
+    "palabras_svm": {"ngram_range": [1, 2], "max_iter": 5000, "modelo": "svm"},
+    "palabras_bayes": {"ngram_range": [1, 2], "max_iter": 500, "modelo": "bayes", "alpha": 0.3},
+    "caracteres_logistica": CONFIGURACION,
+    "caracteres_svm": {"analizador": "char_wb", "ngram_range": [2, 4], "max_iter": 5000, "modelo": "svm"},
+}
+
+
+def pliegues_estratificados(etiquetas, pliegues: int = PLIEGUES, semilla: int = SEMILLA) -> list:
+    """
+    Lista de (índices de entrenamiento, índices de prueba) con la misma
+    proporción de cada intención en todos los pliegues.
+    """
+    from sklearn.model_selection import StratifiedKFold
+
+    division = StratifiedKFold(n_splits=pliegues, shuffle=True, random_state=semilla)
+    return [(entrenamiento.tolist(), prueba.tolist())
+            for entrenamiento, prueba in division.split(np.zeros(len(etiquetas)), etiquetas)]
+
+
+def evaluar_pliegue(frases, configuracion: dict, entrenamiento: list, prueba: list) -> dict:
+    """
+    Entrena con las frases de `entrenamiento` y clasifica las de `prueba`;
+    retorna los aciertos y las frases mal clasificadas.
+    """
+    vectorizer, clf = entrenar_modelo([frases[i] for i in entrenamiento], configuracion)
+    textos = [frases[i][0] for i in prueba]
+    predichas = clf.predict(vectorizer.transform(textos))
+    errores = [(texto, frases[i][1], str(predicha))
+               for i, texto, predicha in zip(prueba, textos, predichas) if predicha != frases[i][1]]
+    return {"frases": len(prueba), "aciertos": len(prueba) - len(errores), "errores": errores}
+
+
+def _evaluar_tarea(tarea):
+    nombre, frases, configuracion, entrenamiento, prueba = tarea
+    return nombre, evaluar_pliegue(frases, configuracion, entrenamiento, prueba)
+
+
+def validar(frases, configuraciones: dict = CONFIGURACIONES, pliegues: int = PLIEGUES,
+            n_jobs: int = 1, semilla: int = SEMILLA) -> dict:
+    """
+    Validación cruzada de cada configuración con los mismos pliegues.
+    Retorna {nombre: {"exactitud", "desviacion", "por_pliegue", "errores"}}.
+    `n_jobs` es el número de procesos (-1 para uno por núcleo).
+    """
+    divisiones = pliegues_estratificados([etiqueta for _, etiqueta in frases], pliegues, semilla)
+    tareas = [(nombre, frases, configuracion, entrenamiento, prueba)
+              for nombre, configuracion in configuraciones.items()
+              for entrenamiento, prueba in divisiones]
+    procesos = (os.cpu_count() or 1) if n_jobs == -1 else max(1, n_jobs)
+    if procesos > 1:
+        with ProcessPoolExecutor(min(procesos, len(tareas))) as pool:
+            salidas = list(pool.map(_evaluar_tarea, tareas))
+    else:
+        salidas = [_evaluar_tarea(tarea) for tarea in tareas]
+
+    resultados = {}
+    for nombre in configuraciones:
+        por_pliegue = [salida for clave, salida in salidas if clave == nombre]
+        exactitudes = [p["aciertos"] / p["frases"] for p in por_pliegue]
+        resultados[nombre] = {
+            "exactitud": float(np.mean(exactitudes)),
+            "desviacion": float(np.std(exactitudes)),
+            "por_pliegue": [round(e, 4) for e in exactitudes],
+            "errores": [error for p in por_pliegue for error in p["errores"]],
+        }
+    return resultados
+
+
+def medir_modelo(frases, configuracion: dict, repeticiones: int = REPETICIONES_LATENCIA) -> dict:
+    """
+    Entrena con todo el corpus y mide lo que importa en el servidor: la
+    latencia de clasificar una frase (como `predecir_intencion` sin caché),
+    el costo por frase en lote y el tamaño del modelo serializado. Las
+    preguntas de los botones se clasifican con otro modelo entrenado sin
+    ellas, para que el acierto no dependa de haberlas memorizado.
+    """
+    inicio = time.perf_counter()
+    vectorizer, clf = entrenar_modelo(frases, configuracion)
+    entrenamiento = time.perf_counter() - inicio
+
+    textos = [texto for texto, _ in frases]
+    tiempos = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        clf.predict(vectorizer.transform([textos[i % len(textos)]]))
+        tiempos.append(time.perf_counter() - inicio)
+    inicio = time.perf_counter()
+    clf.predict(vectorizer.transform(textos))
+    lote = time.perf_counter() - inicio
+
+    preguntas = [pregunta for pregunta, _ in PREGUNTAS_SUGERENCIAS]
+    vectorizer_sin, clf_sin = entrenar_modelo([par for par in frases if par[0] not in preguntas], configuracion)
+    fallidas = [(pregunta, esperada, str(predicha)) for (pregunta, esperada), predicha
+                in zip(PREGUNTAS_SUGERENCIAS, clf_sin.predict(vectorizer_sin.transform(preguntas)))
+                if predicha != esperada]
+
+    return {
+        "sugerencias_fallidas": fallidas,
+        "latencia_p50_us": round(float(np.percentile(tiempos, 50)) * 1e6, 1),
+        "latencia_p99_us": round(float(np.percentile(tiempos, 99)) * 1e6, 1),
+        "lote_us_por_frase": round(lote / len(textos) * 1e6, 1),
+        "tamaño_kb": round(len(pickle.dumps((vectorizer, clf), protocol=pickle.HIGHEST_PROTOCOL)) / 1024, 1),
+        "entrenamiento_ms": round(entrenamiento * 1000, 1),
+    }
+
+
+def elegir(resultados: dict, tolerancia: float = TOLERANCIA) -> str:
+    """
+    Entre las configuraciones que aciertan todas las preguntas de los
+    botones, nombre de la más exacta; entre las que quedan a menos de
+    `tolerancia` de ella, la más pequeña y, si empatan, la primera por
+    nombre. La latencia no se usa porque varía de una corrida a otra.
+    Lanza ValueError si ninguna acierta todos los botones.
+    """
+    validas = {nombre: r for nombre, r in resultados.items() if not r["sugerencias_fallidas"]}
+    if not validas:
+        raise ValueError("Ninguna configuración clasifica bien todas las preguntas de los botones.")
+    mejor = max(r["exactitud"] for r in validas.values())
+    candidatas = [nombre for nombre, r in validas.items() if r["exactitud"] >= mejor - tolerancia]
+    return min(candidatas, key=lambda nombre: (resultados[nombre]["tamaño_kb"], nombre))
+
+
+def exportar(frases, configuracion: dict, ruta: str = RUTA_MODELO) -> str:
+    """
+    Entrena la configuración con todo el corpus y la guarda como artefacto
+    exportado del clasificador; retorna su huella.
+    """
+    huella = huella_modelo(frases, configuracion)
+    guardar_modelo(ruta, huella, *entrenar_modelo(frases, configuracion), configuracion, frases)
+    return huella
+
+
+def _tabla(resultados: dict, elegida: str) -> str:
+    filas = [f"{'configuración':<22} {'exactitud':>15} {'p50 µs':>8} {'p99 µs':>8} "
+             f"{'lote µs':>8} {'KB':>7} {'entrenar ms':>11} {'botones':>8}"]
+    for nombre, r in sorted(resultados.items(), key=lambda par: -par[1]["exactitud"]):
+        marca = " *" if nombre == elegida else ""
+        filas.append(f"{nombre:<22} {r['exactitud']:>8.1%} ± {r['desviacion']:>4.1%} "
+                     f"{r['latencia_p50_us']:>8.1f} {r['latencia_p99_us']:>8.1f} {r['lote_us_por_frase']:>8.1f} "
+                     f"{r['tamaño_kb']:>7.1f} {r['entrenamiento_ms']:>11.1f} "
+                     f"{len(PREGUNTAS_SUGERENCIAS) - len(r['sugerencias_fallidas']):>4}/{len(PREGUNTAS_SUGERENCIAS)}"
+                     f"{marca}")
+    return "\n".join(filas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evalúa configuraciones del clasificador de intención.")
+    parser.add_argument("--corpus", help="CSV de frases etiquetadas (por defecto el del repositorio).")
+    parser.add_argument("--pliegues", type=int, default=PLIEGUES)
+    parser.add_argument("--n-jobs", type=int, default=1, help="Procesos para la validación (-1: uno por núcleo).")
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    parser.add_argument("--configuraciones", nargs="+", choices=list(CONFIGURACIONES),
+                        help="Evaluar solo estas configuraciones.")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA,
+                        help="Exactitud que se cede por un modelo más pequeño.")
+    parser.add_argument("--salida", help="Guardar los resultados en JSON.")
+    parser.add_argument("--exportar", action="store_true", help="Guardar la mejor como artefacto del clasificador.")
+    parser.add_argument("--ruta", default=RUTA_MODELO, help="Ruta del artefacto exportado.")
+    args = parser.parse_args()
+
+    frases = cargar_corpus(args.corpus) if args.corpus else frases_por_defecto()
+    menor_clase = min(Counter(etiqueta for _, etiqueta in frases).values())
+    if menor_clase < 2:
+        parser.error("Cada intención necesita al menos dos frases para la validación cruzada.")
+    pliegues = min(args.pliegues, menor_clase)
+    if pliegues < args.pliegues:
+        print(f"Se usan {pliegues} pliegues: la intención con menos frases tiene {menor_clase}.")
+    configuraciones = {nombre: CONFIGURACIONES[nombre] for nombre in args.configuraciones or CONFIGURACIONES}
+
+    inicio = time.perf_counter()
+    resultados = validar(frases, configuraciones, pliegues, args.n_jobs, args.semilla)
+    duracion = time.perf_counter() - inicio
+    print(f"{len(frases)} frases, {len(Counter(e for _, e in frases))} intenciones, "
+          f"{pliegues} pliegues en {duracion:.1f} s.\n")
+    # La latencia se mide al final y en este proceso, sin competir con la validación
+    for nombre, configuracion in configuraciones.items():
+        resultados[nombre].update(medir_modelo(frases, configuracion))
+
+    try:
+        elegida = elegir(resultados, args.tolerancia)
+    except ValueError as e:
+        print(_tabla(resultados, None))
+        for nombre, r in resultados.items():
+            for pregunta, esperada, predicha in r["sugerencias_fallidas"]:
+                print(f"  {nombre}: {pregunta!r}: {predicha} (esperada {esperada})")
+        raise SystemExit(str(e))
+    print(_tabla(resultados, elegida))
+    print(f"\nMejor: {elegida} ({json.dumps(configuraciones[elegida], ensure_ascii=False)})")
+    errores = resultados[elegida]["errores"]
+    if errores:
+        print(f"Frases mal clasificadas ({len(errores)}):")
+        for texto, esperada, predicha in errores[:20]:
+            print(f"  {texto!r}: {predicha} (esperada {esperada})")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"frases": len(frases), "pliegues": pliegues, "semilla": args.semilla, "elegida": elegida,
+                       "configuraciones": configuraciones, "resultados": resultados},
+                      f, ensure_ascii=False, indent=2)
+        print(f"Resultados guardados en '{args.salida}'.")
+    if args.exportar:
+        huella = exportar(frases, configuraciones[elegida], args.ruta)
+        print(f"Modelo '{elegida}' guardado en '{args.ruta}' ({huella[:12]}).")
+
+
+if __name__ == "__main__":
+    main()
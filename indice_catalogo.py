@@ -0,0 +1,511 @@
+"""
+Índice de agregados del catálogo de café.
+
+Se construye una sola vez al cargar el dataset y las funciones de respuesta
+lo consultan en lugar de recorrer el DataFrame completo en cada pregunta.
+Se actualiza de forma incremental cuando se agregan o eliminan filas, y
+también puede llenarse bloque a bloque sin tener el CSV completo en memoria.
+"""
+
+from collections import Counter
+
+import pandas as pd
+
+from carbono import COLUMNAS_SUMAS, tabla_factores
+from catalogo import a_float64
+from coincidencias import BuscadorAproximado, BuscadorPatrones, normalizar
+
+
+def _conteos(serie: pd.Series):
+    # Con columnas categóricas value_counts también lista las categorías sin filas.
+    return serie[serie > 0].items()
+
+
+class _Agregado:
+    """
+    Multiconjunto de valores numéricos con suma, cuenta y extremos cacheados.
+    El mínimo y el máximo solo se recalculan cuando se elimina el valor extremo.
+    """
+
+    __slots__ = ("valores", "suma", "cuenta", "_min", "_max")
+
+    def __init__(self):
+        self.valores = Counter()
+        self.suma = 0.0
+        self.cuenta = 0
+        self._min = None
+        self._max = None
+
+    def agregar(self, valor: float, veces: int = 1):
+        self.valores[valor] += veces
+        self.suma += valor * veces
+        self.cuenta += veces
+        if self._min is not None and valor < self._min:
+            self._min = valor
+        if self._max is not None and valor > self._max:
+            self._max = valor
+        if self.cuenta == veces:
+            self._min = self._max = valor
+
+    def quitar(self, valor: float, veces: int = 1):
+        actuales = self.valores.get(valor, 0)
+        veces = min(veces, actuales)
+        if veces == 0:
+            return
+        if actuales == veces:
+            del self.valores[valor]
+        else:
+            self.valores[valor] = actuales - veces
+        self.suma -= valor * veces
+        self.cuenta -= veces
+        if valor == self._min:
+            self._min = None
+        if valor == self._max:
+            self._max = None
+
+    @property
+    def vacio(self) -> bool:
+        return self.cuenta == 0
+
+    @property
+    def minimo(self):
+        if self._min is None and self.valores:
+            self._min = min(self.valores)
+        return self._min
+
+    @property
+    def maximo(self):
+        if self._max is None and self.valores:
+            self._max = max(self.valores)
+        return self._max
+
+    @property
+    def promedio(self):
+        return self.suma / self.cuenta if self.cuenta else None
+
+    def copia(self) -> "_Agregado":
+        nuevo = _Agregado()
+        nuevo.valores = self.valores.copy()
+        nuevo.suma, nuevo.cuenta, nuevo._min, nuevo._max = self.suma, self.cuenta, self._min, self._max
+        return nuevo
+
+
+class _AgregadoSimple:
+    """
+    Mínimo, máximo, suma y cuenta sin guardar los valores: ocupa memoria
+    constante por grupo, pero no permite eliminar valores.
+    """
+
+    __slots__ = ("suma", "cuenta", "minimo", "maximo")
+
+    def __init__(self):
+        self.suma = 0.0
+        self.cuenta = 0
+        self.minimo = None
+        self.maximo = None
+
+    def combinar(self, minimo: float, maximo: float, suma: float, cuenta: int):
+        self.minimo = minimo if self.minimo is None else min(self.minimo, minimo)
+        self.maximo = maximo if self.maximo is None else max(self.maximo, maximo)
+        self.suma += suma
+        self.cuenta += cuenta
+
+    @property
+    def vacio(self) -> bool:
+        return self.cuenta == 0
+
+    @property
+    def promedio(self):
+        return self.suma / self.cuenta if self.cuenta else None
+
+    def copia(self) -> "_AgregadoSimple":
+        nuevo = _AgregadoSimple()
+        nuevo.combinar(self.minimo, self.maximo, self.suma, self.cuenta)
+        return nuevo
+
+
+def _copiar(valor):
+    """
+    Copia los diccionarios, contadores, listas y agregados del índice; es
+    mucho más rápida que copy.deepcopy porque conoce sus tipos.
+    """
+    if isinstance(valor, Counter):
+        return valor.copy()
+    if isinstance(valor, dict):
+        return {clave: _copiar(v) for clave, v in valor.items()}
+    if isinstance(valor, list):
+        return list(valor)
+    if isinstance(valor, (_Agregado, _AgregadoSimple)):
+        return valor.copia()
+    return valor
+
+
+class IndiceCatalogo:
+    """
+    Agregados del catálogo listos para responder en O(1):
+    precio mínimo/máximo/promedio por variedad y por variedad-productor,
+    mejor puntaje en taza, bonos de carbono acumulados por productor,
+    productores y propiedades de cada variedad y años de cosecha.
+
+    Con `permite_eliminar=False` los agregados numéricos solo guardan mínimo,
+    máximo, suma y cuenta, así la memoria depende del número de grupos y no
+    del número de filas; es el modo que usa la carga por bloques.
+    """
+
+    def __init__(self, df: pd.DataFrame = None, permite_eliminar: bool = True):
+        self.permite_eliminar = permite_eliminar
+        self._variedades = Counter()
+        self._años = Counter()
+        self._lugares = Counter()
+        self._precios = {}
+        self._precios_productor = {}
+        self._rankings = {}
+        self._productores = {}
+        self._propiedades = {}
+        self._bonos = {}
+        self._carbono = {}
+        self._creditos_registrados = 0
+        self._invalidar()
+        if df is not None:
+            self.agregar_filas(df)
+
+    # --- Mantenimiento incremental ---
+
+    def agregar_filas(self, filas: pd.DataFrame):
+        """
+        Incorpora las filas al índice. Solo se cuentan las filas con variedad.
+        """
+        self._aplicar(filas, signo=1)
+
+    def eliminar_filas(self, filas: pd.DataFrame):
+        """
+        Retira del índice filas que se habían agregado previamente.
+        """
+        if not self.permite_eliminar:
+            raise ValueError("Este índice se construyó por bloques y no permite eliminar filas.")
+        self._aplicar(filas, signo=-1)
+
+    def copia(self) -> "IndiceCatalogo":
+        """
+        Copia independiente de los agregados (sin las consultas cacheadas),
+        para aplicarle cambios mientras otros hilos siguen leyendo este.
+        """
+        nuevo = IndiceCatalogo(permite_eliminar=self.permite_eliminar)
+        for nombre, valor in vars(self).items():
+            if nombre not in ('permite_eliminar', '_cache'):
+                setattr(nuevo, nombre, _copiar(valor))
+        return nuevo
+
+    @classmethod
+    def desde_bloques(cls, bloques):
+        """
+        Construye un índice de solo agregado a partir de bloques de filas.
+        """
+        indice = cls(permite_eliminar=False)
+        for bloque in bloques:
+            indice.agregar_filas(bloque)
+        return indice
+
+    def _aplicar(self, filas: pd.DataFrame, signo: int):
+        filas = filas.dropna(subset=['coffee_variety'])
+        if filas.empty:
+            return
+        filas = filas.assign(**{col: a_float64(filas[col]) for col in ('price', 'ranking', 'carbon_credits')})
+
+        for variedad, veces in _conteos(filas['coffee_variety'].value_counts()):
+            self._contar(self._variedades, variedad, signo * veces)
+
+        for año, veces in _conteos(filas['year'].dropna().value_counts()):
+            self._contar(self._años, año, signo * veces)
+
+        for lugar, veces in _conteos(filas['location'].dropna().value_counts()):
+            self._contar(self._lugares, lugar, signo * veces)
+
+        self._acumular(self._precios, filas, ['coffee_variety'], 'price', signo)
+        self._acumular(self._precios_productor, filas, ['coffee_variety', 'name'], 'price', signo)
+        self._acumular(self._rankings, filas, ['coffee_variety'], 'ranking', signo)
+
+        for columna, grupos in (('name', self._productores), ('properties', self._propiedades)):
+            conteos = filas.dropna(subset=[columna]).groupby('coffee_variety', observed=True)[columna].value_counts()
+            for (variedad, valor), veces in _conteos(conteos):
+                self._contar(grupos.setdefault(variedad, Counter()), valor, signo * int(veces))
+                if not grupos[variedad]:
+                    del grupos[variedad]
+
+        self._creditos_registrados += signo * int(filas['carbon_credits'].count())
+        grupos_bonos = filas.groupby('name', observed=True)['carbon_credits']
+        filas_por_productor = grupos_bonos.size()
+        for productor, suma in grupos_bonos.sum().items():
+            total = self._bonos.setdefault(productor, [0.0, 0])
+            total[0] += signo * float(suma)
+            total[1] += signo * int(filas_por_productor[productor])
+            if total[1] <= 0:
+                del self._bonos[productor]
+
+        if 'kg' in filas.columns:
+            self._acumular_carbono(filas, signo)
+
+        self._invalidar()
+
+    def _acumular_carbono(self, filas: pd.DataFrame, signo: int):
+        """
+        Sumas por (variedad, productor) para los factores de bonos por libra:
+        bonos, kilos, filas y la suma y suma de cuadrados de bonos/kilo por fila.
+        """
+        kg = a_float64(filas['kg'])
+        creditos = filas['carbon_credits']
+        validas = (kg > 0) & creditos.notna() & filas['name'].notna()
+        if not validas.any():
+            return
+        por_kg = creditos[validas] / kg[validas]
+        datos = pd.DataFrame({
+            'coffee_variety': filas.loc[validas, 'coffee_variety'],
+            'name': filas.loc[validas, 'name'],
+            'creditos': creditos[validas],
+            'kg': kg[validas],
+            'por_kg': por_kg,
+            'por_kg2': por_kg ** 2,
+        })
+        sumas = datos.groupby(['coffee_variety', 'name'], observed=True).agg(
+            creditos=('creditos', 'sum'), kg=('kg', 'sum'), filas=('kg', 'size'),
+            por_kg=('por_kg', 'sum'), por_kg2=('por_kg2', 'sum'))
+        for par, *valores in sumas.itertuples(name=None):
+            total = self._carbono.setdefault(par, [0.0] * len(COLUMNAS_SUMAS))
+            for i, valor in enumerate(valores):
+                total[i] += signo * float(valor)
+            if total[2] <= 0:
+                del self._carbono[par]
+
+    @staticmethod
+    def _contar(contador: Counter, clave, veces: int):
+        contador[clave] += veces
+        if contador[clave] <= 0:
+            del contador[clave]
+
+    def _acumular(self, grupos: dict, filas: pd.DataFrame, claves: list, columna: str, signo: int):
+        if not self.permite_eliminar:
+            resumen = filas.groupby(claves, observed=True)[columna].agg(['min', 'max', 'sum', 'count'])
+            for llave, (minimo, maximo, suma, cuenta) in resumen[resumen['count'] > 0].iterrows():
+                grupo = llave if len(claves) > 1 else (llave[0] if isinstance(llave, tuple) else llave)
+                grupos.setdefault(grupo, _AgregadoSimple()).combinar(
+                    float(minimo), float(maximo), float(suma), int(cuenta))
+            return
+
+        conteos = filas.dropna(subset=claves + [columna]).groupby(claves, observed=True)[columna].value_counts()
+        for llave, veces in _conteos(conteos):
+            grupo = llave[0] if len(claves) == 1 else llave[:-1]
+            valor = llave[-1]
+            agregado = grupos.setdefault(grupo, _Agregado())
+            if signo > 0:
+                agregado.agregar(float(valor), int(veces))
+            else:
+                agregado.quitar(float(valor), int(veces))
+                if agregado.vacio:
+                    del grupos[grupo]
+
+    def _invalidar(self):
+        self._cache = {}
+
+    def _cacheado(self, clave: str, calcular):
+        if clave not in self._cache:
+            self._cache[clave] = calcular()
+        return self._cache[clave]
+
+    # --- Consultas ---
+
+    @property
+    def variedades(self) -> list:
+        return self._cacheado('variedades', lambda: sorted(self._variedades))
+
+    @property
+    def años(self) -> list:
+        return self._cacheado('años', lambda: sorted(self._años))
+
+    @property
+    def lugares(self) -> list:
+        return self._cacheado('lugares', lambda: sorted(self._lugares))
+
+    def variedad_normalizada(self, nombre: str):
+        """
+        Retorna el nombre canónico de una variedad escrita con otras
+        mayúsculas o tildes, o None si no existe.
+        """
+        por_nombre = self._cacheado('variedades_normalizadas',
+                                    lambda: {normalizar(v): v for v in self.variedades})
+        return por_nombre.get(normalizar(nombre))
+
+    def productor_normalizado(self, nombre: str):
+        """
+        Retorna el nombre canónico de un productor escrito con otras
+        mayúsculas o tildes, o None si no existe.
+        """
+        por_nombre = self._cacheado('productores_normalizados',
+                                    lambda: {normalizar(p): p for nombres in self._productores.values()
+                                             for p in nombres})
+        return por_nombre.get(normalizar(nombre))
+
+    def variedades_mencionadas(self, texto: str) -> list:
+        """
+        Variedades cuyo nombre aparece en el texto, en orden alfabético.
+        """
+        buscador = self._cacheado('buscador_variedades', lambda: BuscadorPatrones(self.variedades))
+        return sorted(buscador.buscar(texto))
+
+    def entidades_mencionadas(self, texto: str) -> dict:
+        """
+        Variedades, productores y lugares mencionados en el texto aunque
+        estén mal escritos: {"variedad": [...], "productor": [...],
+        "lugar": [...]}, cada lista del nombre más parecido al menos.
+        """
+        def buscadores():
+            productores = {p for nombres in self._productores.values() for p in nombres}
+            return {"variedad": BuscadorAproximado(self.variedades),
+                    "productor": BuscadorAproximado(sorted(productores)),
+                    "lugar": BuscadorAproximado(self.lugares)}
+        return {tipo: [nombre for nombre, _ in buscador.buscar(texto)]
+                for tipo, buscador in self._cacheado('buscadores_aproximados', buscadores).items()}
+
+    def variedades_de(self, productor: str) -> list:
+        """
+        Variedades que cultiva el productor, en orden alfabético.
+        """
+        return [v for v in self.variedades if productor in self._productores.get(v, ())]
+
+    def productores(self, variedad: str) -> list:
+        return sorted(self._productores.get(variedad, ()))
+
+    def cultiva(self, productor: str, variedad: str) -> bool:
+        """
+        Si el catálogo tiene filas de la variedad con ese productor.
+        """
+        return productor in self._productores.get(variedad, ())
+
+    def propiedades(self, variedad: str) -> list:
+        return sorted(self._propiedades.get(variedad, ()))
+
+    def rango_precio(self, variedad: str, productor: str = None):
+        """
+        Retorna (mínimo, máximo) del precio de la variedad, o de la variedad
+        de un productor concreto si se indica, o None si no hay precios.
+        """
+        if productor is None:
+            agregado = self._precios.get(variedad)
+        else:
+            agregado = self._precios_productor.get((variedad, productor))
+        if agregado is None or agregado.vacio:
+            return None
+        return agregado.minimo, agregado.maximo
+
+    def precio_promedio(self, variedad: str, productor: str = None):
+        """
+        Precio promedio de la variedad, o de la variedad de un productor
+        concreto si se indica. Retorna None si no hay precios.
+        """
+        if productor is None:
+            agregado = self._precios.get(variedad)
+        else:
+            agregado = self._precios_productor.get((variedad, productor))
+        return agregado.promedio if agregado is not None else None
+
+    def tabla_precios(self):
+        """
+        Retorna (por_productor, por_variedad): Series de precios promedio
+        indexadas por (variedad, productor) y por variedad, para cotizar
+        muchas líneas de una vez.
+        """
+        def calcular():
+            promedios = {clave: a.promedio for clave, a in self._precios_productor.items() if not a.vacio}
+            por_productor = pd.Series(
+                list(promedios.values()), dtype=float,
+                index=pd.MultiIndex.from_tuples(list(promedios), names=['variedad', 'productor']))
+            por_variedad = pd.Series({v: a.promedio for v, a in self._precios.items() if not a.vacio},
+                                     dtype=float)
+            return por_productor, por_variedad
+        return self._cacheado('tabla_precios', calcular)
+
+    def sumas_carbono(self) -> pd.DataFrame:
+        """
+        Sumas de bonos y kilos por (variedad, productor); ver `carbono.tabla_factores`.
+        """
+        return pd.DataFrame(list(self._carbono.values()), columns=COLUMNAS_SUMAS, dtype=float,
+                            index=pd.MultiIndex.from_tuples(list(self._carbono), names=['variedad', 'productor']))
+
+    def tabla_carbono(self):
+        """
+        (por_productor, por_variedad, general) con los bonos por libra y su
+        desviación, calculados una vez por versión del índice.
+        """
+        return self._cacheado('tabla_carbono', lambda: tabla_factores(self.sumas_carbono()))
+
+    def factor_carbono(self, variedad: str, productor: str = None):
+        """
+        Retorna (factor, desviacion) de bonos por libra del productor para
+        esa variedad, o de la variedad, o del catálogo si no hay datos más
+        específicos.
+        """
+        def calcular():
+            por_productor, por_variedad, general = self.tabla_carbono()
+            return (dict(zip(por_productor.index, por_productor.itertuples(index=False, name=None))),
+                    dict(zip(por_variedad.index, por_variedad.itertuples(index=False, name=None))),
+                    tuple(general))
+        por_productor, por_variedad, general = self._cacheado('factores_carbono', calcular)
+        factor, desviacion = por_productor.get((variedad, productor), (float('nan'),) * 2)
+        for respaldo in (por_variedad.get(variedad, (float('nan'),) * 2), general):
+            factor = respaldo[0] if factor != factor else factor
+            desviacion = respaldo[1] if desviacion != desviacion else desviacion
+        return factor, desviacion
+
+    def variedad_precio_max(self):
+        """
+        Retorna (variedad, precio) del precio más alto registrado, o None.
+        """
+        return self._cacheado('precio_max', lambda: self._extremo(self._precios, max, 'maximo'))
+
+    def variedad_precio_min(self):
+        """
+        Retorna (variedad, precio) del precio más bajo registrado, o None.
+        """
+        return self._cacheado('precio_min', lambda: self._extremo(self._precios, min, 'minimo'))
+
+    def variedad_mejor_ranking(self):
+        """
+        Retorna (variedad, puntaje) del mejor puntaje en taza, o None.
+        """
+        return self._cacheado('ranking_max', lambda: self._extremo(self._rankings, max, 'maximo'))
+
+    def mejor_ranking(self, variedad: str):
+        agregado = self._rankings.get(variedad)
+        return agregado.maximo if agregado is not None else None
+
+    def ranking_promedio(self):
+        def calcular():
+            suma = sum(a.suma for a in self._rankings.values())
+            cuenta = sum(a.cuenta for a in self._rankings.values())
+            return suma / cuenta if cuenta else None
+        return self._cacheado('ranking_promedio', calcular)
+
+    def hay_bonos(self) -> bool:
+        return self._creditos_registrados > 0
+
+    def bonos_por_productor(self) -> list:
+        """
+        Lista de (productor, bonos acumulados) ordenada de mayor a menor.
+        """
+        return self._cacheado('bonos', lambda: sorted(
+            ((productor, total[0]) for productor, total in self._bonos.items()),
+            key=lambda par: par[1], reverse=True))
+
+    def productor_mas_bonos(self):
+        """
+        Retorna (productor, bonos acumulados) del mayor generador, o None.
+        """
+        bonos = self.bonos_por_productor()
+        return bonos[0] if bonos else None
+
+    @staticmethod
+    def _extremo(grupos: dict, elegir, atributo: str):
+        candidatos = [(getattr(a, atributo), variedad) for variedad, a in grupos.items() if not a.vacio]
+        if not candidatos:
+            return None
+        valor, variedad = elegir(candidatos, key=lambda par: par[0])
+        return variedad, valor
@@ -0,0 +1,483 @@
+"""
+Clasificador de intención de las preguntas de los usuarios.
+
+Las frases etiquetadas se leen de Dataset/frases_intencion.csv (columnas
+frase,intencion); si no existe se usan las de `train_phrases`.
+
+El vectorizador y el clasificador entrenados se guardan en un artefacto
+versionado por la huella de las frases de entrenamiento, la configuración y
+la versión de scikit-learn; solo se reentrena cuando esa huella cambia.
+
+Un artefacto exportado (con `evaluacion.py --exportar` o `construir
+--corpus`) guarda además sus frases y su configuración: el clasificador lo
+usa aunque difieran de las del repositorio y nunca lo sobrescribe, pero
+avisa de la diferencia (ver `diferencias_corpus`). Si cambia la versión de
+scikit-learn, lo reentrena en memoria con esas mismas frases y
+configuración.
+
+Uso:
+    python intencion.py construir      # genera el artefacto del modelo
+    python intencion.py medir          # compara arranque entrenando vs cargando
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import pickle
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from importlib.metadata import PackageNotFoundError, version
+
+from perfil import perfil
+
+RUTA_MODELO = os.path.join("modelos", "intencion.pkl")
+RUTA_CORPUS = os.path.join("Dataset", "frases_intencion.csv")
+TAMAÑO_CACHE = 1024
+
+# Hiperparámetros del vectorizador TF-IDF y del clasificador, elegidos con evaluacion.py:
+# n-gramas de caracteres, que toleran mejor las faltas de ortografía, y regresión logística
+CONFIGURACION = {"analizador": "char_wb", "ngram_range": [2, 4], "max_iter": 500, "C": 10.0}
+# Claves opcionales de una configuración y su valor si no se indican
+OPCIONES_POR_DEFECTO = {"analizador": "word", "modelo": "logistica", "C": 1.0, "alpha": 1.0}
+
+# Preguntas de los botones de sugerencia de main.py, en orden, con la intención que deben tener
+PREGUNTAS_SUGERENCIAS = [
+    ("¿Qué variedades de café tienen?", "variedad"),
+    ("¿Cuáles son los precios del café?", "precio"),
+    ("¿Cuál es el café más costoso?", "precio_max"),
+    ("¿Cuál es la variedad más económica?", "precio_min"),
+    ("¿Cuál es el café con la mejor tasa?", "calidad_max"),
+    ("¿Muéstrame los bonos de carbono de cada productor?", "bonos"),
+    ("¿De qué año es el café?", "año"),
+    ("¿Cuáles son las propiedades de los cafés?", "propiedad"),
+]
+
+# Lista de tuplas (frase_de_entrenamiento, etiqueta_intención)
+train_phrases = [
+    # ----------------- Variedad -----------------
+    ("¿Qué variedades de café tienen?", "variedad"),
+    ("Muéstrame los tipos de café disponibles", "variedad"),
+    ("Dime las clases de café que ofrecen", "variedad"),
+    ("¿Qué tipos de café manejan?", "variedad"),
+    ("Quiero saber qué variedades hay", "variedad"),
+
+    # ----------------- Precio general -----------------
+    ("¿Cuánto cuesta una libra de Caturra?", "precio"),
+    ("Precio del café Geisha", "precio"),
+    ("¿Cuál es el valor del café Typica?", "precio"),
+    ("¿A cuánto está el café Arcadia?", "precio"),
+    ("Dime el costo del café", "precio"),
+    ("¿Cuánto vale el café de mi región?", "precio"),
+    ("¿Cuál es el precio del café más caro?", "precio_max"),          # aquí va a precio_max
+    ("¿Cuál es el café más costoso?", "precio_max"),
+    ("¿Cuál es el café que vale más?", "precio_max"),
+    ("¿Qué variedad es la más cara?", "precio_max"),
+    ("Dime la variedad de café de mayor precio", "precio_max"),
+    ("¿Cuál es la variedad más económica?", "precio_min"),
+    ("¿Qué café es más barato?", "precio_min"),
+    ("Dime la variedad de menor precio", "precio_min"),
+    ("¿Cuál es el café con precio más bajo?", "precio_min"),
+
+    # ----------------- Calidad -----------------
+    ("¿Cuál es la calidad promedio del café?", "calidad"),
+    ("Dime el puntaje de calidad general", "calidad"),
+    ("¿Cómo califican sus cafés?", "calidad"),
+    ("¿Cuál es el puntaje de calidad?", "calidad"),
+    ("¿Qué score tienen sus cafés?", "calidad"),
+    ("¿Cuál es el café con mejor taza?", "calidad_max"),
+    ("Dime la variedad de café con mejor puntaje", "calidad_max"),
+    ("¿Qué café tiene la puntuación más alta?", "calidad_max"),
+    ("¿Cuál es el café mejor calificado?", "calidad_max"),
+
+    # ----------------- Año de cosecha -----------------
+    ("¿De qué año es el café?", "año"),
+    ("¿Qué cosechas tienen disponibles?", "año"),
+    ("¿En qué años se cosechó este café?", "año"),
+    ("Muéstrame los años de cosecha", "año"),
+    ("¿Tienen café del 2021?", "año"),
+    ("¿Hay café de 2022?", "año"),
+
+    # ----------------- Productor / Lugar -----------------
+    ("¿Quién produce el café Caturra?", "productor_lugar"),
+    ("¿Dónde se cultiva el café Geisha?", "productor_lugar"),
+    ("Dime los productores del café Typica", "productor_lugar"),
+    ("¿Qué región cultiva Arcadia?", "productor_lugar"),
+    ("Quiero saber el productor y la región", "productor_lugar"),
+
+    # ----------------- Propiedades organolépticas -----------------
+    ("¿Cuáles son las propiedades del café Caturra?", "propiedad"),
+    ("Dime las notas de sabor de Geisha", "propiedad"),
+    ("¿Qué características tiene el café Typica?", "propiedad"),
+    ("Muéstrame las propiedades organolépticas", "propiedad"),
+    ("¿Qué sabor tiene Arcadia?", "propiedad"),
+
+    # ----------------- Bonos de carbono -----------------
+    ("¿Qué bonos de carbono generan?", "bonos"),
+    ("Muéstrame los créditos de carbono por productor", "bonos"),
+    ("¿Cuántos bonos de carbono hay?", "bonos"),
+    ("Dime los bonos de carbono acumulados", "bonos"),
+    ("¿Quiénes generan más créditos de carbono?", "bonos_max"),
+    ("¿Qué productor genera mayor bonos de carbono?", "bonos_max"),
+    ("Dime el campesino con más bonos de carbono", "bonos_max"),
+    ("¿Quién genera el mayor bono de carbono?", "bonos_max"),
+
+    # ----------------- Saludo -----------------
+    ("Hola", "saludo"),
+    ("Buenos días", "saludo"),
+    ("Buenas tardes", "saludo"),
+    ("Saludos", "saludo"),
+    ("Qué tal", "saludo"),
+]
+
+
+def cargar_corpus(ruta: str = RUTA_CORPUS) -> list:
+    """
+    Lee las frases etiquetadas de un CSV con columnas frase,intencion y
+    retorna una lista de tuplas (frase, intención). Lanza ValueError si
+    faltan las columnas o no hay ninguna frase.
+    """
+    with open(ruta, encoding="utf-8", newline="") as f:
+        lector = csv.DictReader(f)
+        for columna in ("frase", "intencion"):
+            if columna not in (lector.fieldnames or ()):
+                raise ValueError(f"Falta la columna '{columna}' en '{ruta}'.")
+        frases = [(fila["frase"].strip(), fila["intencion"].strip()) for fila in lector
+                  if (fila["frase"] or "").strip() and (fila["intencion"] or "").strip()]
+    if not frases:
+        raise ValueError(f"'{ruta}' no tiene frases etiquetadas.")
+    return frases
+
+
+def frases_por_defecto() -> list:
+    """
+    Las frases del corpus si existe el archivo; si no, `train_phrases`.
+    """
+    return cargar_corpus(RUTA_CORPUS) if os.path.exists(RUTA_CORPUS) else list(train_phrases)
+
+
+def _version_sklearn() -> str:
+    try:
+        return version("scikit-learn")
+    except PackageNotFoundError:
+        return "desconocida"
+
+
+def huella_modelo(frases, configuracion: dict = CONFIGURACION) -> str:
+    """
+    Hash de las frases de entrenamiento, la configuración y la versión de
+    scikit-learn; identifica si un artefacto guardado sigue siendo válido.
+    """
+    contenido = json.dumps({
+        "frases": [list(par) for par in frases],
+        "configuracion": configuracion,
+        "sklearn": _version_sklearn(),
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+def entrenar_modelo(frases, configuracion: dict = CONFIGURACION):
+    """
+    Ajusta el vectorizador y el clasificador; retorna (vectorizer, clf).
+
+    Además de `ngram_range` y `max_iter`, la configuración puede indicar
+    `analizador` ("word" o "char_wb", n-gramas de caracteres) y `modelo`:
+    "logistica" (regresión logística, con `C`), "svm" (SVM lineal, con `C`)
+    o "bayes" (Naive Bayes complementario, con `alpha`).
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.naive_bayes import ComplementNB
+    from sklearn.svm import LinearSVC
+
+    opciones = {**OPCIONES_POR_DEFECTO, **configuracion}
+
+    # Separar textos y etiquetas
+    X_train = [texto for texto, etiqueta in frases]
+    y_train = [etiqueta for texto, etiqueta in frases]
+
+    # Vectorizador TF-IDF
+    vectorizer = TfidfVectorizer(lowercase=True, analyzer=opciones["analizador"],
+                                 ngram_range=tuple(opciones["ngram_range"]))
+    X_vect = vectorizer.fit_transform(X_train)
+
+    # Clasificador
+    if opciones["modelo"] == "logistica":
+        clf = LogisticRegression(max_iter=opciones["max_iter"], C=opciones["C"])
+    elif opciones["modelo"] == "svm":
+        clf = LinearSVC(C=opciones["C"], max_iter=opciones["max_iter"])
+    elif opciones["modelo"] == "bayes":
+        clf = ComplementNB(alpha=opciones["alpha"])
+    else:
+        raise ValueError(f"Modelo desconocido: '{opciones['modelo']}'.")
+    clf.fit(X_vect, y_train)
+    return vectorizer, clf
+
+
+def guardar_modelo(ruta: str, huella: str, vectorizer, clf, configuracion: dict = CONFIGURACION,
+                   frases=None):
+    """
+    Escribe el artefacto de forma atómica para que otro proceso nunca lea
+    un archivo a medias. Con `frases` el artefacto queda exportado: guarda
+    las frases con que se entrenó y el clasificador no lo reemplaza.
+    """
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "wb") as f:
+        artefacto = {"huella": huella, "configuracion": configuracion, "vectorizer": vectorizer, "clf": clf}
+        if frases is not None:
+            artefacto["frases"] = [list(par) for par in frases]
+        pickle.dump(artefacto, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporal, ruta)
+
+
+def leer_artefacto(ruta: str):
+    """
+    Diccionario del artefacto guardado en `ruta`, o None si no existe o no
+    se puede leer.
+    """
+    try:
+        with open(ruta, "rb") as f:
+            artefacto = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+    return artefacto if isinstance(artefacto, dict) else None
+
+
+def frases_artefacto(artefacto) -> list:
+    """
+    Frases con que se exportó el artefacto, o None si no es exportado.
+    """
+    frases = artefacto.get("frases") if artefacto else None
+    return [tuple(par) for par in frases] if frases else None
+
+
+def diferencias_corpus(artefacto, frases=None) -> dict:
+    """
+    Cuántas frases están solo en el artefacto exportado y cuántas solo en
+    `frases` (por defecto, las de `frases_por_defecto`); {} si coinciden o
+    si el artefacto no es exportado.
+    """
+    exportadas = frases_artefacto(artefacto)
+    if exportadas is None:
+        return {}
+    exportadas = set(exportadas)
+    actuales = {tuple(par) for par in (frases if frases is not None else frases_por_defecto())}
+    if exportadas == actuales:
+        return {}
+    return {"solo_artefacto": len(exportadas - actuales), "solo_repositorio": len(actuales - exportadas)}
+
+
+def cargar_modelo(ruta: str, frases=None):
+    """
+    Retorna (vectorizer, clf) del artefacto si existe y fue entrenado con
+    estas frases, con la configuración que trae guardada; si no, None.
+    Con `frases=None` valen las del artefacto exportado o, si no lo es, las
+    de `frases_por_defecto`.
+    """
+    return _modelo_artefacto(leer_artefacto(ruta), frases)
+
+
+def _modelo_artefacto(artefacto, frases=None):
+    if artefacto is None:
+        return None
+    if frases is None:
+        frases = frases_artefacto(artefacto) or frases_por_defecto()
+    configuracion = artefacto.get("configuracion", CONFIGURACION)
+    if artefacto.get("huella") != huella_modelo(frases, configuracion):
+        return None
+    return artefacto["vectorizer"], artefacto["clf"]
+
+
+class ClasificadorIntencion:
+    """
+    Vectorizador TF-IDF y clasificador lineal entrenados sobre frases etiquetadas
+    (por defecto, las de `frases_por_defecto`) con `CONFIGURACION`.
+
+    El modelo se carga en el primer uso: desde `ruta_modelo` si el artefacto
+    corresponde a las frases actuales, o entrenándolo y guardándolo si no.
+    Sin `frases`, un artefacto exportado se usa con sus propias frases y no
+    se sobrescribe; si no son las del repositorio se avisa y la diferencia
+    queda en `diferencias_corpus`. Con `ruta_modelo=None` siempre se entrena
+    en memoria.
+
+    Las predicciones recientes se guardan en una caché LRU de `tamaño_cache`
+    entradas (0 la desactiva), indexada por el texto en minúsculas y sin
+    espacios repetidos, que no cambia lo que ve el vectorizador.
+    """
+
+    def __init__(self, frases=None, ruta_modelo: str = RUTA_MODELO,
+                 tamaño_cache: int = TAMAÑO_CACHE):
+        self.frases = list(frases) if frases is not None else None
+        self.ruta_modelo = ruta_modelo
+        self.tamaño_cache = tamaño_cache
+        self._vectorizer = None
+        self._clf = None
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._lock_cache = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.diferencias_corpus = {}
+
+    def _cargar(self):
+        with self._lock:
+            if self._clf is not None:
+                return
+            with perfil.tramo("intencion.cargar_modelo"):
+                artefacto = leer_artefacto(self.ruta_modelo) if self.ruta_modelo else None
+                modelo = _modelo_artefacto(artefacto, self.frases)
+            exportadas = frases_artefacto(artefacto)
+            if exportadas is not None and self.frases is None:
+                self.diferencias_corpus = diferencias_corpus(artefacto)
+                if self.diferencias_corpus:
+                    print(f"Aviso: el artefacto exportado '{self.ruta_modelo}' no usa el corpus del "
+                          f"repositorio ({_describir_diferencias(self.diferencias_corpus)}).")
+            if modelo is None:
+                if exportadas is not None and self.frases is None:
+                    # Exportado con otra versión de scikit-learn: se reentrena igual, sin reemplazarlo
+                    frases, configuracion = exportadas, artefacto.get("configuracion", CONFIGURACION)
+                else:
+                    frases, configuracion = self.frases or frases_por_defecto(), CONFIGURACION
+                with perfil.tramo("intencion.entrenar"):
+                    modelo = entrenar_modelo(frases, configuracion)
+                if exportadas is not None:
+                    print(f"Se reentrenó el modelo sin reemplazar el artefacto exportado '{self.ruta_modelo}'.")
+                elif self.ruta_modelo:
+                    try:
+                        guardar_modelo(self.ruta_modelo, huella_modelo(frases), *modelo)
+                    except OSError as e:
+                        print(f"No se pudo guardar el modelo en '{self.ruta_modelo}': {e}")
+            self._vectorizer, self._clf = modelo
+
+    def precargar(self):
+        """
+        Carga o entrena el modelo ahora en vez de esperar a la primera pregunta.
+        """
+        if self._clf is None:
+            self._cargar()
+
+    @property
+    def vectorizer(self):
+        if self._clf is None:
+            self._cargar()
+        return self._vectorizer
+
+    @property
+    def clf(self):
+        if self._clf is None:
+            self._cargar()
+        return self._clf
+
+    def predecir_intencion(self, texto_usuario: str) -> str:
+        """
+        Dada una frase del usuario, retorna la etiqueta (intención) predicha.
+        """
+        return self.predecir_intenciones([texto_usuario])[0]
+
+    def predecir_intenciones(self, textos) -> list:
+        """
+        Predice un lote de frases: las que no están en caché se transforman y
+        clasifican juntas en una sola matriz dispersa.
+        """
+        claves = [" ".join(str(texto).lower().split()) for texto in textos]
+        etiquetas = {}
+        with self._lock_cache:
+            for clave in claves:
+                if clave in etiquetas:
+                    continue
+                etiqueta = self._cache.get(clave)
+                if etiqueta is not None:
+                    self._cache.move_to_end(clave)
+                    etiquetas[clave] = etiqueta
+        faltantes = [clave for clave in dict.fromkeys(claves) if clave not in etiquetas]
+        pendientes = set(faltantes)
+        aciertos = sum(1 for clave in claves if clave not in pendientes)
+
+        if faltantes:
+            predichas = self.clf.predict(self.vectorizer.transform(faltantes))
+            etiquetas.update(zip(faltantes, (str(e) for e in predichas)))
+
+        with self._lock_cache:
+            self.aciertos += aciertos
+            self.fallos += len(claves) - aciertos
+            if self.tamaño_cache > 0:
+                for clave in faltantes:
+                    self._cache[clave] = etiquetas[clave]
+                    self._cache.move_to_end(clave)
+                while len(self._cache) > self.tamaño_cache:
+                    self._cache.popitem(last=False)
+        return [etiquetas[clave] for clave in claves]
+
+    def estadisticas_cache(self) -> dict:
+        with self._lock_cache:
+            consultas = self.aciertos + self.fallos
+            return {
+                "tamaño": len(self._cache),
+                "capacidad": self.tamaño_cache,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+            }
+
+
+# --- Línea de comandos ---
+
+def _describir_diferencias(diferencias: dict) -> str:
+    return (f"{diferencias['solo_artefacto']} frases solo en el artefacto, "
+            f"{diferencias['solo_repositorio']} solo en el repositorio")
+
+
+_SCRIPT_ARRANQUE = (
+    "import sys, time; t = time.perf_counter(); "
+    "from intencion import ClasificadorIntencion; "
+    "ClasificadorIntencion(ruta_modelo=sys.argv[1] or None).predecir_intencion('hola'); "
+    "print(time.perf_counter() - t)"
+)
+
+
+def _medir_arranque(ruta_modelo: str) -> float:
+    salida = subprocess.run([sys.executable, "-c", _SCRIPT_ARRANQUE, ruta_modelo or ""],
+                            capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    return float(salida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Artefacto del clasificador de intención.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    construir = sub.add_parser("construir", help="Entrena y guarda el artefacto del modelo.")
+    construir.add_argument("--ruta", default=RUTA_MODELO)
+    construir.add_argument("--corpus", help="CSV de frases etiquetadas (por defecto el del repositorio).")
+    medir = sub.add_parser("medir", help="Mide el arranque en frío entrenando y cargando el artefacto.")
+    medir.add_argument("--ruta", default=RUTA_MODELO)
+    medir.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.comando == "construir":
+        inicio = time.perf_counter()
+        frases = cargar_corpus(args.corpus) if args.corpus else frases_por_defecto()
+        huella = huella_modelo(frases)
+        # Con un corpus propio el artefacto queda exportado para que el clasificador no lo reemplace
+        guardar_modelo(args.ruta, huella, *entrenar_modelo(frases), CONFIGURACION, frases if args.corpus else None)
+        print(f"Modelo guardado en '{args.ruta}' ({huella[:12]}) en {time.perf_counter() - inicio:.2f} s.")
+        diferencias = diferencias_corpus(leer_artefacto(args.ruta))
+        if diferencias:
+            print(f"El corpus exportado no es el del repositorio: {_describir_diferencias(diferencias)}.")
+    else:
+        ruta = os.path.abspath(args.ruta)
+        ClasificadorIntencion(ruta_modelo=ruta).precargar()
+        entrenando = min(_medir_arranque(None) for _ in range(args.repeticiones))
+        cargando = min(_medir_arranque(ruta) for _ in range(args.repeticiones))
+        print(f"Arranque entrenando: {entrenando * 1000:.1f} ms")
+        print(f"Arranque cargando el artefacto: {cargando * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,158 +1,42 @@
-import sys
 import os
-import random
-import pandas as pd
-import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-from PIL import Image, ImageTk
-
-# --- Importaciones para Machine Learning ---
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-
-# ============================
-# 1. Carga y preparación del dataset
-# ============================
-
-csv_file = "Dataset/colombian_coffee_dataset.csv"
-if not os.path.exists(csv_file):
-    print(f"No se encuentra el archivo '{csv_file}'.")
-    sys.exit(1)
-
-df = pd.read_csv(csv_file)
-
-# Verificar columnas críticas
-columnas_necesarias = [
-    'coffee_variety', 'price', 'ranking', 'year',
-    'name', 'location', 'properties', 'carbon_credits'
-]
-for col in columnas_necesarias:
-    if col not in df.columns:
-        print(f"Falta la columna '{col}' en el CSV.")
-        sys.exit(1)
+import sys
 
-# Eliminar filas donde 'coffee_variety' sea NaN (clave para muchas consultas)
-df = df.dropna(subset=['coffee_variety'])
+from perfil import perfil
 
-# Asegurar tipos numéricos
-df['price'] = pd.to_numeric(df['price'], errors='coerce')
-df['ranking'] = pd.to_numeric(df['ranking'], errors='coerce')
-df['year'] = pd.to_numeric(df['year'], errors='coerce')
-df['carbon_credits'] = pd.to_numeric(df['carbon_credits'], errors='coerce')
+# Con --perfil (o AGROCONECTA_PERFIL) se escribe un reporte de tiempos del arranque
+if "--perfil" in sys.argv and not perfil.activo:
+    perfil.activar()
 
-# ============================
-# 2. Extracción de listados únicos
-# ============================
+with perfil.tramo("0. importaciones"):
+    import tkinter as tk
+    from tkinter import ttk, messagebox, simpledialog
+    from PIL import Image, ImageTk
 
-variedades_unicas = sorted(df['coffee_variety'].dropna().unique())
-años_unicos = sorted(df['year'].dropna().unique())
+    from activos import IMAGENES_INTERFAZ, cargar_imagen
+    from despachador import Despachador
+    from intencion import PREGUNTAS_SUGERENCIAS
+    from metricas import metricas, metricas_cache
+    from motor import INTERVALO_RECARGA, ErrorCompra, MotorChat
 
 # ============================
-# 3. Preparación de entrenamiento para el clasificador de intención
+# 1. Carga del motor del chatbot (dataset, índice y clasificador)
 # ============================
 
-# Lista de tuplas (frase_de_entrenamiento, etiqueta_intención)
-train_phrases = [
-    # ----------------- Variedad -----------------
-    ("¿Qué variedades de café tienen?", "variedad"),
-    ("Muéstrame los tipos de café disponibles", "variedad"),
-    ("Dime las clases de café que ofrecen", "variedad"),
-    ("¿Qué tipos de café manejan?", "variedad"),
-    ("Quiero saber qué variedades hay", "variedad"),
-
-    # ----------------- Precio general -----------------
-    ("¿Cuánto cuesta una libra de Caturra?", "precio"),
-    ("Precio del café Geisha", "precio"),
-    ("¿Cuál es el valor del café Typica?", "precio"),
-    ("¿A cuánto está el café Arcadia?", "precio"),
-    ("Dime el costo del café", "precio"),
-    ("¿Cuánto vale el café de mi región?", "precio"),
-    ("¿Cuál es el precio del café más caro?", "precio_max"),          # aquí va a precio_max
-    ("¿Cuál es el café más costoso?", "precio_max"),
-    ("¿Cuál es el café que vale más?", "precio_max"),
-    ("¿Qué variedad es la más cara?", "precio_max"),
-    ("Dime la variedad de café de mayor precio", "precio_max"),
-    ("¿Cuál es la variedad más económica?", "precio_min"),
-    ("¿Qué café es más barato?", "precio_min"),
-    ("Dime la variedad de menor precio", "precio_min"),
-    ("¿Cuál es el café con precio más bajo?", "precio_min"),
-
-    # ----------------- Calidad -----------------
-    ("¿Cuál es la calidad promedio del café?", "calidad"),
-    ("Dime el puntaje de calidad general", "calidad"),
-    ("¿Cómo califican sus cafés?", "calidad"),
-    ("¿Cuál es el puntaje de calidad?", "calidad"),
-    ("¿Qué score tienen sus cafés?", "calidad"),
-    ("¿Cuál es el café con mejor taza?", "calidad_max"),
-    ("Dime la variedad de café con mejor puntaje", "calidad_max"),
-    ("¿Qué café tiene la puntuación más alta?", "calidad_max"),
-    ("¿Cuál es el café mejor calificado?", "calidad_max"),
-
-    # ----------------- Año de cosecha -----------------
-    ("¿De qué año es el café?", "año"),
-    ("¿Qué cosechas tienen disponibles?", "año"),
-    ("¿En qué años se cosechó este café?", "año"),
-    ("Muéstrame los años de cosecha", "año"),
-    ("¿Tienen café del 2021?", "año"),
-    ("¿Hay café de 2022?", "año"),
-
-    # ----------------- Productor / Lugar -----------------
-    ("¿Quién produce el café Caturra?", "productor_lugar"),
-    ("¿Dónde se cultiva el café Geisha?", "productor_lugar"),
-    ("Dime los productores del café Typica", "productor_lugar"),
-    ("¿Qué región cultiva Arcadia?", "productor_lugar"),
-    ("Quiero saber el productor y la región", "productor_lugar"),
-
-    # ----------------- Propiedades organolépticas -----------------
-    ("¿Cuáles son las propiedades del café Caturra?", "propiedad"),
-    ("Dime las notas de sabor de Geisha", "propiedad"),
-    ("¿Qué características tiene el café Typica?", "propiedad"),
-    ("Muéstrame las propiedades organolépticas", "propiedad"),
-    ("¿Qué sabor tiene Arcadia?", "propiedad"),
-
-    # ----------------- Bonos de carbono -----------------
-    ("¿Qué bonos de carbono generan?", "bonos"),
-    ("Muéstrame los créditos de carbono por productor", "bonos"),
-    ("¿Cuántos bonos de carbono hay?", "bonos"),
-    ("Dime los bonos de carbono acumulados", "bonos"),
-    ("¿Quiénes generan más créditos de carbono?", "bonos_max"),
-    ("¿Qué productor genera mayor bonos de carbono?", "bonos_max"),
-    ("Dime el campesino con más bonos de carbono", "bonos_max"),
-    ("¿Quién genera el mayor bono de carbono?", "bonos_max"),
-
-    # ----------------- Saludo -----------------
-    ("Hola", "saludo"),
-    ("Buenos días", "saludo"),
-    ("Buenas tardes", "saludo"),
-    ("Saludos", "saludo"),
-    ("Qué tal", "saludo"),
-]
-
-# Separar textos y etiquetas
-X_train = [texto for texto, etiqueta in train_phrases]
-y_train = [etiqueta for texto, etiqueta in train_phrases]
-
-# Vectorizador TF-IDF
-vectorizer = TfidfVectorizer(lowercase=True, ngram_range=(1, 2))
-X_vect = vectorizer.fit_transform(X_train)
+csv_file = "Dataset/colombian_coffee_dataset.csv"
+try:
+    with perfil.tramo("1. carga del motor"):
+        motor = MotorChat(csv_file)
+except (FileNotFoundError, ValueError) as e:
+    print(e)
+    sys.exit(1)
 
-# Clasificador de regresión logística
-clf = LogisticRegression(max_iter=500)
-clf.fit(X_vect, y_train)
+with perfil.tramo("1. variedades únicas"):
+    variedades_unicas = motor.variedades_unicas
 
 # ============================
-# 4. Funciones auxiliares para respuestas
+# 2. Funciones auxiliares de la interfaz
 # ============================
 
-def predecir_intencion(texto_usuario: str) -> str:
-    """
-    Dada una frase del usuario, retorna la etiqueta (intención) predicha.
-    """
-    vect = vectorizer.transform([texto_usuario])
-    etiqueta_pred = clf.predict(vect)[0]
-    return etiqueta_pred
-
-
 def agregar_mensaje(autor: str, mensaje: str):
     """
     Inserta un mensaje en el chat y hace scroll automático.
@@ -161,205 +45,61 @@ def agregar_mensaje(autor: str, mensaje: str):
     chat_log.see(tk.END)
 
 
-# --- Respuestas para cada intención ---
-
-def obtener_info_variedades() -> str:
-    return "Nuestras variedades incluyen: " + ", ".join(variedades_unicas) + "."
-
-
-def obtener_info_precios(question: str) -> str:
-    """
-    Busca si en la pregunta hay alguna variedad; si la encuentra, devuelve el rango de precio.
-    Si no, pide especificar la variedad.
-    """
-    for variedad in variedades_unicas:
-        if variedad.lower() in question.lower():
-            precios = df[df['coffee_variety'].str.lower() == variedad.lower()]['price'].dropna()
-            if not precios.empty:
-                precio_min = round(precios.min(), 2)
-                precio_max = round(precios.max(), 2)
-                return f"El café de variedad {variedad} cuesta entre ${precio_min} y ${precio_max} USD por libra."
-    return "Por favor dime qué variedad de café te interesa. Las disponibles son:\n" + ", ".join(variedades_unicas)
-
-
-def obtener_info_precio_max() -> str:
-    """
-    Retorna la variedad de café con el precio más alto registrado en el DataFrame.
-    """
-    df_sin_na = df.dropna(subset=['price', 'coffee_variety'])
-    if df_sin_na.empty:
-        return "Lo siento, no cuento con datos de precios para determinar el café más costoso."
-    fila_max = df_sin_na.loc[df_sin_na['price'].idxmax()]
-    variedad_top = fila_max['coffee_variety']
-    precio_top = round(fila_max['price'], 2)
-    return f"La variedad más costosa es {variedad_top}, con un precio de ${precio_top:.2f} USD por libra."
-
-
-def obtener_info_precio_min() -> str:
-    """
-    Retorna la variedad de café con el precio más bajo registrado en el DataFrame.
-    """
-    df_sin_na = df.dropna(subset=['price', 'coffee_variety'])
-    if df_sin_na.empty:
-        return "Lo siento, no cuento con datos de precios para determinar el café más económico."
-    fila_min = df_sin_na.loc[df_sin_na['price'].idxmin()]
-    variedad_baja = fila_min['coffee_variety']
-    precio_bajo = round(fila_min['price'], 2)
-    return f"La variedad más económica es {variedad_baja}, con un precio de ${precio_bajo:.2f} USD por libra."
-
-
-def obtener_info_calidad() -> str:
-    ranking = df['ranking'].dropna()
-    if ranking.empty:
-        return "Lo siento, no cuento con datos de calidad en este momento."
-    promedio = round(ranking.mean(), 2)
-    return f"La calidad promedio de nuestros cafés es {promedio} puntos sobre 100."
-
-
-def obtener_info_calidad_max() -> str:
-    """
-    Retorna la variedad de café con el puntaje en taza más alto.
-    """
-    df_sin_na = df.dropna(subset=['ranking', 'coffee_variety'])
-    if df_sin_na.empty:
-        return "Lo siento, no cuento con datos del puntaje en taza para determinar el mejor café."
-    fila_max = df_sin_na.loc[df_sin_na['ranking'].idxmax()]
-    variedad_top = fila_max['coffee_variety']
-    ranking_top = round(fila_max['ranking'], 2)
-    return f"La variedad con mejor puntaje en taza es {variedad_top}, con un puntaje de {ranking_top} sobre 100."
-
-
-def obtener_info_años() -> str:
-    años = [str(int(a)) for a in años_unicos]
-    return "Tenemos cafés de las siguientes cosechas: " + ", ".join(años) + "."
-
-
-def obtener_info_productor_lugar() -> str:
-    listado = df[['coffee_variety', 'name', 'location']].dropna(subset=['coffee_variety', 'name', 'location'])
-    if listado.empty:
-        return "Lo siento, no cuento con datos de productores y lugares en este momento."
-    filas = []
-    for _, row in listado.iterrows():
-        filas.append(f"{row['coffee_variety']} – {row['name']} ({row['location']})")
-    return "Lista de productores y lugares de producción:\n" + "\n".join(filas)
-
-
-def obtener_info_propiedades() -> str:
-    listado_props = df[['coffee_variety', 'properties']].dropna(subset=['coffee_variety', 'properties'])
-    if listado_props.empty:
-        return "Lo siento, no cuento con datos de propiedades organolépticas en este momento."
-    filas = []
-    for _, row in listado_props.iterrows():
-        filas.append(f"{row['coffee_variety']}: {row['properties']}")
-    return "Propiedades de las variedades de café:\n" + "\n".join(filas)
-
-
-def obtener_info_bonos() -> str:
-    if 'carbon_credits' not in df.columns or df['carbon_credits'].dropna().empty:
-        return "Lo siento, no cuento con datos de bonos de carbono en este momento."
-    resumen_bonos = df.groupby("name")["carbon_credits"].sum().sort_values(ascending=False)
-    filas = [f"{prod}: {bonos:.2f} 🌱" for prod, bonos in resumen_bonos.items()]
-    return "Bonos de carbono generados por productor:\n" + "\n".join(filas)
-
-
-def obtener_info_bonos_max() -> str:
-    """
-    Retorna el productor que genera la mayor cantidad de bonos de carbono.
-    """
-    if 'carbon_credits' not in df.columns or df['carbon_credits'].dropna().empty:
-        return "Lo siento, no cuento con datos de bonos de carbono en este momento."
-    resumen_bonos = df.groupby("name")["carbon_credits"].sum()
-    if resumen_bonos.empty:
-        return "Lo siento, no cuento con datos para determinar el productor con mayor bonos de carbono."
-    prod_max = resumen_bonos.idxmax()
-    bonos_max = round(resumen_bonos.max(), 2)
-    return f"El productor que genera mayor bonos de carbono es {prod_max}, con {bonos_max:.2f} 🌱."
-
-
 # ============================
-# 5. Generar respuesta según intención
+# 3. Construcción de la interfaz gráfica (Tkinter)
 # ============================
 
-def generar_respuesta(question: str, user_name: str) -> str:
-    intent = predecir_intencion(question)
-
-    if intent == "variedad":
-        return obtener_info_variedades()
-
-    elif intent == "precio":
-        return obtener_info_precios(question)
-
-    elif intent == "precio_max":
-        return obtener_info_precio_max()
-
-    elif intent == "precio_min":
-        return obtener_info_precio_min()
-
-    elif intent == "calidad":
-        return obtener_info_calidad()
-
-    elif intent == "calidad_max":
-        return obtener_info_calidad_max()
+terminar_tramo = perfil.empezar("3. ventana e imágenes")
+root = tk.Tk()
+root.withdraw()
 
-    elif intent == "año":
-        return obtener_info_años()
+# --- Tareas de fondo: no activan el indicador "escribiendo…" ---
+despachador_fondo = Despachador(root.after)
+despachador_fondo.iniciar()
 
-    elif intent == "productor_lugar":
-        return obtener_info_productor_lugar()
 
-    elif intent == "propiedad":
-        return obtener_info_propiedades()
+def mostrar_imagen(etiqueta: tk.Label, imagen: Image.Image):
+    foto = ImageTk.PhotoImage(imagen)
+    etiqueta.config(image=foto)
+    etiqueta.image = foto  # Tk no guarda la referencia
 
-    elif intent == "bonos":
-        return obtener_info_bonos()
 
-    elif intent == "bonos_max":
-        return obtener_info_bonos()
+def crear_imagen(nombre: str, bg: str, al_fallar=None, **posicion) -> tk.Label:
+    """
+    Coloca un marcador del tamaño de la imagen y la carga en segundo plano.
+    """
+    ruta, (ancho, alto) = IMAGENES_INTERFAZ[nombre]
+    etiqueta = tk.Label(root, bg=bg, bd=0)
+    etiqueta.image = tk.PhotoImage(width=ancho, height=alto)
+    etiqueta.config(image=etiqueta.image)
+    etiqueta.place(**posicion)
+    despachador_fondo.enviar(cargar_imagen, ruta, (ancho, alto),
+                             al_terminar=lambda imagen: mostrar_imagen(etiqueta, imagen),
+                             al_fallar=al_fallar or (lambda e: None))
+    return etiqueta
 
-    elif intent == "saludo":
-        return f"¡Hola {user_name.capitalize()}! ¿Cómo estás? 😊 ¿Sobre qué café quieres saber hoy?"
 
-    # Si no se identifica claramente la intención:
-    return (
-        "Lo siento, no entendí tu pregunta. "
-        "¿Quieres saber sobre variedades, precios (incluido el más caro o más barato), "
-        "calidad (promedio o mejor), años de cosecha, productor, propiedades o bonos de carbono?"
-    )
+# --- Fondo decorativo ---
+bg_label = crear_imagen("fondo", bg="#c8d5b9", x=0, y=0, relwidth=1, relheight=1)
 
+# --- Imagen de caficultora sonriente ---
+collector_label = crear_imagen("recolectora", bg='white', x=710, y=20,
+                               al_fallar=lambda e: print("Imagen recolectora no encontrada."))
 
-# ============================
-# 6. Construcción de la interfaz gráfica (Tkinter)
-# ============================
+# El clasificador se carga mientras el usuario escribe su nombre, no en la primera pregunta
+despachador_fondo.enviar(motor.clasificador.precargar)
+terminar_tramo()
 
-root = tk.Tk()
-root.withdraw()
-user_name = simpledialog.askstring("Bienvenido", "¿Cómo te llamas?")
+with perfil.tramo("3. espera del nombre"):
+    user_name = simpledialog.askstring("Bienvenido", "¿Cómo te llamas?")
 if not user_name:
     user_name = "amigo"
+terminar_tramo = perfil.empezar("3. interfaz del chat")
 root.deiconify()
 root.title("☕ AgroConecta con ML - Café Colombiano")
 root.geometry("1050x660")
 root.configure(bg="#f4f4f4")
 
-# --- Fondo decorativo ---
-try:
-    bg_image = Image.open("paisaje_cafetero.jpg")
-    bg_photo = ImageTk.PhotoImage(bg_image.resize((1050, 660)))
-    bg_label = tk.Label(root, image=bg_photo)
-    bg_label.place(x=0, y=0, relwidth=1, relheight=1)
-except (FileNotFoundError, OSError):
-    pass
-
-# --- Imagen de caficultora sonriente ---
-try:
-    collector_img = Image.open("recolectora_sonriendo.png")
-    collector_img = collector_img.resize((150, 200))
-    collector_photo = ImageTk.PhotoImage(collector_img)
-    collector_label = tk.Label(root, image=collector_photo, bg='white')
-    collector_label.place(x=710, y=20)
-except FileNotFoundError:
-    print("Imagen recolectora no encontrada.")
-
 # --- Área de chat ---
 chat_frame = tk.Frame(root, bg='white', bd=2)
 chat_frame.place(x=20, y=20, width=600, height=420)
@@ -370,15 +110,67 @@ chat_log.insert(tk.END,
                 "Pregúntame sobre variedades, precios (incluido el más caro o más barato), "
                 "calidad (promedio o mejor), año de cosecha, productor, propiedades o bonos de carbono.")
 
+# Indicador "escribiendo…" mientras hay consultas en segundo plano
+escribiendo_lbl = tk.Label(root, text="Aracelly está escribiendo…", bg="#f4f4f4", fg="#6d4c41",
+                           font=("Helvetica", 9, "italic"))
+
+
+def mostrar_escribiendo(ocupado: bool):
+    if ocupado:
+        escribiendo_lbl.place(x=20, y=438)
+    else:
+        escribiendo_lbl.place_forget()
+
+
+# Las consultas al motor corren fuera del hilo de Tk; las respuestas llegan en orden
+despachador = Despachador(root.after, al_cambiar_estado=mostrar_escribiendo)
+despachador.iniciar()
+
+# Cursor de la siguiente página cuando la última respuesta es un listado largo
+cursor_pendiente = None
+
+
+def mostrar_pagina(pagina: dict, continuacion: bool = False):
+    """
+    Agrega una página de respuesta al chat y habilita "Ver más" si quedan otras.
+    """
+    global cursor_pendiente
+    if continuacion:
+        chat_log.insert(tk.END, f"{pagina['respuesta']}\n")
+        chat_log.see(tk.END)
+    else:
+        agregar_mensaje("Recolectora", pagina["respuesta"])
+    cursor_pendiente = pagina["cursor"]
+    mas_btn.config(state=tk.NORMAL if cursor_pendiente else tk.DISABLED)
+
+
 # Función para procesar la respuesta
 def responder():
     question = user_input.get().strip()
     if not question:
         return
     chat_log.insert(tk.END, f"\n{user_name.capitalize()}: {question}\n")
-    respuesta = generar_respuesta(question, user_name)
-    agregar_mensaje("Recolectora", respuesta)
+    chat_log.see(tk.END)
     user_input.delete(0, tk.END)
+    # Una pregunta nueva deja obsoleto el listado anterior
+    despachador.cancelar("ver_mas")
+    mas_btn.config(state=tk.DISABLED)
+    despachador.enviar(motor.answer_paginado, question, user_name,
+                       al_terminar=mostrar_pagina, al_fallar=mostrar_error)
+
+
+def ver_mas():
+    global cursor_pendiente
+    if cursor_pendiente:
+        cursor, cursor_pendiente = cursor_pendiente, None
+        mas_btn.config(state=tk.DISABLED)
+        despachador.enviar(motor.mas_resultados, cursor, canal="ver_mas",
+                           al_terminar=lambda pagina: mostrar_pagina(pagina, continuacion=True),
+                           al_fallar=mostrar_error)
+
+
+def mostrar_error(error: Exception):
+    agregar_mensaje("Recolectora", f"Lo siento, ocurrió un problema al responder: {error}")
 
 # Campo de entrada y botón de enviar
 user_input = tk.Entry(root, width=80)
@@ -389,10 +181,18 @@ send_btn = tk.Button(root, text="✉️ Enviar", command=responder,
                      bg="#4CAF50", fg="white", font=("Helvetica", 10, "bold"))
 send_btn.place(x=540, y=455)
 
+mas_btn = tk.Button(root, text="⬇️ Ver más", command=ver_mas, state=tk.DISABLED,
+                    bg="#8D6E63", fg="white", font=("Helvetica", 10, "bold"))
+mas_btn.place(x=540, y=488)
+
+terminar_tramo()
+
 # ============================
-# 7. Sección de compra
+# 4. Sección de compra
 # ============================
 
+terminar_tramo = perfil.empezar("4. sección de compra")
+
 compra_frame = tk.LabelFrame(root, text="🛒 Compra tu café", font=("Helvetica", 11, "bold"),
                              bg="#f4f4f4", padx=10, pady=10)
 compra_frame.place(x=650, y=240, width=250, height=230)
@@ -411,7 +211,10 @@ propiedades_cb = ttk.Combobox(compra_frame, values=[], state="readonly")
 propiedades_cb.grid(row=2, column=1)
 
 ttk.Label(compra_frame, text="Moneda:", background="#f4f4f4").grid(row=3, column=0, sticky='w')
-moneda_cb = ttk.Combobox(compra_frame, values=["USD", "COP"], state="readonly")
+# Las monedas salen del proveedor de tasas de cambio: al abrir la lista se
+# usan las que ya estén en memoria, sin esperar al proveedor.
+moneda_cb = ttk.Combobox(compra_frame, values=motor.monedas(esperar=False), state="readonly",
+                         postcommand=lambda: llenar_monedas(motor.monedas(esperar=False)))
 moneda_cb.grid(row=3, column=1)
 moneda_cb.set("USD")
 
@@ -428,23 +231,37 @@ cantidad_sb.grid(row=5, column=1)
 def actualizar_productor_propiedades(event=None):
     variedad_sel = variedad_cb.get()
     if variedad_sel:
-        df_var = df[df['coffee_variety'] == variedad_sel]
-        productores = sorted(df_var['name'].dropna().unique())
-        propiedades = sorted(df_var['properties'].dropna().unique())
-        productores_cb['values'] = productores
-        propiedades_cb['values'] = propiedades
-        productores_cb.set(productores[0] if productores else "")
-        propiedades_cb.set(propiedades[0] if propiedades else "")
+        despachador.enviar(motor.productores_y_propiedades, variedad_sel, canal="combos",
+                           al_terminar=lambda opciones: llenar_combos(*opciones))
     else:
-        productores_cb['values'] = []
-        propiedades_cb['values'] = []
-        productores_cb.set("")
-        propiedades_cb.set("")
+        despachador.cancelar("combos")
+        llenar_combos([], [])
+
+
+def llenar_combos(productores: list, propiedades: list, conservar: bool = False):
+    """
+    Con `conservar=True` se mantiene lo que estaba elegido si sigue en la lista.
+    """
+    for combo, valores in ((productores_cb, productores), (propiedades_cb, propiedades)):
+        actual = combo.get()
+        combo['values'] = valores
+        if not (conservar and actual in valores):
+            combo.set(valores[0] if valores else "")
 
 
 variedad_cb.bind("<<ComboboxSelected>>", actualizar_productor_propiedades)
 
 
+def llenar_monedas(monedas: list):
+    moneda_cb['values'] = monedas
+    if moneda_cb.get() not in monedas:
+        moneda_cb.set(monedas[0] if monedas else "")
+
+
+# La primera consulta al proveedor puede tardar: va en segundo plano
+despachador_fondo.enviar(motor.monedas, al_terminar=llenar_monedas)
+
+
 def realizar_compra():
     variedad = variedad_cb.get()
     productor = productores_cb.get()
@@ -457,53 +274,32 @@ def realizar_compra():
         messagebox.showwarning("Cantidad inválida", "Introduce un número válido para la cantidad.")
         return
 
-    if not variedad:
-        messagebox.showwarning("Falta información", "Selecciona una variedad de café.")
-        return
-    if not productor:
-        messagebox.showwarning("Falta información", "Selecciona un productor.")
-        return
-    if not propiedad:
-        messagebox.showwarning("Falta información", "Selecciona una propiedad.")
-        return
+    despachador.enviar(motor.realizar_compra, variedad, productor, propiedad, cantidad, unidad, moneda,
+                       al_terminar=lambda compra: agregar_mensaje("Recolectora", compra["resumen"]),
+                       al_fallar=mostrar_error_compra)
 
-    precios = df[(df['coffee_variety'] == variedad) & (df['name'] == productor)]['price'].dropna()
-    if precios.empty:
-        precios = df[df['coffee_variety'] == variedad]['price'].dropna()
-        if precios.empty:
-            messagebox.showerror("Sin datos", "No hay precios para esta variedad.")
-            return
-    precio_usd = precios.mean()
-
-    tasa_cambio = 4132
-    if unidad == "Kilos":
-        cantidad_lb = cantidad * 2.20462
+
+def mostrar_error_compra(error: Exception):
+    if not isinstance(error, ErrorCompra):
+        mostrar_error(error)
+    elif error.titulo == "Sin datos":
+        messagebox.showerror(error.titulo, str(error))
     else:
-        cantidad_lb = cantidad
-    total_usd = precio_usd * cantidad_lb
-    total = total_usd if moneda == "USD" else total_usd * tasa_cambio
-    simbolo = "$" if moneda == "USD" else "COL$"
-    bonos = round(random.uniform(0.5, 2.5) * cantidad_lb, 2)
-
-    resumen = (
-        f"Compra de {cantidad:.2f} {unidad.lower()} de café {variedad}\n"
-        f"Productor: {productor}\n"
-        f"Propiedades: {propiedad}\n"
-        f"Precio promedio por libra: ${precio_usd:.2f} USD\n"
-        f"Total a pagar: {simbolo}{total:.2f}\n"
-        f"Bonos de carbono generados: {bonos} 🌱"
-    )
-    agregar_mensaje("Recolectora", resumen)
+        messagebox.showwarning(error.titulo, str(error))
 
 
 comprar_btn = tk.Button(compra_frame, text="Comprar", command=realizar_compra,
                         bg="#2196F3", fg="white", font=("Helvetica", 10, "bold"))
 comprar_btn.grid(row=6, column=0, columnspan=2, pady=10)
 
+terminar_tramo()
+
 # ============================
-# 8. Sugerencias rápidas
+# 5. Sugerencias rápidas
 # ============================
 
+terminar_tramo = perfil.empezar("5. sugerencias rápidas")
+
 sugerencias_frame = tk.Frame(root, bg='white')
 sugerencias_frame.place(x=20, y=520)
 
@@ -519,17 +315,77 @@ def crear_boton_sugerencia(texto: str, pregunta: str, color: str, col: int):
     b.grid(row=0, column=col, padx=4, pady=5)
 
 
-crear_boton_sugerencia("🌱 Variedades", "¿Qué variedades de café tienen?", "#e0f7fa", 0)
-crear_boton_sugerencia("💰 Precios", "¿Cuáles son los precios del café?", "#fff9c4", 1)
-crear_boton_sugerencia("💎 Café más caro", "¿Cuál es el café más costoso?", "#ffe0b2", 2)
-crear_boton_sugerencia("💵 Café más económico", "¿Cuál es la variedad más económica?", "#d7ccc8", 3)
-crear_boton_sugerencia("📈 Calidad ", "¿Cuál es el café con la mejor tasa?", "#c8e6c9", 4)
-crear_boton_sugerencia("🌍 Bonos top", "¿Muéstrame los bonos de carbono de cada productor?", "#d1c4e9", 5)
-crear_boton_sugerencia("📅 Años cosecha", "¿De qué año es el café?", "#f8bbd0", 6)
-crear_boton_sugerencia("🌿 Propiedades", "¿Cuáles son las propiedades de los cafés?", "#dcedc8", 7)
+# Texto y color de cada botón; sus preguntas están en intencion.PREGUNTAS_SUGERENCIAS
+BOTONES_SUGERENCIA = [
+    ("🌱 Variedades", "#e0f7fa"),
+    ("💰 Precios", "#fff9c4"),
+    ("💎 Café más caro", "#ffe0b2"),
+    ("💵 Café más económico", "#d7ccc8"),
+    ("📈 Calidad ", "#c8e6c9"),
+    ("🌍 Bonos top", "#d1c4e9"),
+    ("📅 Años cosecha", "#f8bbd0"),
+    ("🌿 Propiedades", "#dcedc8"),
+]
+for col, ((texto, color), (pregunta, _)) in enumerate(zip(BOTONES_SUGERENCIA, PREGUNTAS_SUGERENCIAS)):
+    crear_boton_sugerencia(texto, pregunta, color, col)
+terminar_tramo()
 
 # ============================
-# 9. Ejecutar la interfaz
+# 6. Ejecutar la interfaz
 # ============================
 
-root.mainloop()
\ No newline at end of file
+# Con AGROCONECTA_METRICAS=archivo.prom las métricas se vuelcan a ese archivo cada minuto
+ruta_metricas = os.environ.get("AGROCONECTA_METRICAS")
+
+
+def metricas_motor():
+    return [metricas_cache(motor.clasificador.estadisticas_cache())]
+
+
+if ruta_metricas:
+    metricas.volcar_periodicamente(ruta_metricas, adicionales=metricas_motor)
+
+
+# Si el CSV del catálogo cambia, el motor arma la versión nueva en segundo
+# plano y aquí solo se refrescan las listas de la sección de compra.
+def revisar_catalogo():
+    despachador_fondo.enviar(motor.recargar_si_cambio, al_terminar=catalogo_revisado,
+                             al_fallar=lambda e: programar_revision())
+
+
+def programar_revision():
+    root.after(INTERVALO_RECARGA * 1000, revisar_catalogo)
+
+
+def catalogo_revisado(resultado):
+    if resultado is not None:
+        variedad_cb['values'] = motor.variedades_unicas
+        variedad_sel = variedad_cb.get()
+        if variedad_sel in motor.variedades_unicas:
+            despachador.enviar(motor.productores_y_propiedades, variedad_sel, canal="combos",
+                               al_terminar=lambda opciones: llenar_combos(*opciones, conservar=True))
+        elif variedad_sel:
+            variedad_cb.set("")
+            actualizar_productor_propiedades()
+    programar_revision()
+
+
+programar_revision()
+
+
+def cerrar():
+    despachador.cerrar()
+    despachador_fondo.cerrar()
+    if ruta_metricas:
+        metricas.guardar(ruta_metricas, *metricas_motor())
+    root.destroy()
+
+
+def ventana_lista():
+    perfil.marca("ventana_interactiva")
+    perfil.detener_cprofile()
+
+
+root.protocol("WM_DELETE_WINDOW", cerrar)
+root.after_idle(ventana_lista)
+root.mainloop()
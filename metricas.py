@@ -0,0 +1,156 @@
+"""
+Métricas de uso y latencia en formato de texto de Prometheus.
+
+Los histogramas se registran siempre: anotar una observación cuesta una
+búsqueda binaria sobre los límites y unas sumas bajo un candado, así que se
+pueden dejar activos con carga. El servidor los expone en GET /metricas; la
+app de escritorio puede volcarlos a un archivo cada cierto tiempo con
+`volcar_periodicamente`.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Límites superiores (en segundos) de los rangos de los histogramas
+LIMITES = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+INTERVALO_VOLCADO = 60
+
+
+def _numero(valor) -> str:
+    if isinstance(valor, float):
+        return repr(valor) if valor != int(valor) else f"{valor:.1f}"
+    return str(valor)
+
+
+def _etiquetas(nombres, valores, extra: str = "") -> str:
+    pares = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histograma:
+    """
+    Cuenta observaciones por rango de latencia para cada combinación de
+    valores de `etiquetas`. El `_count` de cada serie sirve de contador.
+    """
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas=(), limites=LIMITES):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.limites = tuple(limites)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, segundos: float, *valores):
+        posicion = bisect_left(self.limites, segundos)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.limites) + 1), 0.0]
+            serie[0][posicion] += 1
+            serie[1] += segundos
+
+    def lineas(self) -> list:
+        with self._lock:
+            series = sorted((valores, list(conteos), suma) for valores, (conteos, suma) in self._series.items())
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        for valores, conteos, suma in series:
+            acumulado = 0
+            for limite, conteo in zip(self.limites + ("+Inf",), conteos):
+                acumulado += conteo
+                le = limite if limite == "+Inf" else _numero(float(limite))
+                etiquetas = _etiquetas(self.etiquetas, valores, f'le="{le}"')
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, valores)} {_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, valores)} {acumulado}")
+        return lineas
+
+
+def metrica(nombre: str, tipo: str, ayuda: str, valor) -> list:
+    """
+    Líneas de una métrica sin etiquetas ("counter" o "gauge").
+    """
+    return [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}", f"{nombre} {_numero(valor)}"]
+
+
+def metricas_cache(estadisticas: dict) -> list:
+    """
+    Líneas para `ClasificadorIntencion.estadisticas_cache()`.
+    """
+    return (
+        metrica("agroconecta_cache_intencion_aciertos_total", "counter",
+                "Predicciones de intención resueltas desde la caché.", estadisticas["aciertos"])
+        + metrica("agroconecta_cache_intencion_fallos_total", "counter",
+                  "Predicciones de intención que pasaron por el modelo.", estadisticas["fallos"])
+        + metrica("agroconecta_cache_intencion_tasa_aciertos", "gauge",
+                  "Fracción de aciertos de la caché de intenciones.", float(estadisticas["tasa_aciertos"]))
+        + metrica("agroconecta_cache_intencion_entradas", "gauge",
+                  "Entradas guardadas en la caché de intenciones.", estadisticas["tamaño"])
+    )
+
+
+class Registro:
+    """
+    Conjunto de histogramas que se exponen juntos.
+    """
+
+    def __init__(self):
+        self._histogramas = {}
+        self._lock = threading.Lock()
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas=(), limites=LIMITES) -> Histograma:
+        """
+        Retorna el histograma `nombre`, creándolo la primera vez.
+        """
+        with self._lock:
+            if nombre not in self._histogramas:
+                self._histogramas[nombre] = Histograma(nombre, ayuda, etiquetas, limites)
+            return self._histogramas[nombre]
+
+    def texto(self, *adicionales) -> str:
+        """
+        Todas las métricas en formato de texto de Prometheus; `adicionales`
+        son listas de líneas ya formateadas (ver `metrica`).
+        """
+        with self._lock:
+            histogramas = list(self._histogramas.values())
+        lineas = [linea for histograma in histogramas for linea in histograma.lineas()]
+        for grupo in adicionales:
+            lineas.extend(grupo)
+        return "\n".join(lineas) + "\n"
+
+    def volcar_periodicamente(self, ruta: str, intervalo: float = INTERVALO_VOLCADO, adicionales=None):
+        """
+        Escribe `texto()` en `ruta` cada `intervalo` segundos desde un hilo
+        en segundo plano. `adicionales()` puede retornar más grupos de líneas.
+        Retorna un evento que detiene el volcado al activarse.
+        """
+        detener = threading.Event()
+
+        def volcar():
+            while not detener.wait(intervalo):
+                self.guardar(ruta, *(adicionales() if adicionales else ()))
+
+        threading.Thread(target=volcar, name="volcado-metricas", daemon=True).start()
+        return detener
+
+    def guardar(self, ruta: str, *adicionales):
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        try:
+            with open(temporal, "w", encoding="utf-8") as f:
+                f.write(f"# {time.strftime('%Y-%m-%dT%H:%M:%S')}\n")
+                f.write(self.texto(*adicionales))
+            os.replace(temporal, ruta)
+        except OSError as e:
+            print(f"No se pudieron guardar las métricas en '{ruta}': {e}")
+
+
+metricas = Registro()
@@ -0,0 +1,885 @@
+"""
+Motor del chatbot de Aracelly sin dependencias de interfaz gráfica.
+
+Carga el dataset, construye el índice del catálogo y entrena el clasificador
+de intención una sola vez; luego puede atender preguntas y compras de muchos
+usuarios a la vez desde la app de escritorio o desde un servidor.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from carbono import SIMULACIONES, calcular_bonos, factores_lineas, simular_bonos
+from catalogo import (RUTA_CACHE, RUTA_DATASET, TAMAÑO_BLOQUE, cargar_dataset, diferencias,
+                      leer_por_bloques, preparar_dataset)
+from consultas import (COLUMNAS_FILTRO, TOP, IndiceFacetas, combinar_resumenes, describir_filtros,
+                       mascara, rangos_mencionados, resumir_filas, validar_filtros)
+from indice_catalogo import IndiceCatalogo
+from intencion import TAMAÑO_CACHE, ClasificadorIntencion
+from metricas import metricas
+from pedidos import LIBRAS_POR_KILO, cotizar_lineas, totales_pedido
+from perfil import perfil
+from tasas import TasasCambio, simbolo
+
+TAMAÑO_PAGINA = 50
+# Listados (intención y filtros) cuyas filas se guardan por versión del catálogo
+LISTADOS_EN_CACHE = 8
+INTERVALO_RECARGA = 5
+
+
+LATENCIA_INTENCION = metricas.histograma(
+    "agroconecta_intencion_segundos", "Tiempo del manejador de cada intención.", ("intent",))
+LATENCIA_COMPRA = metricas.histograma(
+    "agroconecta_compra_segundos", "Tiempo de realizar_compra según su resultado.", ("resultado",))
+
+
+def _texto(serie: pd.Series) -> pd.Series:
+    return serie.astype(str)
+
+
+# Respuestas que listan filas del catálogo y se entregan por páginas
+LISTADOS = {
+    "productor_lugar": {
+        "columnas": ['coffee_variety', 'name', 'location'],
+        "titulo": "Lista de productores y lugares de producción:",
+        "sin_datos": "Lo siento, no cuento con datos de productores y lugares en este momento.",
+        "formato": lambda df: (_texto(df['coffee_variety']) + " – " + _texto(df['name'])
+                               + " (" + _texto(df['location']) + ")"),
+    },
+    "propiedad": {
+        "columnas": ['coffee_variety', 'properties'],
+        "titulo": "Propiedades de las variedades de café:",
+        "sin_datos": "Lo siento, no cuento con datos de propiedades organolépticas en este momento.",
+        "formato": lambda df: _texto(df['coffee_variety']) + ": " + _texto(df['properties']),
+    },
+}
+
+
+def leer_cursor(cursor: str):
+    """
+    Separa un cursor "intención:fila" o "intención:{filtros JSON}:fila" de
+    `MotorChat.paginas` en (intención, filtros, fila).
+    """
+    inicio, _, desde = str(cursor).rpartition(":")
+    intent, _, filtros = inicio.partition(":")
+    # Solo dígitos ASCII y una fila que quepa en un entero de 64 bits
+    if intent not in LISTADOS or not (desde.isascii() and desde.isdigit() and len(desde) <= 18):
+        raise ValueError(f"Cursor inválido: '{cursor}'.")
+    try:
+        filtros = validar_filtros(json.loads(filtros)) if filtros else {}
+    except ValueError:
+        raise ValueError(f"Cursor inválido: '{cursor}'.") from None
+    return intent, filtros, int(desde)
+
+
+def escribir_cursor(intent: str, filtros: dict, desde: int) -> str:
+    if not filtros:
+        return f"{intent}:{desde}"
+    return f"{intent}:{json.dumps(filtros, ensure_ascii=False)}:{desde}"
+
+
+def _version_archivo(ruta: str):
+    estado = os.stat(ruta)
+    return estado.st_mtime_ns, estado.st_size
+
+
+class ErrorCompra(ValueError):
+    """
+    Datos de compra incompletos o sin precios; `titulo` sirve como encabezado
+    del aviso que se muestra al usuario.
+    """
+
+    def __init__(self, titulo: str, mensaje: str):
+        super().__init__(mensaje)
+        self.titulo = titulo
+
+    def __reduce__(self):
+        return ErrorCompra, (self.titulo, str(self))
+
+
+class MotorChat:
+    """
+    Responde preguntas sobre el catálogo y calcula compras.
+
+    `answer` y `realizar_compra` pueden llamarse desde varios hilos. Cada
+    respuesta toma bajo un candado la versión actual del catálogo (`df` e
+    `indice`) y se arma fuera de él con esa misma versión, así las
+    respuestas no se esperan entre sí.
+
+    Con `por_bloques=True` el CSV se recorre en bloques para llenar el índice
+    y no se guarda el DataFrame (`df` queda en None); las respuestas que
+    listan filas vuelven a leer el CSV por bloques y no se pueden eliminar filas.
+    `ruta_cache` es la carpeta de la caché columnar (None para no usarla).
+    `tasas` da las tasas de cambio (por defecto las de `tasas.proveedor_desde`);
+    las compras y cotizaciones nunca esperan al proveedor: mientras no haya
+    respondido usan las tasas de respaldo.
+
+    Las preguntas que mencionan variedad, productor, lugar, año o rango de
+    precio se responden solo con las filas que cumplen esos filtros (ver
+    `consultas`); sin filtros se usan los agregados del índice.
+
+    `df` e `indice` nunca se modifican en su lugar: `agregar_filas`,
+    `eliminar_filas` y `recargar` arman un DataFrame y una copia del índice
+    nuevos y los reemplazan juntos bajo el candado, sin cortar las
+    respuestas en curso.
+    """
+
+    def __init__(self, csv_file: str = RUTA_DATASET, tamaño_cache: int = TAMAÑO_CACHE,
+                 por_bloques: bool = False, tamaño_bloque: int = TAMAÑO_BLOQUE,
+                 ruta_cache: str = RUTA_CACHE, tasas: TasasCambio = None):
+        self.csv_file = csv_file
+        self.tamaño_bloque = tamaño_bloque
+        self.ruta_cache = ruta_cache
+        self._version_cargada = self._version_vista = (
+            _version_archivo(csv_file) if os.path.exists(csv_file) else None)
+        self._lock_cambios = threading.Lock()
+        if por_bloques:
+            df = None
+            with perfil.tramo("motor.indice_por_bloques"):
+                indice = IndiceCatalogo.desde_bloques(leer_por_bloques(csv_file, tamaño_bloque))
+        else:
+            with perfil.tramo("motor.cargar_dataset"):
+                df = cargar_dataset(csv_file, ruta_cache)
+            with perfil.tramo("motor.construir_indice"):
+                indice = IndiceCatalogo(df)
+        # Versión vigente del catálogo; solo se reemplaza entera, bajo `_lock`
+        self._catalogo = (df, indice)
+        self._local = threading.local()
+        self.clasificador = ClasificadorIntencion(tamaño_cache=tamaño_cache)
+        self.tasas = tasas or TasasCambio()
+        self.tasas.actualizar()
+        self._facetas = None
+        self._lock_facetas = threading.Lock()
+        self._listados = (None, OrderedDict())
+        self._lock_listados = threading.Lock()
+        self._lock = threading.Lock()
+
+    # --- Versión del catálogo ---
+
+    def _version(self):
+        """
+        (df, indice) fijados por `_instantanea` en este hilo o, si no hay,
+        los vigentes.
+        """
+        return getattr(self._local, "catalogo", None) or self._catalogo
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self._version()[0]
+
+    @property
+    def indice(self) -> IndiceCatalogo:
+        return self._version()[1]
+
+    def _reemplazar(self, df: pd.DataFrame, indice: IndiceCatalogo):
+        with self._lock:
+            self._catalogo = (df, indice)
+
+    @contextmanager
+    def _instantanea(self):
+        """
+        Fija en este hilo la versión vigente del catálogo mientras se arma
+        una respuesta; los cambios que lleguen entretanto se ven en la
+        siguiente.
+        """
+        if getattr(self._local, "catalogo", None) is not None:
+            yield
+            return
+        with self._lock:
+            self._local.catalogo = self._catalogo
+        try:
+            yield
+        finally:
+            self._local.catalogo = None
+
+    @property
+    def variedades_unicas(self) -> list:
+        return self.indice.variedades
+
+    @property
+    def años_unicos(self) -> list:
+        return self.indice.años
+
+    # --- Mantenimiento del catálogo ---
+
+    def agregar_filas(self, filas: pd.DataFrame):
+        """
+        Agrega filas nuevas al catálogo y retorna las etiquetas asignadas.
+        """
+        filas = preparar_dataset(filas)
+        with self._lock_cambios:
+            df, indice = self._catalogo
+            if df is not None:
+                inicio = int(df.index.max()) + 1 if len(df) else 0
+                filas.index = pd.RangeIndex(inicio, inicio + len(filas))
+                df = pd.concat([df, filas])
+            indice = indice.copia()
+            indice.agregar_filas(filas)
+            self._reemplazar(df, indice)
+        return filas.index
+
+    def eliminar_filas(self, etiquetas):
+        if self.df is None:
+            raise ValueError("El catálogo se cargó por bloques y no permite eliminar filas.")
+        with self._lock_cambios:
+            df, indice = self._catalogo
+            filas = df.loc[df.index.intersection(etiquetas)]
+            indice = indice.copia()
+            indice.eliminar_filas(filas)
+            self._reemplazar(df.drop(filas.index), indice)
+
+    # --- Recarga del CSV ---
+
+    def recargar(self) -> dict:
+        """
+        Vuelve a leer el CSV y cambia el catálogo por la versión nueva de una
+        sola vez. El índice nuevo es una copia del actual a la que solo se le
+        quitan y agregan las filas que cambiaron (o se arma de cero si cambió
+        casi todo); mientras tanto las respuestas siguen usando la versión
+        anterior. Retorna {"filas", "eliminadas", "agregadas", "segundos"};
+        al cargar por bloques el índice siempre se arma de cero y las
+        eliminadas y agregadas quedan en None.
+        """
+        inicio = time.perf_counter()
+        with self._lock_cambios, perfil.tramo("motor.recargar"):
+            version = _version_archivo(self.csv_file)
+            df_actual, indice_actual = self._catalogo
+            if df_actual is None:
+                df = None
+                indice = IndiceCatalogo.desde_bloques(leer_por_bloques(self.csv_file, self.tamaño_bloque))
+                eliminadas = agregadas = None
+            else:
+                df = cargar_dataset(self.csv_file, self.ruta_cache)
+                eliminadas, agregadas = diferencias(df_actual, df)
+                if len(eliminadas) + len(agregadas) < len(df):
+                    indice = indice_actual.copia()
+                    indice.eliminar_filas(eliminadas)
+                    indice.agregar_filas(agregadas)
+                else:
+                    indice = IndiceCatalogo(df)
+                eliminadas, agregadas = len(eliminadas), len(agregadas)
+            self._reemplazar(df, indice)
+            self._version_cargada = self._version_vista = version
+        return {
+            "filas": None if df is None else len(df),
+            "eliminadas": eliminadas,
+            "agregadas": agregadas,
+            "segundos": time.perf_counter() - inicio,
+        }
+
+    def recargar_si_cambio(self):
+        """
+        Recarga si el CSV cambió y ya no se está escribiendo: el cambio debe
+        verse igual en dos revisiones seguidas. Retorna el resultado de
+        `recargar` o None. Si la versión nueva no se puede leer se avisa y
+        se sigue con la anterior hasta el próximo cambio.
+        """
+        try:
+            version = _version_archivo(self.csv_file)
+        except FileNotFoundError:
+            return None
+        if version == self._version_cargada:
+            return None
+        if version != self._version_vista:
+            self._version_vista = version
+            return None
+        try:
+            return self.recargar()
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            print(f"No se pudo recargar '{self.csv_file}': {e}")
+            self._version_cargada = version
+            return None
+
+    def vigilar_catalogo(self, intervalo: float = INTERVALO_RECARGA, al_recargar=None):
+        """
+        Revisa el CSV cada `intervalo` segundos desde un hilo en segundo
+        plano y lo recarga cuando cambia; `al_recargar(resultado)` se llama
+        en ese hilo. Retorna un evento que detiene la vigilancia al activarse.
+        """
+        detener = threading.Event()
+
+        def vigilar():
+            while not detener.wait(intervalo):
+                resultado = self.recargar_si_cambio()
+                if resultado is not None and al_recargar is not None:
+                    al_recargar(resultado)
+
+        threading.Thread(target=vigilar, name="vigilancia-catalogo", daemon=True).start()
+        return detener
+
+    # --- Punto de entrada para clientes ---
+
+    def answer(self, question: str, user_name: str = "amigo") -> str:
+        """
+        Responde una pregunta; seguro para llamarse desde varios hilos.
+        """
+        intent = self.predecir_intencion(question)
+        with self._instantanea():
+            return self.responder_intencion(intent, question, user_name)
+
+    def answer_many(self, questions, user_name: str = "amigo") -> list:
+        """
+        Responde una lista de preguntas en el mismo orden, clasificándolas
+        todas en un solo lote.
+        """
+        questions = list(questions)
+        intents = self.predecir_intenciones(questions)
+        with self._instantanea():
+            return [self.responder_intencion(intent, question, user_name)
+                    for intent, question in zip(intents, questions)]
+
+    def predecir_intencion(self, texto_usuario: str) -> str:
+        return self.clasificador.predecir_intencion(texto_usuario)
+
+    def predecir_intenciones(self, textos) -> list:
+        return self.clasificador.predecir_intenciones(textos)
+
+    # --- Respuestas para cada intención ---
+
+    def obtener_info_variedades(self) -> str:
+        return "Nuestras variedades incluyen: " + ", ".join(self.variedades_unicas) + "."
+
+    def obtener_info_precios(self, question: str) -> str:
+        """
+        Busca si en la pregunta hay alguna variedad; si la encuentra, devuelve el rango de precio.
+        Si además menciona un productor, el rango es el de ese productor; si
+        solo menciona el productor, se listan sus variedades. Los nombres se
+        reconocen aunque estén mal escritos. Si además pide años, lugar o un
+        rango de precio, el rango se calcula solo con esas filas. Si no, pide
+        especificar la variedad.
+        """
+        filtros = self.filtros_pregunta(question)
+        if set(filtros) - {'coffee_variety', 'name'}:
+            resumen = self.resumen_filtrado(filtros, 'price', k=0)
+            if not resumen["filas"]:
+                return self._sin_resultados(filtros)
+            return (f"El café ({describir_filtros(filtros)}) cuesta entre "
+                    f"${round(resumen['minimo'], 2)} y ${round(resumen['maximo'], 2)} USD por libra.")
+        entidades = self.indice.entidades_mencionadas(question)
+        variedades = self.indice.variedades_mencionadas(question) or entidades["variedad"][:1]
+        for productor in entidades["productor"][:1]:
+            rangos = [(v, self.indice.rango_precio(v, productor))
+                      for v in variedades or self.indice.variedades_de(productor)]
+            rangos = [(v, (round(r[0], 2), round(r[1], 2))) for v, r in rangos if r is not None]
+            if len(rangos) == 1 and variedades:
+                variedad, (precio_min, precio_max) = rangos[0]
+                return (f"El café de variedad {variedad} de {productor} cuesta entre "
+                        f"${precio_min} y ${precio_max} USD por libra.")
+            if rangos:
+                return f"Precios del café de {productor}:\n" + "\n".join(
+                    f"{v}: entre ${precio_min} y ${precio_max} USD por libra" for v, (precio_min, precio_max) in rangos)
+        for variedad in variedades:
+            rango = self.indice.rango_precio(variedad)
+            if rango is not None:
+                precio_min = round(rango[0], 2)
+                precio_max = round(rango[1], 2)
+                return f"El café de variedad {variedad} cuesta entre ${precio_min} y ${precio_max} USD por libra."
+        return ("Por favor dime qué variedad de café te interesa. Las disponibles son:\n"
+                + ", ".join(self.variedades_unicas))
+
+    def obtener_info_precio_max(self, question: str = None) -> str:
+        """
+        Retorna la variedad de café con el precio más alto registrado en el índice,
+        o los cafés más costosos entre los que cumplen los filtros de la pregunta.
+        """
+        filtros = self.filtros_pregunta(question)
+        if filtros:
+            return self._respuesta_top(filtros, 'price', True, "El café más costoso",
+                                       lambda precio: f"${precio:.2f} USD por libra")
+        maximo = self.indice.variedad_precio_max()
+        if maximo is None:
+            return "Lo siento, no cuento con datos de precios para determinar el café más costoso."
+        variedad_top, precio_top = maximo
+        precio_top = round(precio_top, 2)
+        return f"La variedad más costosa es {variedad_top}, con un precio de ${precio_top:.2f} USD por libra."
+
+    def obtener_info_precio_min(self, question: str = None) -> str:
+        """
+        Retorna la variedad de café con el precio más bajo registrado en el índice,
+        o los cafés más económicos entre los que cumplen los filtros de la pregunta.
+        """
+        filtros = self.filtros_pregunta(question)
+        if filtros:
+            return self._respuesta_top(filtros, 'price', False, "El café más económico",
+                                       lambda precio: f"${precio:.2f} USD por libra")
+        minimo = self.indice.variedad_precio_min()
+        if minimo is None:
+            return "Lo siento, no cuento con datos de precios para determinar el café más económico."
+        variedad_baja, precio_bajo = minimo
+        precio_bajo = round(precio_bajo, 2)
+        return f"La variedad más económica es {variedad_baja}, con un precio de ${precio_bajo:.2f} USD por libra."
+
+    def obtener_info_calidad(self, question: str = None) -> str:
+        filtros = self.filtros_pregunta(question)
+        if filtros:
+            resumen = self.resumen_filtrado(filtros, 'ranking', k=0)
+            if not resumen["filas"]:
+                return self._sin_resultados(filtros)
+            return (f"La calidad promedio de nuestros cafés ({describir_filtros(filtros)}) es "
+                    f"{round(resumen['promedio'], 2)} puntos sobre 100, entre {round(resumen['minimo'], 2)} "
+                    f"y {round(resumen['maximo'], 2)} en {resumen['filas']} registros.")
+        promedio = self.indice.ranking_promedio()
+        if promedio is None:
+            return "Lo siento, no cuento con datos de calidad en este momento."
+        promedio = round(promedio, 2)
+        return f"La calidad promedio de nuestros cafés es {promedio} puntos sobre 100."
+
+    def obtener_info_calidad_max(self, question: str = None) -> str:
+        """
+        Retorna la variedad de café con el puntaje en taza más alto, o los
+        cafés mejor puntuados entre los que cumplen los filtros de la pregunta
+        ("el mejor café de Huila de 2024").
+        """
+        filtros = self.filtros_pregunta(question)
+        if filtros:
+            return self._respuesta_top(filtros, 'ranking', True, "El café con mejor puntaje en taza",
+                                       lambda ranking: f"{round(ranking, 2)} puntos sobre 100")
+        mejor = self.indice.variedad_mejor_ranking()
+        if mejor is None:
+            return "Lo siento, no cuento con datos del puntaje en taza para determinar el mejor café."
+        variedad_top, ranking_top = mejor
+        ranking_top = round(ranking_top, 2)
+        return f"La variedad con mejor puntaje en taza es {variedad_top}, con un puntaje de {ranking_top} sobre 100."
+
+    def obtener_info_años(self) -> str:
+        años = [str(int(a)) for a in self.años_unicos]
+        return "Tenemos cafés de las siguientes cosechas: " + ", ".join(años) + "."
+
+    def obtener_info_productor_lugar(self, question: str = None) -> str:
+        return self._listado_completo("productor_lugar", question)
+
+    def obtener_info_propiedades(self, question: str = None) -> str:
+        return self._listado_completo("propiedad", question)
+
+    # --- Consultas con filtros ---
+
+    def filtros_pregunta(self, question: str = None) -> dict:
+        """
+        Filtros que pide la pregunta (ver `consultas`): la variedad, el
+        productor y el lugar que menciona, aunque estén mal escritos, y los
+        rangos de años y de precio; {} si no pide ninguno.
+        """
+        if not question:
+            return {}
+        entidades = self.indice.entidades_mencionadas(question)
+        entidades["variedad"] = self.indice.variedades_mencionadas(question) or entidades["variedad"]
+        filtros = {columna: entidades[tipo][0] for columna, tipo in COLUMNAS_FILTRO.items() if entidades[tipo]}
+        filtros.update(rangos_mencionados(question, self.indice.años))
+        return filtros
+
+    def facetas(self, df: pd.DataFrame = None) -> IndiceFacetas:
+        """
+        Índice de filtros del DataFrame actual (o de `df`); se arma de nuevo
+        cuando el catálogo cambia.
+        """
+        df = self.df if df is None else df
+        facetas = self._facetas
+        if facetas is None or facetas.df is not df:
+            # Se arma una sola vez aunque lo pidan varios hilos a la vez
+            with self._lock_facetas:
+                facetas = self._facetas
+                if facetas is None or facetas.df is not df:
+                    facetas = self._facetas = IndiceFacetas(df)
+        return facetas
+
+    def resumen_filtrado(self, filtros: dict, columna: str, k: int = TOP, mayor: bool = True) -> dict:
+        """
+        Mínimo, máximo, promedio y las `k` mejores filas de `columna` entre
+        las que cumplen los filtros (ver `consultas.resumir_filas`). Sin el
+        DataFrame en memoria se recorre el CSV por bloques.
+        """
+        df = self.df
+        if df is not None:
+            return self.facetas(df).resumen(filtros, columna, k, mayor)
+        return combinar_resumenes((resumir_filas(bloque[mascara(bloque, filtros)], columna, k, mayor)
+                                   for bloque in leer_por_bloques(self.csv_file, self.tamaño_bloque)),
+                                  columna, k, mayor)
+
+    @staticmethod
+    def _sin_resultados(filtros: dict) -> str:
+        return f"Lo siento, no encontré cafés para {describir_filtros(filtros)}."
+
+    def _respuesta_top(self, filtros: dict, columna: str, mayor: bool, titulo: str, valor) -> str:
+        resumen = self.resumen_filtrado(filtros, columna, TOP, mayor)
+        if not resumen["filas"]:
+            return self._sin_resultados(filtros)
+
+        def describir(fila) -> str:
+            return f"{fila.coffee_variety} de {fila.name} ({fila.location}, {int(fila.year)})"
+
+        primera, *siguientes = resumen["top"].itertuples(index=False)
+        texto = (f"{titulo} ({describir_filtros(filtros)}) es {describir(primera)}, "
+                 f"con {valor(getattr(primera, columna))}.")
+        if siguientes:
+            texto += "\nLe siguen:\n" + "\n".join(
+                f"{describir(fila)}: {valor(getattr(fila, columna))}" for fila in siguientes)
+        return texto
+
+    # --- Listados por páginas ---
+
+    def _listado_completo(self, intent: str, question: str = None) -> str:
+        paginas = self.paginas(intent, tamaño_pagina=TAMAÑO_BLOQUE, filtros=self.filtros_pregunta(question))
+        return "\n".join(pagina["respuesta"] for pagina in paginas)
+
+    def _posiciones_listado(self, df: pd.DataFrame, intent: str, filtros: dict = None) -> np.ndarray:
+        """
+        Posiciones de las filas de `df` que entran en el listado: las que
+        cumplen los filtros y tienen todas sus columnas. Se guardan las de
+        los `LISTADOS_EN_CACHE` listados más recientes de cada versión del
+        catálogo, así cada página no vuelve a recorrer el DataFrame.
+        """
+        clave = (intent, json.dumps(filtros or {}, sort_keys=True))
+        with self._lock_listados:
+            version, guardados = self._listados
+            if version is not df:
+                version, guardados = self._listados = (df, OrderedDict())
+            posiciones = guardados.get(clave)
+            if posiciones is not None:
+                guardados.move_to_end(clave)
+                return posiciones
+
+        columnas = LISTADOS[intent]["columnas"]
+        posiciones = self.facetas(df).filas(filtros) if filtros else np.arange(len(df))
+        posiciones = posiciones[df[columnas].iloc[posiciones].notna().all(axis=1).to_numpy()]
+        with self._lock_listados:
+            if self._listados[0] is df:
+                guardados[clave] = posiciones
+                while len(guardados) > LISTADOS_EN_CACHE:
+                    guardados.popitem(last=False)
+        return posiciones
+
+    def _bloques_listado(self, intent: str, desde: int, filtros: dict = None, tamaño_pagina: int = TAMAÑO_PAGINA):
+        """
+        DataFrames con las filas completas del listado a partir de la fila `desde`,
+        tomados del DataFrame en memoria o leyendo el CSV por bloques. Con
+        `filtros` solo se listan las filas con esos valores. En memoria el
+        primer bloque trae una página y una fila más, y los siguientes
+        duplican su tamaño hasta `tamaño_bloque`: una sola página se arma
+        sin formatear filas de más y un recorrido completo va por bloques grandes.
+        """
+        columnas = LISTADOS[intent]["columnas"]
+
+        df = self.df
+        if df is not None:
+            posiciones = self._posiciones_listado(df, intent, filtros)
+            tamaño = tamaño_pagina + 1
+            while desde < len(posiciones):
+                yield df.iloc[posiciones[desde:desde + tamaño]][columnas]
+                desde += tamaño
+                tamaño = min(2 * tamaño, max(self.tamaño_bloque, tamaño_pagina + 1))
+            return
+        for bloque in leer_por_bloques(self.csv_file, self.tamaño_bloque):
+            listado = bloque[mascara(bloque, filtros)] if filtros else bloque
+            listado = listado[columnas].dropna(subset=columnas)
+            if desde >= len(listado):
+                desde -= len(listado)
+                continue
+            yield listado.iloc[desde:]
+            desde = 0
+
+    def paginas(self, intent: str, cursor: str = None, tamaño_pagina: int = TAMAÑO_PAGINA,
+                filtros: dict = None):
+        """
+        Generador de páginas de un listado ("productor_lugar" o "propiedad"),
+        opcionalmente filtrado (ver `filtros_pregunta`); el cursor conserva
+        los filtros. Cada página es {"respuesta": texto, "cursor": cursor de
+        la siguiente o None}.
+        """
+        desde = 0
+        filtros = filtros or {}
+        if cursor is not None:
+            intent, filtros, desde = leer_cursor(cursor)
+        if intent not in LISTADOS:
+            raise ValueError(f"La intención '{intent}' no tiene listado por páginas.")
+        config = LISTADOS[intent]
+
+        pendientes = []
+        emitidas = desde
+        primera = desde == 0
+        hubo_paginas = False
+        for bloque in self._bloques_listado(intent, desde, filtros, tamaño_pagina):
+            pendientes.extend(config["formato"](bloque).tolist())
+            # Se avanza un índice en vez de recortar la lista en cada página
+            inicio = 0
+            while len(pendientes) - inicio > tamaño_pagina:
+                lineas = pendientes[inicio:inicio + tamaño_pagina]
+                inicio += tamaño_pagina
+                emitidas += len(lineas)
+                yield {"respuesta": self._texto_pagina(config, lineas, primera, filtros),
+                       "cursor": escribir_cursor(intent, filtros, emitidas)}
+                primera = False
+                hubo_paginas = True
+            del pendientes[:inicio]
+        if pendientes or not hubo_paginas:
+            yield {"respuesta": self._texto_pagina(config, pendientes, primera, filtros), "cursor": None}
+
+    @staticmethod
+    def _texto_pagina(config: dict, lineas: list, primera: bool, filtros: dict = None) -> str:
+        nombres = describir_filtros(filtros) if filtros else ""
+        if not lineas and primera:
+            return f"Lo siento, no encontré datos para {nombres}." if nombres else config["sin_datos"]
+        texto = "\n".join(lineas)
+        if not primera:
+            return texto
+        titulo = f"{config['titulo'][:-1]} ({nombres}):" if nombres else config['titulo']
+        return f"{titulo}\n{texto}"
+
+    def pagina(self, intent: str = None, cursor: str = None, tamaño_pagina: int = TAMAÑO_PAGINA,
+               filtros: dict = None) -> dict:
+        """
+        Retorna una sola página de un listado; sin cursor, la primera.
+        """
+        return next(self.paginas(intent, cursor, tamaño_pagina, filtros))
+
+    def answer_paginado(self, question: str, user_name: str = "amigo",
+                        tamaño_pagina: int = TAMAÑO_PAGINA) -> dict:
+        """
+        Como `answer`, pero los listados largos se entregan por páginas:
+        retorna {"intent", "respuesta", "cursor"} y con `cursor` se piden
+        las siguientes a `mas_resultados`.
+        """
+        return next(self.paginas_respuesta(question, user_name, tamaño_pagina=tamaño_pagina))
+
+    def paginas_respuesta(self, question: str = None, user_name: str = "amigo", cursor: str = None,
+                          tamaño_pagina: int = TAMAÑO_PAGINA):
+        """
+        Generador con todas las páginas de la respuesta a `question` (o del
+        listado a partir de `cursor`), cada una como las de `answer_paginado`.
+        El listado se recorre una sola vez, sin volver a buscar la fila de
+        cada cursor.
+        """
+        if cursor is not None:
+            intent = leer_cursor(cursor)[0]
+            for pagina in self.paginas(intent, cursor, tamaño_pagina):
+                yield {"intent": intent, **pagina}
+            return
+        intent = self.predecir_intencion(question)
+        with self._instantanea():
+            if intent in LISTADOS:
+                paginas = self.paginas(intent, None, tamaño_pagina, self.filtros_pregunta(question))
+                # La primera página toma la versión del catálogo que siguen usando las demás
+                primera = self._medir_intencion(intent, next, paginas)
+            else:
+                respuesta = self.responder_intencion(intent, question, user_name)
+        if intent not in LISTADOS:
+            yield {"intent": intent, "respuesta": respuesta, "cursor": None}
+            return
+        yield {"intent": intent, **primera}
+        for pagina in paginas:
+            yield {"intent": intent, **pagina}
+
+    def mas_resultados(self, cursor: str, tamaño_pagina: int = TAMAÑO_PAGINA) -> dict:
+        """
+        Siguiente página de un listado a partir del cursor de la anterior.
+        """
+        return self.pagina(cursor=cursor, tamaño_pagina=tamaño_pagina)
+
+    def obtener_info_bonos(self) -> str:
+        if not self.indice.hay_bonos():
+            return "Lo siento, no cuento con datos de bonos de carbono en este momento."
+        filas = [f"{prod}: {bonos:.2f} 🌱" for prod, bonos in self.indice.bonos_por_productor()]
+        return "Bonos de carbono generados por productor:\n" + "\n".join(filas)
+
+    def obtener_info_bonos_max(self) -> str:
+        """
+        Retorna el productor que genera la mayor cantidad de bonos de carbono.
+        """
+        if not self.indice.hay_bonos():
+            return "Lo siento, no cuento con datos de bonos de carbono en este momento."
+        maximo = self.indice.productor_mas_bonos()
+        if maximo is None:
+            return "Lo siento, no cuento con datos para determinar el productor con mayor bonos de carbono."
+        prod_max, bonos_max = maximo
+        bonos_max = round(bonos_max, 2)
+        return f"El productor que genera mayor bonos de carbono es {prod_max}, con {bonos_max:.2f} 🌱."
+
+    # --- Generar respuesta según intención ---
+
+    def responder_intencion(self, intent: str, question: str, user_name: str) -> str:
+        return self._medir_intencion(intent, self._responder_intencion, intent, question, user_name)
+
+    @staticmethod
+    def _medir_intencion(intent: str, funcion, *args):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args)
+        finally:
+            duracion = time.perf_counter() - inicio
+            LATENCIA_INTENCION.observar(duracion, intent)
+            perfil.registrar("intenciones", intent, duracion)
+
+    def _responder_intencion(self, intent: str, question: str, user_name: str) -> str:
+        if intent == "variedad":
+            return self.obtener_info_variedades()
+
+        elif intent == "precio":
+            return self.obtener_info_precios(question)
+
+        elif intent == "precio_max":
+            return self.obtener_info_precio_max(question)
+
+        elif intent == "precio_min":
+            return self.obtener_info_precio_min(question)
+
+        elif intent == "calidad":
+            return self.obtener_info_calidad(question)
+
+        elif intent == "calidad_max":
+            return self.obtener_info_calidad_max(question)
+
+        elif intent == "año":
+            return self.obtener_info_años()
+
+        elif intent == "productor_lugar":
+            return self.obtener_info_productor_lugar(question)
+
+        elif intent == "propiedad":
+            return self.obtener_info_propiedades(question)
+
+        elif intent == "bonos":
+            return self.obtener_info_bonos()
+
+        elif intent == "bonos_max":
+            return self.obtener_info_bonos_max()
+
+        elif intent == "saludo":
+            return f"¡Hola {user_name.capitalize()}! ¿Cómo estás? 😊 ¿Sobre qué café quieres saber hoy?"
+
+        # Si no se identifica claramente la intención:
+        return (
+            "Lo siento, no entendí tu pregunta. "
+            "¿Quieres saber sobre variedades, precios (incluido el más caro o más barato), "
+            "calidad (promedio o mejor), años de cosecha, productor, propiedades o bonos de carbono?"
+        )
+
+    # --- Compra ---
+
+    def cotizar_pedido(self, lineas, semilla: int = None) -> dict:
+        """
+        Cotiza un pedido de muchas líneas (variedad, productor, cantidad,
+        unidad, moneda) en una sola pasada; ver `pedidos.cotizar_lineas`.
+        Los bonos de cada línea salen de los factores de `carbono`; con
+        `semilla` se sortean de forma reproducible.
+        Retorna {"lineas": DataFrame cotizado, "totales": dict}.
+        """
+        tasas = self.tasas.tasas(esperar=False)
+        cotizadas, codigos, factores = self._cotizar_con_factores(lineas, tasas)
+        cotizadas['bonos'] = np.round(calcular_bonos(codigos, factores, cotizadas['cantidad_lb'], semilla), 2)
+        return {"lineas": cotizadas, "totales": totales_pedido(cotizadas, tasas)}
+
+    def proyectar_bonos(self, lineas, simulaciones: int = SIMULACIONES, semilla: int = 0) -> dict:
+        """
+        Proyecta los bonos de carbono de un conjunto de pedidos: el total
+        esperado y la distribución en `simulaciones` sorteos con `semilla`.
+        Las líneas con error no cuentan.
+        """
+        cotizadas, codigos, factores = self._cotizar_con_factores(lineas, self.tasas.tasas(esperar=False))
+        return simular_bonos(codigos, factores, cotizadas['cantidad_lb'], simulaciones, semilla)
+
+    def _cotizar_con_factores(self, lineas, tasas: dict):
+        lineas = pd.DataFrame(lineas)
+        # Las tablas se toman de una sola versión del índice; la cotización corre sin el candado
+        with self._lock:
+            indice = self.indice
+        por_productor, por_variedad = indice.tabla_precios()
+        tabla_carbono = indice.tabla_carbono()
+        cotizadas = cotizar_lineas(lineas, por_productor, por_variedad, tasas,
+                                   indice.variedad_normalizada, indice.productor_normalizado)
+        codigos, factores = factores_lineas(cotizadas['variedad'], cotizadas['productor'], tabla_carbono)
+        return cotizadas, codigos, factores
+
+    def monedas(self, esperar: bool = True) -> list:
+        """
+        Monedas en las que se puede pagar, según el proveedor de tasas.
+        """
+        return self.tasas.monedas(esperar)
+
+    def productores_y_propiedades(self, variedad: str):
+        indice = self.indice
+        return indice.productores(variedad), indice.propiedades(variedad)
+
+    def realizar_compra(self, variedad: str, productor: str, propiedad: str,
+                        cantidad: float, unidad: str = "Libras", moneda: str = "USD") -> dict:
+        """
+        Calcula el total y los bonos de carbono de una compra.
+        Lanza ErrorCompra si faltan datos, la cantidad no es un número
+        mayor que cero, el productor no cultiva la variedad o no hay precios
+        para la variedad.
+        """
+        inicio = time.perf_counter()
+        resultado = "error"
+        try:
+            compra = self._calcular_compra(variedad, productor, propiedad, cantidad, unidad, moneda)
+            resultado = "ok"
+            return compra
+        finally:
+            LATENCIA_COMPRA.observar(time.perf_counter() - inicio, resultado)
+
+    def _calcular_compra(self, variedad: str, productor: str, propiedad: str,
+                         cantidad: float, unidad: str, moneda: str) -> dict:
+        if not variedad:
+            raise ErrorCompra("Falta información", "Selecciona una variedad de café.")
+        if not productor:
+            raise ErrorCompra("Falta información", "Selecciona un productor.")
+        if not propiedad:
+            raise ErrorCompra("Falta información", "Selecciona una propiedad.")
+        try:
+            cantidad = float(cantidad)
+        except (TypeError, ValueError):
+            cantidad = math.nan
+        if not math.isfinite(cantidad) or cantidad <= 0:
+            raise ErrorCompra("Cantidad inválida", "Introduce un número mayor que cero para la cantidad.")
+
+        indice = self.indice
+        canonica = indice.variedad_normalizada(variedad)
+        if canonica is None:
+            raise ErrorCompra("Sin datos", "No hay precios para esta variedad.")
+        canonico = indice.productor_normalizado(productor)
+        if canonico is None or not indice.cultiva(canonico, canonica):
+            raise ErrorCompra("Productor desconocido", f"{productor} no tiene café {canonica} en el catálogo.")
+        variedad, productor = canonica, canonico
+        precio_usd = indice.precio_promedio(variedad, productor)
+        if precio_usd is None:
+            # El productor cultiva la variedad pero sus filas no tienen precio
+            precio_usd = indice.precio_promedio(variedad)
+        factor_bonos, _ = indice.factor_carbono(variedad, productor)
+        if precio_usd is None:
+            raise ErrorCompra("Sin datos", "No hay precios para esta variedad.")
+        tasa = self.tasas.tasas(esperar=False).get(moneda)
+        if tasa is None:
+            raise ErrorCompra("Sin datos", f"No hay tasa de cambio para {moneda}.")
+
+        if unidad == "Kilos":
+            cantidad_lb = cantidad * LIBRAS_POR_KILO
+        else:
+            cantidad_lb = cantidad
+        total_usd = precio_usd * cantidad_lb
+        total = total_usd * tasa
+        bonos = round((factor_bonos if factor_bonos == factor_bonos else 0.0) * cantidad_lb, 2)
+
+        resumen = (
+            f"Compra de {cantidad:.2f} {unidad.lower()} de café {variedad}\n"
+            f"Productor: {productor}\n"
+            f"Propiedades: {propiedad}\n"
+            f"Precio promedio por libra: ${precio_usd:.2f} USD\n"
+            f"Total a pagar: {simbolo(moneda)}{total:.2f}\n"
+            f"Bonos de carbono generados: {bonos} 🌱"
+        )
+        return {
+            "precio_usd": precio_usd,
+            "cantidad_lb": cantidad_lb,
+            "total": total,
+            "moneda": moneda,
+            "bonos": bonos,
+            "resumen": resumen,
+        }
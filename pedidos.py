@@ -0,0 +1,175 @@
+"""
+Cotización de pedidos de varias líneas.
+
+Un pedido es una tabla con una línea por compra: variedad, productor,
+cantidad, unidad ("Libras" o "Kilos") y moneda (alguna de las que tengan
+tasa de cambio, ver `tasas`). Todas las
+líneas se cotizan en una sola pasada contra la tabla de precios promedio
+por variedad y productor del índice; si el productor existe pero no tiene
+precios para esa variedad se usa el promedio de la variedad, como en
+`realizar_compra`.
+Las líneas que no se pueden cotizar quedan con su motivo en la columna
+"error" y no suman al total.
+
+Uso:
+    python pedidos.py pedido.csv --salida cotizacion.csv
+"""
+
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+LIBRAS_POR_KILO = 2.20462
+
+COLUMNAS_PEDIDO = ['variedad', 'productor', 'cantidad', 'unidad', 'moneda']
+VALORES_POR_DEFECTO = {'unidad': "Libras", 'moneda': "USD"}
+
+# Libras por unidad, según cómo se escriba la unidad en el pedido
+LIBRAS_POR_UNIDAD = {"libras": 1.0, "libra": 1.0, "lb": 1.0,
+                     "kilos": LIBRAS_POR_KILO, "kilo": LIBRAS_POR_KILO, "kg": LIBRAS_POR_KILO}
+
+
+def validar_pedido(lineas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Retorna las líneas con las columnas del pedido, completando unidad y
+    moneda si no vienen. Lanza ValueError si falta otra columna.
+    """
+    # Un pedido vacío puede llegar sin columnas
+    lineas = lineas.copy() if len(lineas.columns) else pd.DataFrame(columns=COLUMNAS_PEDIDO)
+    for col in COLUMNAS_PEDIDO:
+        if col not in lineas.columns:
+            if col not in VALORES_POR_DEFECTO:
+                raise ValueError(f"Falta la columna '{col}' en el pedido.")
+            lineas[col] = VALORES_POR_DEFECTO[col]
+    for col, valor in VALORES_POR_DEFECTO.items():
+        lineas[col] = lineas[col].fillna(valor)
+    return lineas
+
+
+def _codificar(serie: pd.Series, transformar=str.strip):
+    """
+    Códigos de cada fila y valores distintos ya transformados. Las celdas
+    vacías tienen código -1, que apunta al "" agregado al final. Así los
+    textos se limpian una vez por valor y no una vez por línea.
+    """
+    codigos, valores = pd.factorize(serie)
+    distintos = np.array([transformar(str(v)) for v in valores] + [""], dtype=object)
+    return codigos, distintos
+
+
+def cotizar_lineas(lineas: pd.DataFrame, por_productor: pd.Series, por_variedad: pd.Series,
+                   tasas: dict, variedad_normalizada=None, productor_normalizado=None) -> pd.DataFrame:
+    """
+    Agrega a cada línea precio_usd, cantidad_lb, total_usd, total (en su
+    moneda) y error. `por_productor` y `por_variedad` son los precios
+    promedio de `IndiceCatalogo.tabla_precios`; `tasas` son las unidades de
+    cada moneda por dólar. `variedad_normalizada` y `productor_normalizado`
+    traducen nombres escritos con otras mayúsculas o tildes; con
+    `productor_normalizado`, un productor que no existe es un error de la
+    línea en vez de cotizarse al promedio de la variedad.
+    """
+    lineas = validar_pedido(lineas)
+
+    codigos_v, variedades = _codificar(lineas['variedad'])
+    if variedad_normalizada is not None:
+        variedades = np.array([variedad_normalizada(v) or v for v in variedades], dtype=object)
+    codigos_p, productores = _codificar(lineas['productor'])
+    desconocidos = np.zeros(len(productores), dtype=bool)
+    if productor_normalizado is not None:
+        normalizados = [productor_normalizado(p) if p else p for p in productores]
+        desconocidos = np.array([n is None for n in normalizados])
+        productores = np.array([n or p for n, p in zip(normalizados, productores)], dtype=object)
+    codigos_u, unidades = _codificar(lineas['unidad'], lambda u: u.strip().lower())
+    codigos_m, monedas = _codificar(lineas['moneda'], lambda m: m.strip().upper())
+    cantidades = pd.to_numeric(lineas['cantidad'], errors='coerce').to_numpy(dtype=float)
+    factores = np.array([LIBRAS_POR_UNIDAD.get(u, np.nan) for u in unidades])[codigos_u]
+    conversion = np.array([tasas.get(m, np.nan) for m in monedas])[codigos_m]
+
+    # Un precio por cada par (variedad, productor) distinto del pedido
+    pares, codigos_par = np.unique(codigos_v * len(productores) + codigos_p % len(productores),
+                                   return_inverse=True)
+    variedad_par = variedades[pares // len(productores)]
+    claves = pd.MultiIndex.from_arrays([variedad_par, productores[pares % len(productores)]])
+    precio_par = por_productor.reindex(claves).to_numpy(dtype=float, copy=True)
+    sin_productor = np.isnan(precio_par)
+    precio_par[sin_productor] = por_variedad.reindex(variedad_par[sin_productor]).to_numpy(dtype=float)
+    precios = precio_par[codigos_par]
+
+    errores = np.select(
+        [variedades[codigos_v] == "",
+         productores[codigos_p] == "",
+         desconocidos[codigos_p],
+         ~np.isfinite(cantidades) | (cantidades <= 0),
+         np.isnan(factores),
+         np.isnan(conversion),
+         np.isnan(precios)],
+        ["Falta la variedad.",
+         "Falta el productor.",
+         "Productor desconocido.",
+         "Cantidad inválida.",
+         "Unidad desconocida.",
+         "Moneda desconocida.",
+         "No hay precios para esta variedad."],
+        default="")
+    validas = errores == ""
+
+    cantidad_lb = np.where(validas, cantidades * factores, np.nan)
+    total_usd = np.where(validas, precios * cantidad_lb, np.nan)
+
+    lineas['variedad'] = variedades[codigos_v]
+    lineas['productor'] = productores[codigos_p]
+    lineas['moneda'] = monedas[codigos_m]
+    lineas['precio_usd'] = np.where(validas, precios, np.nan)
+    lineas['cantidad_lb'] = cantidad_lb
+    lineas['total_usd'] = total_usd
+    lineas['total'] = total_usd * conversion
+    lineas['error'] = errores
+    return lineas
+
+
+def totales_pedido(cotizadas: pd.DataFrame, tasas: dict) -> dict:
+    """
+    Totales del pedido: en USD y en cada moneda de `tasas` (total_cop, ...)
+    sobre todas las líneas válidas, y la suma de las líneas en cada moneda.
+    Si las líneas traen bonos de carbono también se suman.
+    """
+    validas = cotizadas[cotizadas['error'] == ""]
+    total_usd = float(validas['total_usd'].sum())
+    bonos = {"bonos": round(float(validas['bonos'].sum()), 2)} if 'bonos' in validas.columns else {}
+    return {
+        "lineas": len(cotizadas),
+        "lineas_con_error": int(len(cotizadas) - len(validas)),
+        "cantidad_lb": float(validas['cantidad_lb'].sum()),
+        "total_usd": total_usd,
+        **{f"total_{moneda.lower()}": total_usd * tasa for moneda, tasa in tasas.items() if moneda != "USD"},
+        "por_moneda": {moneda: float(total) for moneda, total in validas.groupby('moneda')['total'].sum().items()},
+        **bonos,
+    }
+
+
+def leer_pedido(ruta: str) -> pd.DataFrame:
+    return validar_pedido(pd.read_csv(ruta))
+
+
+def guardar_cotizacion(cotizadas: pd.DataFrame, ruta: str):
+    cotizadas.to_csv(ruta, index=False, float_format="%.2f")
+
+
+def main():
+    from motor import MotorChat
+
+    parser = argparse.ArgumentParser(description="Cotiza un pedido de varias líneas desde un CSV.")
+    parser.add_argument("pedido", help="CSV con columnas " + ", ".join(COLUMNAS_PEDIDO) + ".")
+    parser.add_argument("--salida", help="CSV donde guardar las líneas cotizadas.")
+    args = parser.parse_args()
+
+    cotizacion = MotorChat().cotizar_pedido(leer_pedido(args.pedido))
+    if args.salida:
+        guardar_cotizacion(cotizacion["lineas"], args.salida)
+    print(json.dumps(cotizacion["totales"], ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Medición de tiempos del arranque y de las respuestas.
+
+Desactivado no cuesta casi nada: `tramo` retorna un contexto vacío y
+`registrar` retorna de inmediato. Se activa con variables de entorno o desde
+el programa con `perfil.activar()`:
+
+    AGROCONECTA_PERFIL=perfil.json     # reporte JSON al terminar
+    AGROCONECTA_CPROFILE=perfil.prof   # además, volcado de cProfile
+
+    python main.py --perfil            # lo mismo que AGROCONECTA_PERFIL=perfil.json
+
+El reporte trae los tramos medidos (nombre, hilo, inicio y duración en ms),
+las marcas de tiempo como "ventana_interactiva" y, por grupo, cuántas veces
+se llamó cada operación y cuánto tardó; por ejemplo el grupo "intenciones"
+con cada manejador de `MotorChat.responder_intencion`. El volcado de
+cProfile se lee con `python -m pstats perfil.prof`.
+"""
+
+import atexit
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+RUTA_REPORTE = "perfil.json"
+VARIABLE_REPORTE = "AGROCONECTA_PERFIL"
+VARIABLE_CPROFILE = "AGROCONECTA_CPROFILE"
+
+_SIN_MEDIR = contextlib.nullcontext()
+
+
+def _nada():
+    pass
+
+
+def _ms(segundos: float) -> float:
+    return round(segundos * 1000, 3)
+
+
+class Perfilador:
+    """
+    Acumula tramos, marcas y tiempos por operación. Puede usarse desde
+    varios hilos.
+    """
+
+    def __init__(self):
+        self.activo = False
+        self.ruta_reporte = None
+        self.ruta_cprofile = None
+        self._inicio = time.perf_counter()
+        self._fecha = datetime.now()
+        self._tramos = []
+        self._marcas = {}
+        self._grupos = {}
+        self._niveles = threading.local()
+        self._lock = threading.Lock()
+        self._cprofile = None
+        self._registrado = False
+
+    def activar(self, ruta_reporte: str = RUTA_REPORTE, ruta_cprofile: str = None):
+        """
+        Empieza a medir; el reporte se escribe en `ruta_reporte` al terminar
+        el proceso. Con `ruta_cprofile` también corre cProfile hasta
+        `detener_cprofile` o hasta el final.
+        """
+        self.activo = True
+        self.ruta_reporte = ruta_reporte
+        if ruta_cprofile and self._cprofile is None:
+            import cProfile
+            self.ruta_cprofile = ruta_cprofile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        if not self._registrado:
+            atexit.register(self._al_salir)
+            self._registrado = True
+
+    def tramo(self, nombre: str):
+        """
+        Contexto que mide el tiempo de su bloque.
+        """
+        if not self.activo:
+            return _SIN_MEDIR
+        return self._medir_tramo(nombre)
+
+    def empezar(self, nombre: str):
+        """
+        Como `tramo`, para código que no cabe en un bloque `with`: retorna
+        la función que cierra el tramo.
+        """
+        if not self.activo:
+            return _nada
+        contexto = self._medir_tramo(nombre)
+        contexto.__enter__()
+        return lambda: contexto.__exit__(None, None, None)
+
+    @contextlib.contextmanager
+    def _medir_tramo(self, nombre: str):
+        nivel = getattr(self._niveles, "actual", 0)
+        self._niveles.actual = nivel + 1
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            fin = time.perf_counter()
+            self._niveles.actual = nivel
+            with self._lock:
+                self._tramos.append({
+                    "nombre": nombre,
+                    "hilo": threading.current_thread().name,
+                    "nivel": nivel,
+                    "inicio_ms": _ms(inicio - self._inicio),
+                    "duracion_ms": _ms(fin - inicio),
+                })
+
+    def marca(self, nombre: str):
+        """
+        Guarda el momento en que ocurrió algo, contado desde que se importó
+        este módulo. Solo cuenta la primera vez.
+        """
+        if self.activo:
+            with self._lock:
+                self._marcas.setdefault(nombre, _ms(time.perf_counter() - self._inicio))
+
+    def registrar(self, grupo: str, nombre: str, segundos: float):
+        """
+        Suma una llamada de `segundos` a la operación `nombre` del `grupo`.
+        """
+        if not self.activo:
+            return
+        with self._lock:
+            datos = self._grupos.setdefault(grupo, {}).setdefault(nombre, [0, 0.0, 0.0])
+            datos[0] += 1
+            datos[1] += segundos
+            datos[2] = max(datos[2], segundos)
+
+    def reporte(self) -> dict:
+        with self._lock:
+            grupos = {
+                grupo: {
+                    nombre: {
+                        "llamadas": llamadas,
+                        "total_ms": _ms(total),
+                        "promedio_ms": _ms(total / llamadas),
+                        "max_ms": _ms(maximo),
+                    }
+                    for nombre, (llamadas, total, maximo) in sorted(operaciones.items())
+                }
+                for grupo, operaciones in self._grupos.items()
+            }
+            return {
+                "fecha": self._fecha.isoformat(timespec="seconds"),
+                "python": sys.version.split()[0],
+                "argumentos": sys.argv,
+                "tramos": sorted(self._tramos, key=lambda t: t["inicio_ms"]),
+                "marcas": dict(self._marcas),
+                **grupos,
+            }
+
+    def detener_cprofile(self):
+        """
+        Deja de perfilar con cProfile y escribe el volcado.
+        """
+        if self._cprofile is None:
+            return
+        perfilador, self._cprofile = self._cprofile, None
+        perfilador.disable()
+        perfilador.dump_stats(self.ruta_cprofile)
+
+    def guardar(self, ruta: str = None):
+        ruta = ruta or self.ruta_reporte or RUTA_REPORTE
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(self.reporte(), f, ensure_ascii=False, indent=2)
+        os.replace(temporal, ruta)
+
+    def _al_salir(self):
+        try:
+            self.detener_cprofile()
+            self.guardar()
+        except OSError as e:
+            print(f"No se pudo guardar el reporte de tiempos: {e}")
+
+
+perfil = Perfilador()
+
+if os.environ.get(VARIABLE_REPORTE) or os.environ.get(VARIABLE_CPROFILE):
+    perfil.activar(os.environ.get(VARIABLE_REPORTE) or RUTA_REPORTE,
+                   os.environ.get(VARIABLE_CPROFILE))
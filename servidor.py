@@ -0,0 +1,533 @@
+"""
+Servidor asíncrono del chatbot de Aracelly.
+
+Expone el motor por HTTP con peticiones y respuestas JSON y por WebSocket.
+Los listados largos se entregan por páginas con un cursor para pedir las
+siguientes (POST /mas, o el campo "cursor" en WebSocket). POST /pedido
+cotiza un pedido de muchas líneas de una vez. La clasificación
+y las consultas al catálogo corren en un grupo de hilos o de procesos para
+no bloquear el bucle de eventos, y el número de peticiones pendientes está
+limitado para que el servidor responda 503 en lugar de acumular trabajo.
+GET /metricas entrega latencias y contadores en formato de texto de Prometheus.
+Un cuerpo de más de --max-cuerpo bytes se rechaza con 413, unas cabeceras
+demasiado largas o numerosas con 431, un Transfer-Encoding con 501 y un mensaje
+WebSocket de más de --max-trama bytes cierra la conexión con el código 1009.
+
+Uso:
+    python servidor.py --port 8080 --workers 4 --max-pendientes 128
+    python servidor.py --recargar 5    # recarga el CSV si cambia
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+
+from catalogo import RUTA_DATASET
+from metricas import metrica, metricas, metricas_cache
+from motor import ErrorCompra, MotorChat
+
+GUID_WEBSOCKET = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+RUTAS = ("/salud", "/preguntar", "/mas", "/comprar", "/pedido", "/metricas")
+# Bytes máximos del cuerpo de una petición HTTP y de un mensaje WebSocket
+MAX_CUERPO = 32 * 1024 * 1024
+MAX_TRAMA = 1024 * 1024
+# Número y bytes totales máximos de las cabeceras de una petición HTTP
+MAX_CABECERAS = 100
+MAX_BYTES_CABECERAS = 64 * 1024
+# Código de cierre WebSocket para un mensaje demasiado grande (RFC 6455, 7.4.1)
+CIERRE_MENSAJE_GRANDE = 1009
+# Tipos JSON que se aceptan como valor de un campo de compra o de pedido
+ESCALARES = (str, int, float, type(None))
+
+LATENCIA_PETICION = metricas.histograma(
+    "agroconecta_peticion_segundos", "Tiempo de cada petición HTTP según ruta y código.", ("ruta", "codigo"))
+LATENCIA_RESPUESTA = metricas.histograma(
+    "agroconecta_respuesta_segundos",
+    "Tiempo de una pregunta según su intención, incluida la espera en el grupo de trabajo.", ("intent",))
+
+# --- Trabajo en procesos: cada proceso carga su propio motor ---
+
+_motor_proceso = None
+
+
+def _iniciar_proceso(csv_file: str, intervalo_recarga: float = None):
+    global _motor_proceso
+    _motor_proceso = MotorChat(csv_file)
+    if intervalo_recarga:
+        _motor_proceso.vigilar_catalogo(intervalo_recarga)
+
+
+def _responder_en_proceso(question: str, user_name: str) -> dict:
+    return _motor_proceso.answer_paginado(question, user_name)
+
+
+def _mas_en_proceso(cursor: str) -> dict:
+    return _motor_proceso.mas_resultados(cursor)
+
+
+def _comprar_en_proceso(datos: dict) -> dict:
+    return _motor_proceso.realizar_compra(**datos)
+
+
+def _cotizar_en_proceso(lineas: list) -> dict:
+    return _cotizacion_json(_motor_proceso.cotizar_pedido(lineas))
+
+
+def _cotizacion_json(cotizacion: dict) -> dict:
+    lineas = cotizacion["lineas"].astype(object)
+    return {"lineas": lineas.where(lineas.notna(), None).to_dict("records"), "totales": cotizacion["totales"]}
+
+
+class ServidorOcupado(Exception):
+    """
+    Se alcanzó el límite de peticiones pendientes.
+    """
+
+
+class TramaDemasiadoGrande(Exception):
+    """
+    Un mensaje WebSocket supera el tamaño máximo.
+    """
+
+
+class PeticionInvalida(Exception):
+    """
+    La petición HTTP no se puede leer; `estado` es el código con que se
+    responde antes de cerrar la conexión.
+    """
+
+    def __init__(self, estado: int, mensaje: str):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+class ServidorChat:
+    """
+    Atiende preguntas y compras de forma concurrente sobre un único motor.
+
+    Con `procesos=True` cada proceso del grupo carga su propio motor; si no,
+    todos los hilos comparten `motor` (o uno nuevo cargado desde `csv_file`).
+    En ese caso las métricas del motor y de la caché de intenciones quedan en
+    cada proceso y /metricas muestra solo las que mide el servidor.
+    Con `intervalo_recarga` cada motor revisa el CSV cada tantos segundos y
+    lo recarga si cambió (ver `MotorChat.vigilar_catalogo`). `max_cuerpo` y
+    `max_trama` limitan en bytes el cuerpo HTTP y los mensajes WebSocket.
+    """
+
+    def __init__(self, motor: MotorChat = None, workers: int = 4, procesos: bool = False,
+                 max_pendientes: int = 64, csv_file: str = RUTA_DATASET, intervalo_recarga: float = None,
+                 max_cuerpo: int = MAX_CUERPO, max_trama: int = MAX_TRAMA):
+        self.max_pendientes = max_pendientes
+        self.max_cuerpo = max_cuerpo
+        self.max_trama = max_trama
+        self.pendientes = 0
+        if procesos:
+            self.motor = None
+            self._pool = ProcessPoolExecutor(workers, initializer=_iniciar_proceso,
+                                             initargs=(csv_file, intervalo_recarga))
+            self._responder = _responder_en_proceso
+            self._mas = _mas_en_proceso
+            self._comprar = _comprar_en_proceso
+            self._cotizar = _cotizar_en_proceso
+        else:
+            self.motor = motor or MotorChat(csv_file)
+            self._pool = ThreadPoolExecutor(workers)
+            self._responder = self.motor.answer_paginado
+            self._mas = self.motor.mas_resultados
+            self._comprar = lambda datos: self.motor.realizar_compra(**datos)
+            self._cotizar = lambda lineas: _cotizacion_json(self.motor.cotizar_pedido(lineas))
+            if intervalo_recarga:
+                self.motor.vigilar_catalogo(intervalo_recarga)
+        self._servidor = None
+
+    async def _ejecutar(self, funcion, *args):
+        if self.pendientes >= self.max_pendientes:
+            raise ServidorOcupado()
+        self.pendientes += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, funcion, *args)
+        finally:
+            self.pendientes -= 1
+
+    async def _preguntar(self, question: str, user_name: str) -> dict:
+        inicio = time.perf_counter()
+        respuesta = await self._ejecutar(self._responder, question, user_name)
+        LATENCIA_RESPUESTA.observar(time.perf_counter() - inicio, respuesta["intent"])
+        return respuesta
+
+    def texto_metricas(self) -> str:
+        adicionales = [metrica("agroconecta_peticiones_pendientes", "gauge",
+                               "Peticiones en curso en el grupo de trabajo.", self.pendientes)]
+        if self.motor is not None:
+            adicionales.append(metricas_cache(self.motor.clasificador.estadisticas_cache()))
+        return metricas.texto(*adicionales)
+
+    # --- Rutas ---
+
+    async def atender(self, metodo: str, ruta: str, cuerpo: dict = None):
+        """
+        Resuelve una petición y retorna (código HTTP, cuerpo JSON). /metricas
+        retorna texto.
+        """
+        inicio = time.perf_counter()
+        estado, respuesta = await self._atender(metodo, ruta, cuerpo or {})
+        LATENCIA_PETICION.observar(time.perf_counter() - inicio, ruta if ruta in RUTAS else "otra", str(estado))
+        return estado, respuesta
+
+    async def _atender(self, metodo: str, ruta: str, cuerpo: dict):
+        try:
+            if metodo == "GET" and ruta == "/salud":
+                return 200, {"estado": "ok", "pendientes": self.pendientes,
+                             "max_pendientes": self.max_pendientes}
+            if metodo == "GET" and ruta == "/metricas":
+                return 200, self.texto_metricas()
+            if metodo == "POST" and ruta == "/preguntar":
+                question = str(cuerpo.get("question", "")).strip()
+                if not question:
+                    return 400, {"error": "Falta el campo 'question'."}
+                user_name = str(cuerpo.get("user_name") or "amigo")
+                return 200, await self._preguntar(question, user_name)
+            if metodo == "POST" and ruta == "/mas":
+                cursor = cuerpo.get("cursor")
+                if not cursor:
+                    return 400, {"error": "Falta el campo 'cursor'."}
+                return 200, await self._ejecutar(self._mas, str(cursor))
+            if metodo == "POST" and ruta == "/comprar":
+                datos = self._datos_compra(cuerpo)
+                compra = await self._ejecutar(self._comprar, datos)
+                return 200, compra
+            if metodo == "POST" and ruta == "/pedido":
+                lineas = cuerpo.get("lineas")
+                if not isinstance(lineas, list) or not all(
+                        isinstance(l, dict) and all(isinstance(v, ESCALARES) for v in l.values()) for l in lineas):
+                    return 400, {"error": "El campo 'lineas' debe ser una lista de objetos con textos o números."}
+                return 200, await self._ejecutar(self._cotizar, lineas)
+        except ServidorOcupado:
+            return 503, {"error": "Servidor ocupado, intenta de nuevo en un momento."}
+        except ErrorCompra as e:
+            return 400, {"error": str(e), "titulo": e.titulo}
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        except Exception:
+            traceback.print_exc()
+            return 500, {"error": "Error interno del servidor."}
+        return 404, {"error": f"Ruta no encontrada: {metodo} {ruta}"}
+
+    @staticmethod
+    def _datos_compra(cuerpo: dict) -> dict:
+        """
+        Argumentos de `MotorChat.realizar_compra`; la cantidad la valida el motor.
+        """
+        datos = {
+            "variedad": cuerpo.get("variedad", ""),
+            "productor": cuerpo.get("productor", ""),
+            "propiedad": cuerpo.get("propiedad", ""),
+            "unidad": cuerpo.get("unidad", "Libras"),
+            "moneda": cuerpo.get("moneda", "USD"),
+        }
+        for campo, valor in datos.items():
+            if not isinstance(valor, str):
+                raise ErrorCompra("Datos inválidos", f"El campo '{campo}' debe ser texto.")
+        return {**datos, "cantidad": cuerpo.get("cantidad", 1)}
+
+    async def responder_por_partes(self, question: str = None, user_name: str = "amigo",
+                                   cursor: str = None, max_paginas: int = None):
+        """
+        Generador asíncrono con los mensajes que recibe un cliente WebSocket:
+        una página por mensaje y un mensaje final. Si se alcanza `max_paginas`
+        el mensaje final trae el cursor para continuar.
+        """
+        enviadas = 0
+        paginas = None
+        try:
+            if self.motor is not None:
+                # Con hilos todas las páginas salen de un mismo generador del motor
+                inicio = time.perf_counter()
+                paginas = self.motor.paginas_respuesta(question, user_name, cursor)
+                pagina = await self._ejecutar(next, paginas)
+                if cursor is None:
+                    LATENCIA_RESPUESTA.observar(time.perf_counter() - inicio, pagina["intent"])
+            elif cursor is None:
+                pagina = await self._preguntar(question, user_name)
+            else:
+                pagina = await self._ejecutar(self._mas, cursor)
+            while True:
+                yield {"tipo": "parcial", "texto": pagina["respuesta"]}
+                enviadas += 1
+                cursor = pagina["cursor"]
+                if cursor is None or (max_paginas and enviadas >= max_paginas):
+                    break
+                if paginas is not None:
+                    pagina = await self._ejecutar(next, paginas)
+                else:
+                    pagina = await self._ejecutar(self._mas, cursor)
+        except ServidorOcupado:
+            yield {"tipo": "error", "error": "Servidor ocupado, intenta de nuevo en un momento."}
+            return
+        except ValueError as e:
+            yield {"tipo": "error", "error": str(e)}
+            return
+        except Exception:
+            traceback.print_exc()
+            yield {"tipo": "error", "error": "Error interno del servidor."}
+            return
+        yield {"tipo": "fin", "cursor": cursor}
+
+    # --- Protocolo HTTP/1.1 ---
+
+    async def _atender_conexion(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    peticion = await _leer_peticion(reader, self.max_cuerpo)
+                except PeticionInvalida as e:
+                    # El cuerpo no se leyó, así que la conexión no se puede seguir usando
+                    _escribir_respuesta(writer, e.estado, {"error": str(e)}, cerrar=True)
+                    await writer.drain()
+                    break
+                if peticion is None:
+                    break
+                metodo, ruta, cabeceras, datos = peticion
+                if cabeceras.get("upgrade", "").lower() == "websocket" and ruta == "/ws":
+                    await self._atender_websocket(reader, writer, cabeceras)
+                    break
+                try:
+                    cuerpo = json.loads(datos) if datos else {}
+                    if not isinstance(cuerpo, dict):
+                        raise ValueError
+                except ValueError:
+                    estado, respuesta = 400, {"error": "El cuerpo debe ser un objeto JSON."}
+                else:
+                    estado, respuesta = await self.atender(metodo, ruta, cuerpo)
+                _escribir_respuesta(writer, estado, respuesta, cerrar=estado == 503)
+                await writer.drain()
+                if estado == 503 or cabeceras.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # --- Protocolo WebSocket (RFC 6455) ---
+
+    async def _atender_websocket(self, reader, writer, cabeceras: dict):
+        clave = cabeceras.get("sec-websocket-key", "")
+        aceptar = base64.b64encode(hashlib.sha1((clave + GUID_WEBSOCKET).encode()).digest()).decode()
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {aceptar}\r\n\r\n".encode()
+        )
+        await writer.drain()
+        while True:
+            try:
+                opcode, datos = await _leer_trama(reader, self.max_trama)
+            except TramaDemasiadoGrande:
+                writer.write(_trama(0x8, struct.pack("!H", CIERRE_MENSAJE_GRANDE)))
+                await writer.drain()
+                return
+            if opcode == 0x8:
+                writer.write(_trama(0x8, b""))
+                await writer.drain()
+                return
+            if opcode == 0x9:
+                writer.write(_trama(0xA, datos))
+                await writer.drain()
+                continue
+            if opcode != 0x1:
+                continue
+            try:
+                mensaje = json.loads(datos.decode("utf-8"))
+                question = str(mensaje.get("question", "")).strip()
+                user_name = str(mensaje.get("user_name") or "amigo")
+                cursor = mensaje.get("cursor")
+                max_paginas = int(mensaje.get("max_paginas") or 0) or None
+            except (ValueError, TypeError, AttributeError):
+                question, cursor = "", None
+            if not question and not cursor:
+                await _enviar_json(writer, {"tipo": "error", "error": "Falta el campo 'question' o 'cursor'."})
+                continue
+            async for parte in self.responder_por_partes(question, user_name, cursor and str(cursor),
+                                                         max_paginas):
+                await _enviar_json(writer, parte)
+
+    # --- Ciclo de vida ---
+
+    async def iniciar(self, host: str = "127.0.0.1", port: int = 8080):
+        self._servidor = await asyncio.start_server(self._atender_conexion, host, port)
+        return self._servidor.sockets[0].getsockname()[:2]
+
+    async def detener(self):
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    async def servir(self, host: str = "127.0.0.1", port: int = 8080):
+        host, port = await self.iniciar(host, port)
+        print(f"Servidor de Aracelly escuchando en http://{host}:{port}")
+        async with self._servidor:
+            await self._servidor.serve_forever()
+
+
+class ClienteLocal:
+    """
+    Cliente en el mismo proceso para pruebas: llama a las rutas del servidor
+    sin abrir sockets.
+    """
+
+    def __init__(self, servidor: ServidorChat):
+        self.servidor = servidor
+
+    async def get(self, ruta: str):
+        return await self.servidor.atender("GET", ruta)
+
+    async def post(self, ruta: str, cuerpo: dict):
+        return await self.servidor.atender("POST", ruta, cuerpo)
+
+    async def preguntar_por_partes(self, question: str = None, user_name: str = "amigo",
+                                   cursor: str = None, max_paginas: int = None) -> list:
+        return [parte async for parte in
+                self.servidor.responder_por_partes(question, user_name, cursor, max_paginas)]
+
+
+# --- Utilidades de protocolo ---
+
+async def _leer_peticion(reader: asyncio.StreamReader, max_cuerpo: int = MAX_CUERPO):
+    linea = await _leer_linea(reader, 400, "La línea de petición es demasiado larga.")
+    if not linea:
+        return None
+    try:
+        metodo, ruta, _ = linea.decode("latin-1").split(" ", 2)
+    except ValueError:
+        return None
+    cabeceras = {}
+    leidos = 0
+    while True:
+        linea = await _leer_linea(reader, 431, "Una cabecera es demasiado larga.")
+        if linea in (b"\r\n", b"\n", b""):
+            break
+        leidos += len(linea)
+        if len(cabeceras) >= MAX_CABECERAS or leidos > MAX_BYTES_CABECERAS:
+            raise PeticionInvalida(431, "Las cabeceras superan el máximo permitido.")
+        nombre, _, valor = linea.decode("latin-1").partition(":")
+        cabeceras[nombre.strip().lower()] = valor.strip()
+    if "transfer-encoding" in cabeceras:
+        # Solo se admiten cuerpos con Content-Length
+        raise PeticionInvalida(501, "Transfer-Encoding no soportado; envía Content-Length.")
+    try:
+        longitud = int(cabeceras.get("content-length", 0) or 0)
+    except ValueError:
+        longitud = -1
+    if longitud < 0:
+        raise PeticionInvalida(400, "Cabecera Content-Length inválida.")
+    if longitud > max_cuerpo:
+        raise PeticionInvalida(413, f"El cuerpo supera el máximo de {max_cuerpo} bytes.")
+    datos = await reader.readexactly(longitud) if longitud else b""
+    return metodo.upper(), ruta.split("?", 1)[0], cabeceras, datos
+
+
+async def _leer_linea(reader: asyncio.StreamReader, estado: int, mensaje: str) -> bytes:
+    """
+    Una línea de la petición; si supera el límite del lector lanza
+    PeticionInvalida con `estado`.
+    """
+    try:
+        return await reader.readline()
+    except ValueError:
+        # readline convierte el LimitOverrunError del lector en ValueError
+        raise PeticionInvalida(estado, mensaje) from None
+
+
+def _escribir_respuesta(writer: asyncio.StreamWriter, estado: int, cuerpo, cerrar: bool = False):
+    if isinstance(cuerpo, str):
+        datos = cuerpo.encode("utf-8")
+        tipo = "text/plain; version=0.0.4; charset=utf-8"
+    else:
+        datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+        tipo = "application/json; charset=utf-8"
+    cabeceras = [
+        f"HTTP/1.1 {estado} {HTTPStatus(estado).phrase}",
+        f"Content-Type: {tipo}",
+        f"Content-Length: {len(datos)}",
+        "Connection: close" if cerrar else "Connection: keep-alive",
+    ]
+    if estado == 503:
+        cabeceras.append("Retry-After: 1")
+    writer.write(("\r\n".join(cabeceras) + "\r\n\r\n").encode("latin-1") + datos)
+
+
+async def _leer_trama(reader: asyncio.StreamReader, max_trama: int = MAX_TRAMA):
+    cabecera = await reader.readexactly(2)
+    opcode = cabecera[0] & 0x0F
+    enmascarada = cabecera[1] & 0x80
+    longitud = cabecera[1] & 0x7F
+    if longitud == 126:
+        (longitud,) = struct.unpack("!H", await reader.readexactly(2))
+    elif longitud == 127:
+        (longitud,) = struct.unpack("!Q", await reader.readexactly(8))
+    if longitud > max_trama:
+        raise TramaDemasiadoGrande()
+    mascara = await reader.readexactly(4) if enmascarada else None
+    datos = await reader.readexactly(longitud)
+    if mascara:
+        datos = bytes(b ^ mascara[i % 4] for i, b in enumerate(datos))
+    return opcode, datos
+
+
+def _trama(opcode: int, datos: bytes, mascara: bytes = None) -> bytes:
+    primero = bytes([0x80 | opcode])
+    bit_mascara = 0x80 if mascara else 0
+    longitud = len(datos)
+    if longitud < 126:
+        cabecera = primero + bytes([bit_mascara | longitud])
+    elif longitud < 1 << 16:
+        cabecera = primero + bytes([bit_mascara | 126]) + struct.pack("!H", longitud)
+    else:
+        cabecera = primero + bytes([bit_mascara | 127]) + struct.pack("!Q", longitud)
+    if mascara:
+        datos = bytes(b ^ mascara[i % 4] for i, b in enumerate(datos))
+        return cabecera + mascara + datos
+    return cabecera + datos
+
+
+async def _enviar_json(writer: asyncio.StreamWriter, mensaje: dict):
+    writer.write(_trama(0x1, json.dumps(mensaje, ensure_ascii=False).encode("utf-8")))
+    await writer.drain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor HTTP/WebSocket del chatbot de Aracelly.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=4, help="Tamaño del grupo de trabajo.")
+    parser.add_argument("--procesos", action="store_true", help="Usar procesos en lugar de hilos.")
+    parser.add_argument("--max-pendientes", type=int, default=64,
+                        help="Peticiones en curso antes de responder 503.")
+    parser.add_argument("--csv", default=RUTA_DATASET)
+    parser.add_argument("--recargar", type=float, metavar="SEGUNDOS",
+                        help="Revisar el CSV cada SEGUNDOS y recargarlo si cambió.")
+    parser.add_argument("--max-cuerpo", type=int, default=MAX_CUERPO, help="Bytes máximos del cuerpo HTTP.")
+    parser.add_argument("--max-trama", type=int, default=MAX_TRAMA, help="Bytes máximos de un mensaje WebSocket.")
+    args = parser.parse_args()
+
+    servidor = ServidorChat(workers=args.workers, procesos=args.procesos,
+                            max_pendientes=args.max_pendientes, csv_file=args.csv,
+                            intervalo_recarga=args.recargar, max_cuerpo=args.max_cuerpo,
+                            max_trama=args.max_trama)
+    try:
+        asyncio.run(servidor.servir(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Tasas de cambio para las compras y cotizaciones.
+
+Las tasas dicen cuántas unidades de cada moneda vale un dólar y vienen de
+un proveedor intercambiable: tasas fijas (por defecto), un archivo JSON o un
+servicio HTTP que responda el mismo JSON:
+
+    {"tasas": {"USD": 1, "COP": 4132, "EUR": 0.92}}
+
+    AGROCONECTA_TASAS=tasas.json                  # archivo local
+    AGROCONECTA_TASAS=http://127.0.0.1:9000/tasas  # servicio
+
+`TasasCambio` guarda la última respuesta en memoria por `ttl` segundos.
+Cuando vence, la sigue entregando mientras pide la nueva en segundo plano,
+y si el proveedor falla se mantiene la anterior. Sin ninguna tasa todavía,
+`tasas()` espera un poco al proveedor; las compras y cotizaciones llaman
+`tasas(esperar=False)`, que nunca espera y entrega las de respaldo mientras
+la petición sigue en segundo plano. Las consultas simultáneas comparten una
+sola petición.
+"""
+
+import json
+import os
+import threading
+import time
+import urllib.request
+from concurrent.futures import Future, TimeoutError as TiempoAgotado
+
+VARIABLE_TASAS = "AGROCONECTA_TASAS"
+TASAS_POR_DEFECTO = {"USD": 1.0, "COP": 4132.0}
+SIMBOLOS = {"USD": "$", "COP": "COL$"}
+TTL = 300
+ESPERA_INICIAL = 2.0
+REINTENTO = 30
+
+
+def simbolo(moneda: str) -> str:
+    return SIMBOLOS.get(moneda, f"{moneda} ")
+
+
+def validar_tasas(datos) -> dict:
+    """
+    Retorna {moneda: tasa} a partir del JSON del proveedor. Lanza ValueError
+    si no trae tasas positivas o si falta el dólar.
+    """
+    tasas = datos.get("tasas") if isinstance(datos, dict) else None
+    if not isinstance(tasas, dict):
+        raise ValueError("La respuesta no trae el campo 'tasas'.")
+    validas = {}
+    for moneda, tasa in tasas.items():
+        if not isinstance(tasa, (int, float)) or isinstance(tasa, bool) or not tasa > 0:
+            raise ValueError(f"La tasa de '{moneda}' debe ser un número positivo.")
+        validas[str(moneda).upper()] = float(tasa)
+    if validas.get("USD") != 1.0:
+        raise ValueError("Las tasas deben estar en unidades por dólar (USD = 1).")
+    return validas
+
+
+# --- Proveedores: funciones sin argumentos que retornan {moneda: tasa} ---
+
+class ProveedorFijo:
+    def __init__(self, tasas: dict = None):
+        self._tasas = validar_tasas({"tasas": tasas or TASAS_POR_DEFECTO})
+
+    def __call__(self) -> dict:
+        return dict(self._tasas)
+
+
+class ProveedorArchivo:
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+
+    def __call__(self) -> dict:
+        with open(self.ruta, encoding="utf-8") as f:
+            return validar_tasas(json.load(f))
+
+
+class ProveedorHTTP:
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def __call__(self) -> dict:
+        with urllib.request.urlopen(self.url, timeout=self.timeout) as respuesta:
+            return validar_tasas(json.load(respuesta))
+
+
+def proveedor_desde(origen: str = None):
+    """
+    Proveedor para una ruta de archivo o una URL http(s); sin origen, el de
+    la variable AGROCONECTA_TASAS o las tasas fijas.
+    """
+    origen = origen or os.environ.get(VARIABLE_TASAS)
+    if not origen:
+        return ProveedorFijo()
+    if origen.startswith(("http://", "https://")):
+        return ProveedorHTTP(origen)
+    return ProveedorArchivo(origen)
+
+
+class TasasCambio:
+    """
+    Caché de las tasas de un proveedor; segura para varios hilos.
+    """
+
+    def __init__(self, proveedor=None, ttl: float = TTL, espera_inicial: float = ESPERA_INICIAL,
+                 reintento: float = REINTENTO, respaldo: dict = None):
+        self.proveedor = proveedor or proveedor_desde()
+        self.ttl = ttl
+        self.espera_inicial = espera_inicial
+        self.reintento = reintento
+        self.respaldo = respaldo or TASAS_POR_DEFECTO
+        self._tasas = None
+        self._obtenidas = 0.0
+        self._proximo_intento = 0.0
+        self._en_curso = None
+        self._lock = threading.Lock()
+        self.actualizaciones = 0
+        self.errores = 0
+        self.ultimo_error = None
+
+    def tasas(self, esperar: bool = True) -> dict:
+        """
+        Las tasas vigentes, sin esperar al proveedor si ya hay alguna. Sin
+        ninguna todavía se espera hasta `espera_inicial` segundos (o nada,
+        con `esperar=False`) y si no llegan se usan las de `respaldo`; tras
+        un fallo no se vuelve a esperar hasta pasados `reintento` segundos.
+        """
+        tasas = self._tasas
+        ahora = time.monotonic()
+        if tasas is not None:
+            if ahora - self._obtenidas > self.ttl and ahora >= self._proximo_intento:
+                self.actualizar()
+            return tasas
+        if ahora < self._proximo_intento:
+            return dict(self.respaldo)
+        futuro = self.actualizar()
+        if esperar:
+            try:
+                futuro.result(timeout=self.espera_inicial)
+            except TiempoAgotado:
+                pass
+        return self._tasas or dict(self.respaldo)
+
+    def tasa(self, moneda: str, esperar: bool = True) -> float:
+        """
+        Unidades de `moneda` por dólar. Lanza KeyError si no hay tasa para ella.
+        """
+        return self.tasas(esperar)[moneda]
+
+    def monedas(self, esperar: bool = True) -> list:
+        """
+        Monedas disponibles, con el dólar primero.
+        """
+        return sorted(self.tasas(esperar), key=lambda moneda: (moneda != "USD", moneda))
+
+    def actualizar(self) -> Future:
+        """
+        Pide tasas nuevas en segundo plano y retorna un Future que se
+        completa al terminar; si ya hay una petición en curso se reutiliza.
+        """
+        with self._lock:
+            if self._en_curso is None:
+                self._en_curso = Future()
+                threading.Thread(target=self._consultar, args=(self._en_curso,),
+                                 name="tasas-cambio", daemon=True).start()
+            return self._en_curso
+
+    def _consultar(self, futuro: Future):
+        try:
+            tasas = validar_tasas({"tasas": self.proveedor()})
+        except Exception as e:
+            with self._lock:
+                self.errores += 1
+                self.ultimo_error = f"{type(e).__name__}: {e}"
+                self._proximo_intento = time.monotonic() + self.reintento
+                self._en_curso = None
+            futuro.set_result(False)
+            return
+        with self._lock:
+            self._tasas = tasas
+            self._obtenidas = time.monotonic()
+            self.actualizaciones += 1
+            self._en_curso = None
+        futuro.set_result(True)
+
+    def estado(self) -> dict:
+        return {
+            "monedas": sorted(self._tasas or ()),
+            "edad_segundos": time.monotonic() - self._obtenidas if self._tasas else None,
+            "actualizaciones": self.actualizaciones,
+            "errores": self.errores,
+            "ultimo_error": self.ultimo_error,
+        }
@@ -0,0 +1,47 @@
+"""
+Pruebas de la búsqueda aproximada de variedades y productores.
+
+Uso:
+    python -m pytest -q
+"""
+
+import pytest
+
+from coincidencias import BuscadorAproximado, BuscadorPatrones
+
+VARIEDADES = ['Bourbon Rosado', 'Castillo', 'Catiope', 'Caturra', 'Cenicafe 1', 'Colombia Supremo',
+              'Geisha', 'Pacamara', 'Tabi', 'Typica']
+PRODUCTORES = ['Ana María Valencia', 'Axel Tveten', 'Luis Alberto Gómez', 'Luz Albani Suárez',
+               'Martha Cecilia Camacho', 'María Fernanda Ortiz', 'Nancy Mosquera']
+
+
+@pytest.fixture(scope="module")
+def buscadores():
+    return BuscadorAproximado(VARIEDADES), BuscadorAproximado(PRODUCTORES)
+
+
+@pytest.mark.parametrize("texto,variedad", [
+    ("¿cuánto cuesta el geysha?", "Geisha"),
+    ("quiero caturra rojo", "Caturra"),
+    ("precio del catura", "Caturra"),
+    ("tienes Tipica", "Typica"),
+])
+def test_variedad_mal_escrita(buscadores, texto, variedad):
+    assert buscadores[0].buscar(texto)[0][0] == variedad
+
+
+def test_productor_sin_tilde_y_con_error(buscadores):
+    nombre, similitud = buscadores[1].buscar("café de Luz Albani Suares")[0]
+    assert nombre == "Luz Albani Suárez"
+    assert 0.9 < similitud < 1
+
+
+@pytest.mark.parametrize("texto", ["café de Luz Marina", "solo Luz", "una gasa", "María"])
+def test_casi_coincidencias_no_cuentan(buscadores, texto):
+    assert buscadores[0].buscar(texto) == []
+    assert buscadores[1].buscar(texto) == []
+
+
+def test_patrones_exactos():
+    buscador = BuscadorPatrones(VARIEDADES)
+    assert buscador.buscar("bourbon rosado o geisha") == ["Bourbon Rosado", "Geisha"]
@@ -0,0 +1,43 @@
+"""
+Pruebas de los filtros que se extraen de una pregunta.
+
+Uso:
+    python -m pytest -q
+"""
+
+import pytest
+
+from consultas import rangos_mencionados
+
+AÑOS_CATALOGO = [2022, 2023, 2024]
+
+
+@pytest.mark.parametrize("pregunta,años", [
+    ("café de 2024", [2024, 2024]),
+    ("lo que se cosechó en 2019", [2019, 2019]),
+    ("cosecha 2018", [2018, 2018]),
+    ("del año 2021", [2021, 2021]),
+    ("entre 2022 y 2023", [2022, 2023]),
+    ("después de 2022", [2023, None]),
+    ("antes de 2024", [None, 2023]),
+    ("Geisha 2023", [2023, 2023]),
+])
+def test_años_con_pista_o_del_catalogo(pregunta, años):
+    assert rangos_mencionados(pregunta, AÑOS_CATALOGO)['year'] == años
+
+
+@pytest.mark.parametrize("pregunta", [
+    "quiero 2000 libras de Geisha",
+    "necesito 2024 kilos",
+    "compra de 2000 lb",
+    "antes de 2000 sacos",
+    "tienes 2000 de Caturra",
+    "precio 2024.5",
+])
+def test_numero_que_no_es_año(pregunta):
+    assert 'year' not in rangos_mencionados(pregunta, AÑOS_CATALOGO)
+
+
+def test_años_con_precio():
+    assert rangos_mencionados("menos de $20 de 2024", AÑOS_CATALOGO) == {
+        'year': [2024, 2024], 'price': [None, 20.0]}
@@ -0,0 +1,129 @@
+"""
+Pruebas del índice de agregados del catálogo.
+
+Uso:
+    python -m pytest -q
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from catalogo import RUTA_DATASET, a_float64, cargar_dataset, leer_por_bloques
+from indice_catalogo import IndiceCatalogo
+from pedidos import LIBRAS_POR_KILO
+
+
+@pytest.fixture(scope="module")
+def catalogo():
+    return cargar_dataset(RUTA_DATASET, None)
+
+
+def _iguales(a, b) -> bool:
+    """
+    Compara resúmenes admitiendo el error de redondeo de sumar en otro orden.
+    """
+    if isinstance(a, float) and isinstance(b, float):
+        return (math.isnan(a) and math.isnan(b)) or math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_iguales(a[k], b[k]) for k in a)
+    if isinstance(a, (tuple, list)) and isinstance(b, (tuple, list)):
+        return len(a) == len(b) and all(_iguales(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def resumen(indice: IndiceCatalogo) -> dict:
+    """
+    Todo lo que el índice responde, para comparar con `_iguales`.
+    """
+    pares = [(v, p) for v in indice.variedades for p in indice.productores(v)]
+    extremos = (indice.variedad_precio_max(), indice.variedad_precio_min(), indice.variedad_mejor_ranking())
+    return {
+        "variedades": indice.variedades,
+        "años": indice.años,
+        "lugares": indice.lugares,
+        "por_variedad": {v: (indice.productores(v), indice.propiedades(v), indice.rango_precio(v),
+                             indice.precio_promedio(v), indice.mejor_ranking(v)) for v in indice.variedades},
+        "por_productor": {par: (indice.rango_precio(*par), indice.precio_promedio(*par)) for par in pares},
+        # Con empates la variedad puede ser otra; el valor no
+        "extremos": [extremo[1] if extremo else None for extremo in extremos],
+        "ranking_promedio": indice.ranking_promedio(),
+        "bonos": sorted(indice.bonos_por_productor()),
+        "hay_bonos": indice.hay_bonos(),
+    }
+
+
+def cambios_al_azar(catalogo, pasos: int = 40, semilla: int = 7):
+    """
+    Agrega y elimina filas al azar; después de cada paso entrega el índice
+    actualizado y el DataFrame con las filas que debería tener.
+    """
+    rng = np.random.default_rng(semilla)
+    actual = catalogo.iloc[:100]
+    indice = IndiceCatalogo(actual)
+    siguiente = len(catalogo)
+    for paso in range(pasos):
+        cantidad = int(rng.integers(1, 30))
+        if rng.random() < 0.5 or len(actual) < cantidad:
+            # Filas repetidas incluidas, con etiquetas nuevas como en MotorChat.agregar_filas
+            nuevas = catalogo.iloc[rng.integers(0, len(catalogo), cantidad)]
+            nuevas.index = pd.RangeIndex(siguiente, siguiente + cantidad)
+            siguiente += cantidad
+            indice.agregar_filas(nuevas)
+            actual = pd.concat([actual, nuevas])
+        else:
+            quitadas = actual.iloc[rng.choice(len(actual), cantidad, replace=False)]
+            indice.eliminar_filas(quitadas)
+            actual = actual.drop(quitadas.index)
+        if paso % 5 == 0:
+            indice = indice.copia()
+        yield paso, indice, actual
+
+
+def test_agregar_y_eliminar_al_azar(catalogo):
+    for paso, indice, actual in cambios_al_azar(catalogo):
+        assert _iguales(resumen(indice), resumen(IndiceCatalogo(actual))), f"paso {paso}"
+
+
+def _factores_directos(filas: pd.DataFrame, claves: list) -> dict:
+    """
+    Bonos por libra y desviación calculados directamente sobre las filas.
+    """
+    filas = filas[(filas['kg'] > 0) & filas['carbon_credits'].notna() & filas['name'].notna()]
+    creditos, kg = a_float64(filas['carbon_credits']), a_float64(filas['kg'])
+    datos = pd.DataFrame({'creditos': creditos, 'kg': kg, 'por_kg': creditos / kg})
+    grupos = datos.groupby([filas[c].astype(object) for c in claves])
+    sumas = grupos.sum()
+    factores = sumas['creditos'] / (sumas['kg'] * LIBRAS_POR_KILO)
+    desviaciones = grupos['por_kg'].std() / LIBRAS_POR_KILO
+    return {clave: (factores[clave], desviaciones[clave]) for clave in factores.index}
+
+
+def test_factores_de_carbono_al_azar(catalogo):
+    for paso, indice, actual in cambios_al_azar(catalogo, semilla=11):
+        por_productor = _factores_directos(actual, ['coffee_variety', 'name'])
+        por_variedad = _factores_directos(actual, ['coffee_variety'])
+        obtenidos = {par: indice.factor_carbono(*par) for par in por_productor}
+        obtenidos.update({variedad: indice.factor_carbono(variedad) for variedad in por_variedad})
+        esperados = {**por_productor, **por_variedad}
+        assert obtenidos.keys() == esperados.keys()
+        for clave, (factor, desviacion) in esperados.items():
+            assert math.isclose(obtenidos[clave][0], factor, rel_tol=1e-9), f"paso {paso}, {clave}"
+            if desviacion == desviacion:
+                # La desviación sale de sumas de cuadrados: se tolera más error
+                assert math.isclose(obtenidos[clave][1], desviacion, rel_tol=1e-6, abs_tol=1e-9), \
+                    f"paso {paso}, {clave}"
+
+
+def test_eliminar_todo(catalogo):
+    indice = IndiceCatalogo(catalogo)
+    indice.eliminar_filas(catalogo)
+    assert _iguales(resumen(indice), resumen(IndiceCatalogo()))
+
+
+@pytest.mark.parametrize("tamaño_bloque", [3, 17, 1000])
+def test_desde_bloques(catalogo, tamaño_bloque):
+    indice = IndiceCatalogo.desde_bloques(leer_por_bloques(RUTA_DATASET, tamaño_bloque))
+    assert _iguales(resumen(indice), resumen(IndiceCatalogo(catalogo)))
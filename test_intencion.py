@@ -0,0 +1,44 @@
+"""
+Pruebas del clasificador de intención.
+
+Uso:
+    python -m pytest -q
+"""
+
+import pytest
+
+from evaluacion import CONFIGURACIONES, elegir, exportar
+from intencion import PREGUNTAS_SUGERENCIAS, ClasificadorIntencion, frases_por_defecto, leer_artefacto
+
+
+@pytest.fixture(scope="module")
+def clasificador():
+    return ClasificadorIntencion(ruta_modelo=None, tamaño_cache=0)
+
+
+@pytest.mark.parametrize("pregunta,intencion", PREGUNTAS_SUGERENCIAS)
+def test_botones_de_sugerencia(clasificador, pregunta, intencion):
+    assert clasificador.predecir_intencion(pregunta) == intencion
+
+
+def test_artefacto_exportado_con_otro_corpus(tmp_path):
+    ruta = str(tmp_path / "intencion.pkl")
+    frases = frases_por_defecto()[:-1]
+    huella = exportar(frases, CONFIGURACIONES["palabras_svm"], ruta)
+
+    clasificador = ClasificadorIntencion(ruta_modelo=ruta, tamaño_cache=0)
+    clasificador.precargar()
+    # Se usa el artefacto exportado, con su corpus y su configuración, sin reemplazarlo
+    assert leer_artefacto(ruta)["huella"] == huella
+    assert type(clasificador.clf).__name__ == "LinearSVC"
+    assert clasificador.diferencias_corpus == {"solo_artefacto": 0, "solo_repositorio": 1}
+
+
+def test_elegir_no_depende_de_la_latencia():
+    resultados = {
+        "b": {"exactitud": 0.95, "tamaño_kb": 40.0, "latencia_p50_us": 10.0, "sugerencias_fallidas": []},
+        "a": {"exactitud": 0.95, "tamaño_kb": 40.0, "latencia_p50_us": 90.0, "sugerencias_fallidas": []},
+        "c": {"exactitud": 0.95, "tamaño_kb": 80.0, "latencia_p50_us": 1.0, "sugerencias_fallidas": []},
+        "d": {"exactitud": 0.99, "tamaño_kb": 10.0, "latencia_p50_us": 1.0, "sugerencias_fallidas": ["hola"]},
+    }
+    assert elegir(resultados, tolerancia=0.0) == "a"
@@ -0,0 +1,134 @@
+"""
+Pruebas del motor del chatbot sobre el catálogo del repositorio.
+
+Uso:
+    python -m pytest -q
+"""
+
+import asyncio
+
+import pandas as pd
+import pytest
+
+from catalogo import RUTA_DATASET
+from intencion import frases_por_defecto
+from motor import ErrorCompra, MotorChat
+from servidor import ServidorChat
+
+# Preguntas con filtros, además de las frases del corpus
+PREGUNTAS_FILTRADAS = [
+    "productores de Geisha en Huila",
+    "precios de 2024 de menos de $30",
+    "propiedades del Caturra",
+    "quién vende café en Nariño",
+]
+# Preguntas que responden con un listado por páginas
+LISTADOS = [
+    "¿Dónde están los productores?",
+    "¿Qué propiedades tiene el café?",
+    "productores en Huila de 2024",
+    "productores de Geisha en Huila",
+]
+CURSORES_INVALIDOS = [
+    "", "productor_lugar", "otra:5", "productor_lugar:", "productor_lugar:-1", "productor_lugar:1.5",
+    "productor_lugar:²", "productor_lugar:١٢", "productor_lugar:" + "9" * 5000, "productor_lugar:{}x:1",
+    'productor_lugar:{"zona":"Huila"}:1', 'productor_lugar:{"year":[2024]}:1', 'productor_lugar:{"year":[NaN,1]}:1',
+    'productor_lugar:{"price":[true,1]}:1', 'productor_lugar:{"location":["Huila"]}:1', "productor_lugar:null:1",
+]
+
+
+@pytest.fixture(scope="module")
+def motor():
+    return MotorChat(ruta_cache=None)
+
+
+@pytest.fixture(scope="module")
+def motor_por_bloques():
+    # Bloques pequeños para que los grupos queden repartidos entre varios
+    return MotorChat(ruta_cache=None, por_bloques=True, tamaño_bloque=17)
+
+
+@pytest.fixture(scope="module")
+def variedad_y_productor(motor):
+    variedad = motor.variedades_unicas[0]
+    return variedad, motor.indice.productores(variedad)[0]
+
+
+def test_compra_con_nombres_en_otra_forma(motor, variedad_y_productor):
+    variedad, productor = variedad_y_productor
+    esperada = motor.realizar_compra(variedad, productor, "Orgánico", 2)
+    compra = motor.realizar_compra(variedad.upper(), productor.lower(), "Orgánico", 2)
+    assert compra["total"] == esperada["total"]
+    assert esperada["precio_usd"] == motor.indice.precio_promedio(variedad, productor)
+
+
+@pytest.mark.parametrize("productor", ["Productor Inexistente", "otra variedad"])
+def test_compra_de_productor_desconocido(motor, variedad_y_productor, productor):
+    variedad, conocido = variedad_y_productor
+    if productor == "otra variedad":
+        # Un productor del catálogo que no cultiva esta variedad
+        productor = next(p for v in motor.variedades_unicas for p in motor.indice.productores(v)
+                         if not motor.indice.cultiva(p, variedad))
+    with pytest.raises(ErrorCompra, match="no tiene café"):
+        motor.realizar_compra(variedad, productor, "Orgánico", 2)
+
+
+@pytest.mark.parametrize("cantidad", [float("nan"), float("inf"), 0, -1, "abc", None])
+def test_compra_con_cantidad_invalida(motor, variedad_y_productor, cantidad):
+    variedad, productor = variedad_y_productor
+    with pytest.raises(ErrorCompra, match="mayor que cero"):
+        motor.realizar_compra(variedad, productor, "Orgánico", cantidad)
+
+
+def test_por_bloques_responde_igual(motor, motor_por_bloques):
+    preguntas = [frase for frase, _ in frases_por_defecto()] + PREGUNTAS_FILTRADAS
+    assert motor_por_bloques.answer_many(preguntas) == motor.answer_many(preguntas)
+
+
+def test_recargar_con_diferencias_igual_que_en_frio(tmp_path):
+    csv = tmp_path / "catalogo.csv"
+    original = pd.read_csv(RUTA_DATASET)
+    original.to_csv(csv, index=False)
+    motor = MotorChat(str(csv), ruta_cache=None)
+
+    # Filas quitadas, una repetida, precios cambiados y una variedad nueva
+    nuevo = original.drop(index=range(0, 30, 3)).reset_index(drop=True)
+    nuevo.loc[5:9, "price"] = nuevo.loc[5:9, "price"] * 2
+    extra = original.iloc[[40, 40, 41]].copy()
+    extra.iloc[:2, extra.columns.get_loc("coffee_variety")] = "Sudan Rume"
+    pd.concat([nuevo, extra, original.iloc[[50]]]).to_csv(csv, index=False)
+
+    cambios = motor.recargar()
+    # Se tomó el camino incremental, no se armó el índice de cero
+    assert 0 < cambios["eliminadas"] + cambios["agregadas"] < cambios["filas"]
+    preguntas = [frase for frase, _ in frases_por_defecto()] + PREGUNTAS_FILTRADAS + ["precio del Sudan Rume"]
+    assert motor.answer_many(preguntas) == MotorChat(str(csv), ruta_cache=None).answer_many(preguntas)
+
+
+@pytest.mark.parametrize("pregunta", LISTADOS)
+def test_paginas_completan_la_respuesta(motor, pregunta):
+    primera = motor.answer_paginado(pregunta, tamaño_pagina=7)
+    textos, cursor = [primera["respuesta"]], primera["cursor"]
+    while cursor:
+        pagina = motor.mas_resultados(cursor, tamaño_pagina=7)
+        textos.append(pagina["respuesta"])
+        cursor = pagina["cursor"]
+    assert "\n".join(textos) == motor.answer(pregunta)
+    seguidas = [pagina["respuesta"] for pagina in motor.paginas_respuesta(pregunta, tamaño_pagina=7)]
+    assert seguidas == textos
+
+
+@pytest.mark.parametrize("cursor", CURSORES_INVALIDOS)
+def test_cursor_invalido(motor, cursor):
+    with pytest.raises(ValueError, match="Cursor inválido"):
+        motor.mas_resultados(cursor)
+
+
+def test_servidor_responde_400_a_un_cursor_invalido(motor):
+    servidor = ServidorChat(motor, workers=1)
+    try:
+        estado, respuesta = asyncio.run(servidor.atender("POST", "/mas", {"cursor": "productor_lugar:{}x:1"}))
+    finally:
+        asyncio.run(servidor.detener())
+    assert estado == 400
+    assert "Cursor inválido" in respuesta["error"]
@@ -0,0 +1,44 @@
+"""
+Pruebas de la cotización de pedidos de varias líneas.
+
+Uso:
+    python -m pytest -q
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pedidos import LIBRAS_POR_KILO, cotizar_lineas, totales_pedido
+
+POR_PRODUCTOR = pd.Series([10.0, 12.0], index=pd.MultiIndex.from_tuples(
+    [("Geisha", "Ana"), ("Geisha", "Luis")], names=['variedad', 'productor']))
+POR_VARIEDAD = pd.Series({"Geisha": 11.0})
+TASAS = {"USD": 1.0, "COP": 4000.0}
+
+
+def _cotizar(lineas: list) -> pd.DataFrame:
+    return cotizar_lineas(pd.DataFrame(lineas), POR_PRODUCTOR, POR_VARIEDAD, TASAS)
+
+
+def test_lineas_validas():
+    cotizadas = _cotizar([
+        {"variedad": "Geisha", "productor": "Ana", "cantidad": 2},
+        {"variedad": "Geisha", "productor": "Luis", "cantidad": 1, "unidad": "Kilos", "moneda": "COP"},
+    ])
+    assert list(cotizadas['error']) == ["", ""]
+    assert cotizadas['total_usd'].tolist() == pytest.approx([20.0, 12.0 * LIBRAS_POR_KILO])
+    assert cotizadas['total'].iloc[1] == pytest.approx(12.0 * LIBRAS_POR_KILO * 4000.0)
+
+
+@pytest.mark.parametrize("cantidad", [math.nan, math.inf, -math.inf, 0, -3, "abc"])
+def test_cantidad_invalida(cantidad):
+    cotizadas = _cotizar([{"variedad": "Geisha", "productor": "Ana", "cantidad": cantidad},
+                          {"variedad": "Geisha", "productor": "Ana", "cantidad": 1}])
+    assert list(cotizadas['error']) == ["Cantidad inválida.", ""]
+    assert np.isnan(cotizadas['total'].iloc[0])
+    totales = totales_pedido(cotizadas, TASAS)
+    assert totales["lineas_con_error"] == 1
+    assert totales["total_usd"] == pytest.approx(10.0)